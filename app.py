@@ -104,6 +104,7 @@ with st.sidebar:
     st.markdown('<div class="sidebar-info">', unsafe_allow_html=True)
     st.markdown("**Model:** TinyLlama-1.1B-Chat")
     st.markdown("**Quantisation:** 4-bit (QLoRA)")
+    st.markdown(f"**SLM Backend:** {os.getenv('SLM_BACKEND', 'auto')}")
     st.markdown("**Embedding:** all-MiniLM-L6-v2")
     st.markdown("**Vector Store:** ChromaDB")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -130,33 +131,47 @@ with st.sidebar:
 def load_pipeline():
     """Load all pipeline components once and cache them."""
     from src.dataset_matcher import DatasetMatcher
+    from src.domain_classifier import GUARDRAIL_MODE, DomainClassifier
+    from src.embeddings import EmbeddingService
     from src.guardrails import Guardrails
     from src.pipeline import BFSIPipeline
+    from src.response_cache import ResponseCache, SemanticCache
 
-    dataset_matcher = DatasetMatcher()
+    # One MiniLM encoder shared by Tier 1 and Tier 3
+    embedder = EmbeddingService()
+    dataset_matcher = DatasetMatcher(embedder=embedder)
 
     # Try loading SLM and RAG — they may not be available yet
     slm_engine = None
     rag_engine = None
 
     try:
+        from src.batching import MicroBatchScheduler
         from src.slm_engine import SLMEngine
-        slm_engine = SLMEngine(use_lora=True)
+        # Concurrent chat sessions share batched generate calls
+        slm_engine = MicroBatchScheduler(SLMEngine(use_lora=True))
     except Exception as e:
         st.warning(f"SLM not loaded (model may not be downloaded yet): {e}")
 
     try:
-        from src.rag_engine import RAGEngine
-        chroma_dir = os.getenv("CHROMA_PERSIST_DIR", "data/chroma_db")
-        if os.path.isdir(chroma_dir):
-            rag_engine = RAGEngine()
+        from src.rag_engine import RAGEngine, vector_store_dir
+        if os.path.isdir(vector_store_dir()):
+            rag_engine = RAGEngine(embedder=embedder)
         else:
             st.info("RAG vector store not built yet. Run `scripts/build_vectorstore.py`.")
     except Exception as e:
         st.warning(f"RAG not loaded: {e}")
 
-    guardrails = Guardrails()
-    pipeline = BFSIPipeline(dataset_matcher, slm_engine, rag_engine, guardrails)
+    classifier = None
+    if GUARDRAIL_MODE == "embedding":
+        # Domain check on the Tier 1 query embedding instead of keywords
+        classifier = DomainClassifier(embedder, dataset_matcher.instruction_embeddings)
+    guardrails = Guardrails(classifier=classifier)
+    pipeline = BFSIPipeline(
+        dataset_matcher, slm_engine, rag_engine, guardrails,
+        response_cache=ResponseCache(),
+        semantic_cache=SemanticCache(),
+    )
     return pipeline
 
 
@@ -198,11 +213,9 @@ if prompt := st.chat_input("Ask a banking, finance, or insurance question..."):
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
             start = time.time()
-            result = pipeline.run(prompt)
-            elapsed = time.time() - start
+            result, chunks = pipeline.run_stream(prompt)
 
         tier = result.get("tier_used", "unknown")
-        response = result.get("response", "I'm sorry, I couldn't process your query.")
 
         # Show tier badge
         if show_debug:
@@ -219,16 +232,44 @@ if prompt := st.chat_input("Ask a banking, finance, or insurance question..."):
                 unsafe_allow_html=True,
             )
 
-        st.markdown(response)
+        # Stream tokens as they are generated and record time-to-first-token
+        first_token = {}
+
+        def _timed(stream):
+            for text in stream:
+                first_token.setdefault("at", time.time())
+                yield text
+
+        streamed = st.write_stream(_timed(chunks))
+        elapsed = time.time() - start
+        response = result.get("response") or streamed or (
+            "I'm sorry, I couldn't process your query."
+        )
 
         # Debug expander
         if show_debug:
+            slm = pipeline.slm_engine
+            token_stats = (
+                slm.token_stats() if slm is not None and hasattr(slm, "token_stats") else None
+            )
             with st.expander("🔍 Debug Details"):
                 st.json({
                     "tier_used": tier,
                     "dataset_score": round(result.get("dataset_score", 0), 4),
                     "rag_score": round(result.get("rag_score", 0), 4),
                     "response_time_sec": round(elapsed, 2),
+                    "time_to_first_token_sec": round(
+                        first_token.get("at", start + elapsed) - start, 2
+                    ),
+                    "cache_hit": result.get("cache_hit", False),
+                    "cache_stats": pipeline.response_cache.stats(),
+                    "semantic_cache_hit": result.get("semantic_cache_hit", False),
+                    "semantic_cache_stats": pipeline.semantic_cache.stats(),
+                    "slm_token_stats": token_stats,
+                    "spans_ms": {
+                        f"{span['kind']}:{span['name']}": span["duration_ms"]
+                        for span in result.get("trace", {}).get("spans", [])
+                    },
                 })
 
     # Save to history
@@ -0,0 +1,127 @@
+"""Benchmark: IVF approximate search vs exact search for Tier 1.
+
+Scales the dataset up synthetically: every row is a random blend of two
+real instruction embeddings plus Gaussian noise, re-normalised, so the
+corpus keeps the topical structure of the real data at 10k – 1M rows.
+Queries are noisy copies of random corpus rows (a paraphrased ticket).
+
+For each size the exact path (``np.dot`` + ``argmax``, as in
+``DatasetMatcher.search``) is compared with ``IVFIndex`` at several
+``nprobe`` settings, one query at a time:
+
+  recall@1   share of queries where IVF returns the exact best row
+  p50 / p99  single-query latency in ms
+  scored     average rows scored per query
+
+Usage:
+    python scripts/benchmark_ann.py [--sizes 10000 100000 1000000] [--nprobe 1 4 16 64]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.ann_index import IVFIndex, default_lists
+from src.dataset_matcher import DATASET_PATH
+from src.embeddings import EmbeddingService
+
+GEN_BLOCK = 65536
+
+
+def normalise(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def synthetic_corpus(anchors: np.ndarray, n: int, noise: float, rng) -> np.ndarray:
+    """``n`` unit rows blended from random pairs of ``anchors`` plus noise."""
+    dim = anchors.shape[1]
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, GEN_BLOCK):
+        m = min(GEN_BLOCK, n - start)
+        i = rng.integers(len(anchors), size=m)
+        j = rng.integers(len(anchors), size=m)
+        w = rng.random((m, 1), dtype=np.float32)
+        x = w * anchors[i] + (1 - w) * anchors[j]
+        x += noise / np.sqrt(dim) * rng.standard_normal((m, dim), dtype=np.float32)
+        out[start:start + m] = normalise(x)
+    return out
+
+
+def exact_search(corpus: np.ndarray, query: np.ndarray):
+    scores = np.dot(corpus, query)
+    best = int(np.argmax(scores))
+    return best, float(scores[best])
+
+
+def timed(fn, queries):
+    results, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(fn(q))
+        latencies.append(time.perf_counter() - t0)
+    return results, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tier 1 IVF vs exact search benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=0.6, help="corpus noise (relative norm)")
+    parser.add_argument("--query-noise", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        instructions = [row["instruction"] for row in json.load(f)]
+    anchors = EmbeddingService().encode(instructions).astype(np.float32)
+    rng = np.random.default_rng(args.seed)
+
+    rows = []
+    for n in args.sizes:
+        print(f"\n--- {n:,} rows ---")
+        corpus = synthetic_corpus(anchors, n, args.noise, rng)
+        queries = normalise(
+            corpus[rng.integers(n, size=args.queries)]
+            + args.query_noise / np.sqrt(corpus.shape[1])
+            * rng.standard_normal((args.queries, corpus.shape[1]), dtype=np.float32)
+        ).astype(np.float32)
+        exact, p50, p99 = timed(lambda q: exact_search(corpus, q), queries)
+        rows.append((n, "exact", 0.0, 1.0, p50, p99, n))
+
+        t0 = time.perf_counter()
+        index = IVFIndex.build(corpus)
+        build_sec = time.perf_counter() - t0
+        print(f"IVF build: {index.n_lists} lists in {build_sec:.1f}s")
+        list_sizes = np.diff(index.offsets)
+        for nprobe in args.nprobe:
+            if nprobe > index.n_lists:
+                continue
+            found, p50, p99 = timed(
+                lambda q: index.search(q[None, :], nprobe), queries
+            )
+            recall = np.mean([int(r[0][0]) == e[0] for r, e in zip(found, exact)])
+            probes = np.argpartition(-(queries @ index.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            scored = float(list_sizes[probes].sum(axis=1).mean())
+            rows.append((n, f"ivf nprobe={nprobe}", build_sec, recall, p50, p99, scored))
+        del corpus, index
+
+    print("\n" + "=" * 80)
+    print(f"Tier 1 search: {args.queries} single queries per size "
+          f"(lists ~ sqrt(N), e.g. {default_lists(args.sizes[-1])} at {args.sizes[-1]:,})")
+    print("=" * 80)
+    print(f"{'rows':>10}  {'method':<16}{'build s':>9}{'recall@1':>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'scored':>11}")
+    for n, method, build_sec, recall, p50, p99, scored in rows:
+        build = f"{build_sec:.1f}" if build_sec else "-"
+        print(f"{n:>10,}  {method:<16}{build:>9}{recall:>10.1%}"
+              f"{p50:>9.3f}{p99:>9.3f}{scored:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
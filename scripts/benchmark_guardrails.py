@@ -0,0 +1,121 @@
+"""Micro-benchmark for the guardrail checks.
+
+Compares the compiled single-pass Guardrails against the original
+rule-by-rule implementation (re-created below from the same pattern
+lists) on a synthetic corpus of queries and model responses, verifies
+both give identical results and reports throughput.
+
+Usage:
+    python scripts/benchmark_guardrails.py [--size 50000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.guardrails import (
+    BFSI_KEYWORDS,
+    FABRICATION_PATTERNS,
+    FABRICATION_REPLACEMENT,
+    GREETINGS,
+    HARMFUL_INTENT_PATTERNS,
+    PII_PATTERNS,
+    Guardrails,
+)
+
+FILLER = (
+    "please tell me about the weather today and how the company performs in "
+    "my word processor while travelling to paris next week with family"
+).split()
+PII_SNIPPETS = [
+    "1234 5678 9012", "ABCDE1234F", "123456789012345", "555-123-4567",
+    "9876543210", "your exact balance is", "Your OTP is",
+]
+
+
+# -- Original implementation -------------------------------------------
+def legacy_check_query(query: str):
+    q_lower = query.lower().strip()
+    if not q_lower:
+        return False, "empty"
+    for pattern in HARMFUL_INTENT_PATTERNS:
+        if re.search(pattern, q_lower):
+            return False, "harmful"
+    if not any(kw in q_lower for kw in BFSI_KEYWORDS):
+        if any(q_lower.startswith(g) or q_lower == g for g in GREETINGS):
+            return True, ""
+        return False, "out_of_domain"
+    return True, ""
+
+
+def legacy_redact(text: str) -> str:
+    for pattern, replacement in PII_PATTERNS:
+        text = re.sub(pattern, replacement, text)
+    for pattern in FABRICATION_PATTERNS:
+        if re.search(pattern, text, re.IGNORECASE):
+            text = re.sub(pattern, FABRICATION_REPLACEMENT, text, flags=re.IGNORECASE)
+    return text
+
+
+# -- Corpus --------------------------------------------------------------
+def build_corpus(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    queries, responses = [], []
+    for _ in range(size):
+        words = rng.choices(FILLER, k=rng.randint(4, 14))
+        if rng.random() < 0.6:  # in-domain
+            words.insert(rng.randrange(len(words) + 1), rng.choice(BFSI_KEYWORDS))
+        if rng.random() < 0.02:
+            words.append("hack")
+        queries.append(" ".join(words))
+
+        body = rng.choices(FILLER + BFSI_KEYWORDS, k=rng.randint(40, 120))
+        for _ in range(rng.randint(0, 2)):
+            body.insert(rng.randrange(len(body) + 1), rng.choice(PII_SNIPPETS))
+        responses.append(" ".join(body) + ".")
+    return queries, responses
+
+
+def _throughput(fn, items) -> float:
+    t0 = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guardrail throughput benchmark")
+    parser.add_argument("--size", type=int, default=50000)
+    args = parser.parse_args()
+
+    queries, responses = build_corpus(args.size)
+
+    def _verdict(result):
+        return result[0]
+
+    assert all(
+        _verdict(legacy_check_query(q)) == _verdict(Guardrails.check_query(q)) for q in queries
+    ), "check_query results differ"
+    assert all(
+        legacy_redact(r) == Guardrails._redact(r) for r in responses
+    ), "redactions differ"
+
+    print("=" * 60)
+    print(f"Guardrails throughput ({args.size} queries / responses)")
+    print("=" * 60)
+    print(f"\n{'check':<16}{'before /s':>14}{'after /s':>14}{'speed-up':>10}")
+    for label, before, after, items in (
+        ("check_query", legacy_check_query, Guardrails.check_query, queries),
+        ("redact", legacy_redact, Guardrails._redact, responses),
+    ):
+        old = _throughput(before, items)
+        new = _throughput(after, items)
+        print(f"{label:<16}{old:>14,.0f}{new:>14,.0f}{new / old:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
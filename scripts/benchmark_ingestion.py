@@ -0,0 +1,96 @@
+"""Benchmark: knowledge-base ingestion throughput at corpus scale.
+
+Replicates ``data/knowledge_base`` ``--scale`` times into a temporary
+directory (100x ≈ 3.3 MB of Markdown) and runs a full build of the vector
+store twice:
+
+  baseline  one process for loading/splitting, encoder batch size 32
+            (the ``Chroma.from_documents`` / ``HuggingFaceEmbeddings`` defaults)
+  tuned     a process pool for loading/splitting, length-sorted blocks
+            with ``--batch-size`` texts per forward pass
+
+and reports the wall-clock time and chunks/sec of every stage.
+
+Usage:
+    python scripts/benchmark_ingestion.py [--scale 100] [--workers 0] [--batch-size 128]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from build_vectorstore import (
+    INGEST_BATCH_SIZE,
+    KNOWLEDGE_BASE_DIR,
+    build_vectorstore,
+    list_documents,
+    load_and_split,
+)
+
+
+def make_corpus(target_dir: str, scale: int) -> None:
+    """Write ``scale`` renamed copies of every knowledge-base file."""
+    for path in list_documents(KNOWLEDGE_BASE_DIR):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for i in range(scale):
+            with open(os.path.join(target_dir, f"{stem}_{i:04d}.md"), "w", encoding="utf-8") as f:
+                f.write(text)
+
+
+def run(label: str, kb_dir: str, persist_dir: str, workers: int, batch_size: int) -> dict:
+    print(f"\n--- {label}: workers={workers or os.cpu_count()}, batch_size={batch_size} ---")
+    t0 = time.perf_counter()
+    chunks = load_and_split(kb_dir, workers)
+    split_sec = time.perf_counter() - t0
+    stats = build_vectorstore(
+        chunks, full=True, batch_size=batch_size, persist_dir=persist_dir,
+        sanity_check=False, index_dir=None,
+    )
+    stats.update(split_sec=split_sec, total_sec=time.perf_counter() - t0)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store ingestion benchmark")
+    parser.add_argument("--scale", type=int, default=100, help="copies of the knowledge base")
+    parser.add_argument("--workers", type=int, default=0, help="tuned run processes (0 = per CPU)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bfsi_ingest_")
+    try:
+        kb_dir = os.path.join(work, "kb")
+        os.makedirs(kb_dir)
+        make_corpus(kb_dir, args.scale)
+        size_mb = sum(os.path.getsize(p) for p in list_documents(kb_dir)) / 1e6
+
+        results = [
+            ("baseline", run("baseline", kb_dir, os.path.join(work, "db_baseline"), 1, 32)),
+            ("tuned", run("tuned", kb_dir, os.path.join(work, "db_tuned"),
+                          args.workers, args.batch_size)),
+        ]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print("\n" + "=" * 72)
+    print(f"Ingestion benchmark: {args.scale}x knowledge base ({size_mb:.1f} MB)")
+    print("=" * 72)
+    print(f"{'run':<10}{'chunks':>8}{'split s':>10}{'embed s':>10}{'write s':>10}"
+          f"{'total s':>10}{'chunks/s':>12}")
+    for label, s in results:
+        print(f"{label:<10}{s['chunks']:>8}{s['split_sec']:>10.2f}{s['embed_sec']:>10.2f}"
+              f"{s['write_sec']:>10.2f}{s['total_sec']:>10.2f}"
+              f"{s['chunks'] / s['total_sec']:>12,.0f}")
+    speedup = results[0][1]["total_sec"] / results[1][1]["total_sec"]
+    print(f"\nTuned vs baseline: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
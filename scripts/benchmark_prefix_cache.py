@@ -0,0 +1,62 @@
+"""Benchmark prefill time with and without the system-prompt KV cache.
+
+Times a one-token greedy generation (i.e. prefill + one step) for prompts
+with and without RAG context, toggling SLMEngine's prefix cache.
+
+Usage:
+    python scripts/benchmark_prefix_cache.py [--reps 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.slm_engine import SLMEngine
+
+KNOWLEDGE_BASE_DIR = os.path.join("data", "knowledge_base")
+QUERY = "What is the transaction limit for UPI Lite without a PIN?"
+
+
+def _sample_context() -> str:
+    """Roughly the size of the 3-chunk context RAGEngine produces."""
+    path = os.path.join(KNOWLEDGE_BASE_DIR, "digital_banking_cards.md")
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()[:2400]
+
+
+def _time_prefill(engine: SLMEngine, rag_context, reps: int) -> float:
+    engine.generate(QUERY, rag_context=rag_context, max_new_tokens=1, temperature=0)  # warm-up
+    samples = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        engine.generate(QUERY, rag_context=rag_context, max_new_tokens=1, temperature=0)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefix KV-cache prefill benchmark")
+    parser.add_argument("--reps", type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("System-prompt prefix cache: prefill latency")
+    print("=" * 60)
+    engine = SLMEngine(use_lora=True)
+    if not engine._prefix_cache:
+        engine._build_prefix_cache()
+
+    print(f"\n{'prompt':<10}{'no cache ms':>14}{'cached ms':>12}{'saved ms':>12}")
+    for label, context in (("plain", None), ("rag", _sample_context())):
+        engine.use_prefix_cache = False
+        uncached = _time_prefill(engine, context, args.reps)
+        engine.use_prefix_cache = True
+        cached = _time_prefill(engine, context, args.reps)
+        print(f"{label:<10}{uncached:>14.1f}{cached:>12.1f}{uncached - cached:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark: memory and accuracy of quantized embeddings (int8 / binary).
+
+Compares exact float32 search with ``QuantizedVectors`` (code scan +
+float re-ranking) on:
+
+  tier1       the dataset instruction embeddings, queried with noisy
+              copies of every instruction (``--repeat`` each); also
+              reports how often the Tier 1 threshold decision changes
+  tier3       the live NumPy knowledge-base index (if built), queried
+              with the dataset instructions as real text queries
+  synthetic   the Tier 1 data scaled up to ``--sizes`` rows as in
+              ``benchmark_ann.py``
+
+For every mode it reports the bytes scanned per query, top-1 agreement
+and recall@k against float search, the largest score difference of the
+returned top-1 and single-query p50 latency, both with the default
+re-rank shortlist and without re-ranking (shortlist of ``k``).
+
+Usage:
+    python scripts/benchmark_quantization.py [--sizes 100000 1000000] [--rerank 64]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from benchmark_ann import normalise, synthetic_corpus
+
+from src.dataset_matcher import DATASET_PATH, THRESHOLD
+from src.embeddings import EmbeddingService
+from src.quantization import QUANT_RERANK, QuantizedVectors
+from src.rag_engine import RAG_K, active_index_path
+from src.vector_index import VECTOR_INDEX_DIR, NumpyVectorIndex
+
+
+def exact_top_k(vectors: np.ndarray, q: np.ndarray, k: int):
+    scores = vectors @ q
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top, scores[top]
+
+
+def noisy_queries(vectors: np.ndarray, rows: np.ndarray, noise: float, rng) -> np.ndarray:
+    dim = vectors.shape[1]
+    q = vectors[rows] + noise / np.sqrt(dim) * rng.standard_normal((len(rows), dim),
+                                                                   dtype=np.float32)
+    return normalise(q).astype(np.float32)
+
+
+def evaluate(label: str, vectors: np.ndarray, queries: np.ndarray, k: int,
+             rerank: int, threshold=None) -> list:
+    """One result row per (mode, shortlist) for ``queries`` against ``vectors``."""
+    reference, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        reference.append(exact_top_k(vectors, q, k))
+        latencies.append(time.perf_counter() - t0)
+    rows = [(label, "float32", "-", vectors.nbytes, 1.0, 1.0, 0.0, None,
+             np.percentile(latencies, 50) * 1000)]
+    for mode in ("int8", "binary"):
+        quantized = QuantizedVectors.build(vectors, mode)
+        for shortlist in (rerank, k):
+            top1 = recall = flips = 0
+            max_diff = 0.0
+            latencies = []
+            for q, (ref_rows, ref_scores) in zip(queries, reference):
+                t0 = time.perf_counter()
+                got_rows, got_scores = quantized.search(q[None, :], k=k, rerank=shortlist)
+                latencies.append(time.perf_counter() - t0)
+                top1 += int(got_rows[0, 0] == ref_rows[0])
+                recall += len(set(got_rows[0]) & set(ref_rows)) / len(ref_rows)
+                max_diff = max(max_diff, abs(float(got_scores[0, 0]) - float(ref_scores[0])))
+                if threshold is not None:
+                    flips += (got_scores[0, 0] >= threshold) != (ref_scores[0] >= threshold)
+            n = len(queries)
+            flip_rate = flips / n if threshold is not None else None
+            rows.append((label, mode, shortlist, quantized.nbytes, top1 / n, recall / n,
+                         max_diff, flip_rate, np.percentile(latencies, 50) * 1000))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized embedding memory/accuracy report")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--rerank", type=int, default=QUANT_RERANK)
+    parser.add_argument("--queries", type=int, default=200, help="synthetic queries per size")
+    parser.add_argument("--repeat", type=int, default=5, help="tier1 queries per instruction")
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        instructions = [row["instruction"] for row in json.load(f)]
+    embedder = EmbeddingService()
+    tier1 = embedder.encode(instructions).astype(np.float32)
+
+    results = []
+    print(f"\n--- tier1: {len(tier1)} instructions ---")
+    queries = noisy_queries(tier1, np.repeat(np.arange(len(tier1)), args.repeat), args.noise, rng)
+    results += evaluate("tier1", tier1, queries, 1, args.rerank, threshold=THRESHOLD)
+
+    index_path = active_index_path(VECTOR_INDEX_DIR)
+    if os.path.isfile(os.path.join(index_path, "manifest.json")):
+        chunks = np.asarray(NumpyVectorIndex(index_path, quantization="none").embeddings,
+                            dtype=np.float32)
+        print(f"\n--- tier3: {len(chunks)} knowledge-base chunks ---")
+        results += evaluate("tier3", chunks, tier1, RAG_K, args.rerank)
+    else:
+        print(f"\n(no NumPy index in {VECTOR_INDEX_DIR}: run scripts/build_vectorstore.py "
+              "to include Tier 3)")
+
+    for n in args.sizes:
+        print(f"\n--- synthetic: {n:,} rows ---")
+        corpus = synthetic_corpus(tier1, n, args.noise, rng)
+        queries = noisy_queries(corpus, rng.integers(n, size=args.queries), args.noise, rng)
+        results += evaluate(f"synth {n:,}", corpus, queries, 1, args.rerank, threshold=THRESHOLD)
+        del corpus
+
+    print("\n" + "=" * 98)
+    print(f"Quantized embeddings: re-rank shortlist {args.rerank} vs none (shortlist = k); "
+          f"Tier 3 k={RAG_K}")
+    print("=" * 98)
+    print(f"{'data':<16}{'mode':<9}{'rerank':>7}{'MB':>10}{'top-1':>8}{'recall@k':>10}"
+          f"{'max Δscore':>12}{'thr flips':>11}{'p50 ms':>9}")
+    for label, mode, shortlist, nbytes, top1, recall, diff, flips, p50 in results:
+        flips = f"{flips:.1%}" if flips is not None else "-"
+        print(f"{label:<16}{mode:<9}{shortlist:>7}{nbytes / 1e6:>10.2f}{top1:>8.1%}"
+              f"{recall:>10.1%}{diff:>12.2e}{flips:>11}{p50:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark SLMEngine inference backends (tokens/sec and peak RSS).
+
+Each backend is loaded in its own subprocess so peak memory is measured
+independently.  Greedy decoding is used so every backend generates
+comparable output lengths.
+
+Usage:
+    python scripts/benchmark_slm.py                       # all usable backends
+    python scripts/benchmark_slm.py --backends cpu-int8   # one backend
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+BENCH_QUERIES = [
+    "Explain the difference between a debit card and a credit card to a 10-year-old.",
+    "Why is it important to save money for emergencies?",
+    "Suggest three tips for safe online banking.",
+    "What happens if I lose my cheque book?",
+]
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(backend: str, max_new_tokens: int) -> dict:
+    """Load one backend in this process and time greedy generations."""
+    from src.slm_engine import SLMEngine
+
+    t0 = time.perf_counter()
+    engine = SLMEngine(use_lora=True, backend=backend)
+    load_sec = time.perf_counter() - t0
+
+    engine.generate("Hello", max_new_tokens=8, temperature=0)  # warm-up
+
+    tokens = 0
+    t0 = time.perf_counter()
+    for q in BENCH_QUERIES:
+        response = engine.generate(q, max_new_tokens=max_new_tokens, temperature=0)
+        tokens += len(engine.tokenizer(response, add_special_tokens=False)["input_ids"])
+    gen_sec = time.perf_counter() - t0
+
+    return {
+        "backend": backend,
+        "load_sec": round(load_sec, 2),
+        "tokens": tokens,
+        "tokens_per_sec": round(tokens / gen_sec, 2) if gen_sec else 0.0,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=None)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.max_new_tokens)))
+        return
+
+    backends = args.backends
+    if backends is None:
+        import torch
+        backends = ["cpu-int8"] + (["cuda-4bit"] if torch.cuda.is_available() else [])
+
+    print("=" * 60)
+    print("SLMEngine backend benchmark")
+    print("=" * 60)
+    results = []
+    for backend in backends:
+        print(f"\n-> {backend} ...")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", backend,
+             "--max-new-tokens", str(args.max_new_tokens)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"   FAILED:\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'backend':<12}{'load s':>10}{'tokens':>10}{'tok/s':>10}{'peak RSS MB':>14}")
+    for r in results:
+        print(f"{r['backend']:<12}{r['load_sec']:>10}{r['tokens']:>10}"
+              f"{r['tokens_per_sec']:>10}{r['peak_rss_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
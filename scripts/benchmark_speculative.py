@@ -0,0 +1,64 @@
+"""Benchmark speculative decoding against plain greedy decoding.
+
+Runs the Tier 3 test questions with their retrieved context through
+SLMEngine in greedy mode, first without and then with speculative
+decoding, checks that the answers are identical and reports tokens/sec.
+
+Usage:
+    python scripts/benchmark_speculative.py [--mode prompt_lookup|draft]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.rag_engine import RAGEngine
+from src.slm_engine import SLMEngine
+
+BENCH_QUERIES = [
+    "What is the transaction limit for UPI Lite without a PIN?",
+    "What are the precise legal and technical verification charges for a home loan?",
+    "How many EMIs must be paid before I can make a partial prepayment on a personal loan?",
+    "What is the session timeout duration for internet banking?",
+]
+
+
+def _run(engine: SLMEngine, contexts, max_new_tokens: int):
+    answers, tokens = [], 0
+    t0 = time.perf_counter()
+    for q, ctx in zip(BENCH_QUERIES, contexts):
+        answer = engine.generate(q, rag_context=ctx, max_new_tokens=max_new_tokens, temperature=0)
+        answers.append(answer)
+        tokens += len(engine.tokenizer(answer, add_special_tokens=False)["input_ids"])
+    return answers, tokens / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speculative decoding benchmark")
+    parser.add_argument("--mode", choices=["prompt_lookup", "draft"], default="prompt_lookup")
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Speculative decoding ({args.mode}) vs greedy")
+    print("=" * 60)
+    rag = RAGEngine()
+    contexts = [rag.get_context_string(q) for q in BENCH_QUERIES]
+    engine = SLMEngine(use_lora=True, speculative=args.mode)
+
+    engine.generate("Hello", max_new_tokens=8, temperature=0)  # warm-up
+    engine.speculative = "off"
+    baseline, base_tps = _run(engine, contexts, args.max_new_tokens)
+    engine.speculative = args.mode
+    spec, spec_tps = _run(engine, contexts, args.max_new_tokens)
+
+    identical = sum(a == b for a, b in zip(baseline, spec))
+    print(f"\n  greedy       : {base_tps:8.2f} tok/s")
+    print(f"  {args.mode:<13}: {spec_tps:8.2f} tok/s  ({spec_tps / base_tps:.2f}x)")
+    print(f"  identical outputs: {identical}/{len(BENCH_QUERIES)}")
+
+
+if __name__ == "__main__":
+    main()
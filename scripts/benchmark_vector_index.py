@@ -0,0 +1,147 @@
+"""Benchmark: NumPy vector index vs ChromaDB for Tier 3 retrieval.
+
+Uses the dataset instructions as queries (embedded once, up front) and
+searches the live knowledge-base index through ``RAGEngine`` with
+``backend="chroma"``, ``backend="numpy"`` and a float16 copy of the NumPy
+index.  Reports:
+
+  parity   top-1 agreement, recall@k of Chroma's results and the largest
+           score difference for the same chunk
+  latency  p50 / p99 of single-query ``retrieve`` and the per-query cost
+           of one ``retrieve_batch`` over all queries
+  size     bytes on disk of each index
+
+Run ``scripts/build_vectorstore.py`` first.
+
+Usage:
+    python scripts/benchmark_vector_index.py [--k 3] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.dataset_matcher import DATASET_PATH
+from src.embeddings import EmbeddingService
+from src.rag_engine import (
+    CHROMA_PERSIST_DIR,
+    RAG_K,
+    RAGEngine,
+    read_active_collection,
+    write_active_collection,
+)
+from src.vector_index import VECTOR_INDEX_DIR, NumpyVectorIndex, write_index
+
+
+def dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path) for f in files
+    )
+
+
+def float16_copy(index: NumpyVectorIndex, target_dir: str) -> None:
+    """Write ``index`` as a float16 index under ``target_dir`` and point at it."""
+    name = read_active_collection(VECTOR_INDEX_DIR)["collection"]
+    write_index(
+        os.path.join(target_dir, name),
+        np.asarray(index.embeddings, dtype=np.float32),
+        [index.text(i) for i in range(len(index))],
+        [index.sources[s] for s in index.source_ids],
+        dtype="float16",
+    )
+    write_active_collection(target_dir, {"collection": name, "dtype": "float16"})
+
+
+def chunk_key(chunk: dict):
+    return chunk["source"], chunk["content"]
+
+
+def parity(reference, results, k: int) -> dict:
+    top1 = recall = 0
+    max_diff = 0.0
+    for ref, got in zip(reference, results):
+        top1 += bool(ref and got and chunk_key(ref[0]) == chunk_key(got[0]))
+        got_scores = {chunk_key(c): c["score"] for c in got}
+        recall += sum(chunk_key(c) in got_scores for c in ref) / max(len(ref), 1)
+        for c in ref:
+            if chunk_key(c) in got_scores:
+                max_diff = max(max_diff, abs(c["score"] - got_scores[chunk_key(c)]))
+    n = max(len(reference), 1)
+    return {"top1": top1 / n, "recall": recall / n, "max_score_diff": max_diff}
+
+
+def time_engine(engine: RAGEngine, queries, embeddings, k: int, repeat: int) -> dict:
+    engine.retrieve(queries[0], k=k, query_embedding=embeddings[0])  # warm-up
+    singles = []
+    for _ in range(repeat):
+        for q, emb in zip(queries, embeddings):
+            t0 = time.perf_counter()
+            engine.retrieve(q, k=k, query_embedding=emb)
+            singles.append(time.perf_counter() - t0)
+    batch = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = engine.retrieve_batch(embeddings, k=k)
+        batch.append(time.perf_counter() - t0)
+    return {
+        "p50_ms": float(np.percentile(singles, 50) * 1000),
+        "p99_ms": float(np.percentile(singles, 99) * 1000),
+        "batch_ms_per_query": min(batch) / len(queries) * 1000,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy vector index vs ChromaDB benchmark")
+    parser.add_argument("--k", type=int, default=RAG_K)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the query set")
+    args = parser.parse_args()
+
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        queries = [row["instruction"] for row in json.load(f)]
+    embedder = EmbeddingService()
+    embeddings = embedder.encode(queries)
+
+    chroma = RAGEngine(embedder=embedder, backend="chroma")
+    numpy_engine = RAGEngine(embedder=embedder, backend="numpy")
+    fp16_dir = tempfile.mkdtemp(prefix="bfsi_index_fp16_")
+    try:
+        float16_copy(numpy_engine.index, fp16_dir)
+        fp16 = RAGEngine(embedder=embedder, backend="numpy", index_dir=fp16_dir)
+        runs = [
+            ("chroma", chroma, dir_size(CHROMA_PERSIST_DIR)),
+            (f"numpy-{numpy_engine.index.manifest['dtype']}", numpy_engine,
+             dir_size(numpy_engine.index.path)),
+            ("numpy-float16", fp16, dir_size(fp16.index.path)),
+        ]
+        stats = [(label, time_engine(engine, queries, embeddings, args.k, args.repeat), size)
+                 for label, engine, size in runs]
+    finally:
+        shutil.rmtree(fp16_dir, ignore_errors=True)
+
+    reference = stats[0][1]["results"]
+    print("\n" + "=" * 86)
+    print(f"Tier 3 retrieval: {len(queries)} queries x {args.repeat}, "
+          f"{len(numpy_engine.index)} chunks, k={args.k}")
+    print("=" * 86)
+    print(f"{'backend':<16}{'p50 ms':>9}{'p99 ms':>9}{'batch ms/q':>12}"
+          f"{'top-1':>8}{'recall@k':>10}{'max Δscore':>12}{'size MB':>10}")
+    for label, s, size in stats:
+        p = parity(reference, s["results"], args.k)
+        print(f"{label:<16}{s['p50_ms']:>9.3f}{s['p99_ms']:>9.3f}{s['batch_ms_per_query']:>12.4f}"
+              f"{p['top1']:>8.1%}{p['recall']:>10.1%}{p['max_score_diff']:>12.2e}"
+              f"{size / 1e6:>10.2f}")
+    speedup = stats[0][1]["p50_ms"] / stats[1][1]["p50_ms"]
+    print(f"\nNumPy vs Chroma single-query p50: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
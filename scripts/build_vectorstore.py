@@ -1,109 +1,371 @@
 """Build ChromaDB vector store from knowledge base Markdown documents.
 
-Uses LangChain document loaders, text splitters, and HuggingFace embeddings
-to create a persistent vector store for the RAG pipeline.
+Uses LangChain document loaders and text splitters plus the shared MiniLM
+``EmbeddingService`` to maintain the persistent vector store for the RAG
+pipeline.  Rebuilds are incremental:
+
+  * every chunk is keyed by a SHA-256 of its source path and text;
+  * only new or edited chunks are embedded – vectors of unchanged chunks
+    are copied from the live collection and removed chunks are dropped;
+  * the result is written to a fresh staging collection and switched in
+    by atomically replacing ``active_collection.json``, so a running
+    ``RAGEngine`` never sees a partial index.  The previous collection is
+    kept for one generation for readers that have not switched yet.
+
+Ingestion is built for large corpora: files are read and split on a
+process pool, chunks are embedded in length-sorted blocks with a tuned
+batch size (little padding per forward pass), vectors are written to
+Chroma in the largest batches the client accepts, and each stage reports
+its throughput in chunks/sec.
+
+Every build is also exported as a ``NumpyVectorIndex`` under
+``VECTOR_INDEX_DIR`` for ``RAG_BACKEND=numpy``.  Each export goes to a
+fresh ``<collection>-<dtype>-<id>`` directory and is switched in through
+that directory's own pointer file, so the directory readers use is never
+rewritten in place.
+
+Usage:
+    python scripts/build_vectorstore.py [--full] [--workers N] [--batch-size 128]
 """
+import argparse
+import glob
+import hashlib
 import os
+import shutil
 import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
 # Add project root to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+import chromadb
+import numpy as np
 from dotenv import load_dotenv
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+
+from src.embeddings import EmbeddingService
+from src.rag_engine import (
+    ACTIVE_POINTER,
+    COLLECTION_NAME,
+    active_index_path,
+    read_active_collection,
+    write_active_collection,
+)
+from src.vector_index import VECTOR_INDEX_DIR, VECTOR_INDEX_DTYPE, write_index
 
 load_dotenv()
 
 KNOWLEDGE_BASE_DIR = os.path.join("data", "knowledge_base")
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "data/chroma_db")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
-COLLECTION_NAME = "bfsi_knowledge"
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))          # 0 = one per CPU
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "128"))  # texts per encoder pass
+EMBED_BLOCK = 4096           # texts per encode call: bounded memory + progress output
+PARALLEL_MIN_FILES = 16      # below this a process pool costs more than it saves
+DEFAULT_WRITE_BATCH = 5000   # used if the client cannot report its limit
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
 
 
-def load_documents():
-    """Load all Markdown documents from the knowledge base directory."""
-    loader = DirectoryLoader(
-        KNOWLEDGE_BASE_DIR,
-        glob="**/*.md",
-        loader_cls=TextLoader,
-        loader_kwargs={"encoding": "utf-8"},
-        show_progress=True,
-    )
-    docs = loader.load()
-    print(f"Loaded {len(docs)} documents from {KNOWLEDGE_BASE_DIR}")
-    return docs
-
-
-def split_documents(docs):
-    """Split documents into smaller chunks for embedding."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=150,
+# ── Loading & splitting ──────────────────────────────────────────────
+def make_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         separators=["\n## ", "\n### ", "\n#### ", "\n\n", "\n", ". ", " "],
         length_function=len,
     )
-    chunks = splitter.split_documents(docs)
-    print(f"Split into {len(chunks)} chunks (chunk_size=800, overlap=150)")
+
+
+def list_documents(kb_dir: str = KNOWLEDGE_BASE_DIR):
+    """Markdown files under ``kb_dir`` in a stable order (same paths as DirectoryLoader)."""
+    return sorted(glob.glob(os.path.join(kb_dir, "**", "*.md"), recursive=True))
+
+
+def _load_and_split_file(path: str):
+    # Runs in a worker process: read one file and split it
+    docs = TextLoader(path, encoding="utf-8").load()
+    return make_splitter().split_documents(docs)
+
+
+def load_and_split(kb_dir: str = KNOWLEDGE_BASE_DIR, workers: int = INGEST_WORKERS):
+    """Load and split every document, on a process pool for large corpora."""
+    paths = list_documents(kb_dir)
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    if workers <= 1 or len(paths) < PARALLEL_MIN_FILES:
+        workers = 1
+        per_file = [_load_and_split_file(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(paths) // (workers * 4))
+            per_file = list(pool.map(_load_and_split_file, paths, chunksize=chunksize))
+    chunks = [chunk for file_chunks in per_file for chunk in file_chunks]
+    print(f"Loaded {len(paths)} documents from {kb_dir} and split into {len(chunks)} chunks "
+          f"(chunk_size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP}, {workers} process(es))")
     return chunks
 
 
-def build_vectorstore(chunks):
-    """Create ChromaDB vector store from document chunks."""
-    print(f"Loading embedding model: {EMBEDDING_MODEL}")
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
-        model_kwargs={"device": "cpu"},  # Use CPU for embeddings (small model)
-        encode_kwargs={"normalize_embeddings": True},
+# ── Embedding ────────────────────────────────────────────────────────
+def embed_texts(embedder: EmbeddingService, texts, batch_size: int = INGEST_BATCH_SIZE):
+    """Encode ``texts`` longest-first so every padded batch holds similar lengths.
+
+    Returns one float32 row per text in input order.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    out = None
+    for start in range(0, len(order), EMBED_BLOCK):
+        idx = order[start:start + EMBED_BLOCK]
+        vectors = embedder.encode([texts[i] for i in idx], batch_size=batch_size)
+        if out is None:
+            out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        out[idx] = vectors
+        if len(order) > EMBED_BLOCK:
+            print(f"  embedded {min(start + EMBED_BLOCK, len(order))}/{len(order)}")
+    return out
+
+
+# ── Incremental indexing ─────────────────────────────────────────────
+def chunk_hash(source: str, text: str) -> str:
+    """Content key of one chunk: same file + same text = same vector."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def keyed_chunks(chunks):
+    """Return ``[(id, hash, chunk)]``; repeated identical chunks get ``-n`` suffixes."""
+    seen = {}
+    keyed = []
+    for chunk in chunks:
+        digest = chunk_hash(chunk.metadata.get("source", ""), chunk.page_content)
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        keyed.append((digest if n == 0 else f"{digest}-{n}", digest, chunk))
+    return keyed
+
+
+def _collection_names(client):
+    # chromadb >= 0.6 returns names, older versions Collection objects
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+
+def _write_batch_size(client) -> int:
+    if hasattr(client, "get_max_batch_size"):
+        return client.get_max_batch_size()
+    return getattr(client, "max_batch_size", DEFAULT_WRITE_BATCH)
+
+
+def read_live_vectors(client, name: str) -> dict:
+    """Map chunk hash -> embedding for everything in the live collection."""
+    if name not in _collection_names(client):
+        return {}
+    collection = client.get_collection(name)
+    page = _write_batch_size(client)
+    vectors = {}
+    offset = 0
+    while True:
+        batch = collection.get(
+            include=["documents", "metadatas", "embeddings"], limit=page, offset=offset
+        )
+        if not batch["ids"]:
+            break
+        embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        for doc, meta, emb in zip(batch["documents"], batch["metadatas"], embeddings):
+            meta = meta or {}
+            # Stores written by the original builder have no hash in metadata
+            digest = meta.get("chunk_hash") or chunk_hash(meta.get("source", ""), doc)
+            vectors[digest] = emb
+        offset += len(batch["ids"])
+    return vectors
+
+
+def _rate(n: int, seconds: float) -> str:
+    return f"{n / seconds:,.0f} chunks/sec" if seconds > 0 else "-"
+
+
+# ── NumPy index export ───────────────────────────────────────────────
+def index_is_current(index_dir: str, name: str, dtype: str = VECTOR_INDEX_DTYPE) -> bool:
+    active = read_active_collection(index_dir)
+    return (
+        active["collection"] == name
+        and active.get("dtype") == dtype
+        and os.path.isfile(os.path.join(active_index_path(index_dir), "manifest.json"))
     )
 
-    # Remove old vector store if it exists
-    if os.path.exists(CHROMA_PERSIST_DIR):
-        import shutil
-        shutil.rmtree(CHROMA_PERSIST_DIR)
-        print(f"Removed existing vector store at {CHROMA_PERSIST_DIR}")
-
-    print("Building ChromaDB vector store (this may take a minute)...")
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        collection_name=COLLECTION_NAME,
-        persist_directory=CHROMA_PERSIST_DIR,
+
+def export_vector_index(keyed, embeddings: dict, manifest: dict,
+                        index_dir: str = VECTOR_INDEX_DIR,
+                        dtype: str = VECTOR_INDEX_DTYPE) -> None:
+    """Write the collection in ``manifest`` as a NumPy index and switch to it.
+
+    The index goes to a new directory; the one the pointer named is kept
+    for one generation, like the previous Chroma collection.
+    """
+    name = manifest["collection"]
+    previous = os.path.basename(active_index_path(index_dir))
+    directory = f"{name}-{dtype}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(index_dir, directory)
+    write_index(
+        path,
+        np.stack([embeddings[digest] for _, digest, _ in keyed]) if keyed
+        else np.zeros((0, 0), dtype=np.float32),
+        [c.page_content for _, _, c in keyed],
+        [c.metadata.get("source", "unknown") for _, _, c in keyed],
+        dtype=dtype,
+        manifest=manifest,
     )
+    write_active_collection(index_dir, {**manifest, "dtype": dtype, "directory": directory})
+    size_mb = sum(
+        os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+    ) / 1e6
+    print(f"Exported NumPy index '{name}' to {path} ({dtype}, {size_mb:.1f} MB)")
+    for entry in os.listdir(index_dir):
+        if entry not in (directory, previous) and os.path.isdir(os.path.join(index_dir, entry)):
+            shutil.rmtree(os.path.join(index_dir, entry), ignore_errors=True)
+            print(f"Deleted stale NumPy index '{entry}'")
+
+
+def build_vectorstore(
+    chunks,
+    full: bool = False,
+    batch_size: int = INGEST_BATCH_SIZE,
+    persist_dir: str = CHROMA_PERSIST_DIR,
+    sanity_check: bool = True,
+    index_dir: Optional[str] = VECTOR_INDEX_DIR,
+) -> dict:
+    """Update the vector store so it holds exactly ``chunks``; return timing stats.
+
+    With ``index_dir`` set the result is also exported as a NumPy index.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    client = chromadb.PersistentClient(path=persist_dir)
+    active = read_active_collection(persist_dir)
+    live_name = active["collection"]
+    same_model = active.get("embedding_model", EMBEDDING_MODEL) == EMBEDDING_MODEL
+
+    keyed = keyed_chunks(chunks)
+    live = read_live_vectors(client, live_name) if same_model and not full else {}
+    current = {digest for _, digest, _ in keyed}
+    new = {}
+    for _, digest, chunk in keyed:
+        if digest not in live:
+            new.setdefault(digest, chunk.page_content)
+    removed = len(set(live) - current)
+    print(f"Live collection '{live_name}': {len(live)} reusable vectors")
+    print(f"Chunks: {len(keyed) - len(new)} unchanged, {len(new)} new/changed, {removed} removed")
+    stats = {"collection": live_name, "chunks": len(keyed), "embedded": len(new),
+             "embed_sec": 0.0, "write_sec": 0.0}
 
-    # Quick sanity check
-    count = vectorstore._collection.count()
-    print(f"Vector store built successfully with {count} vectors")
-    print(f"Persisted to: {CHROMA_PERSIST_DIR}")
+    if live and not new and not removed:
+        print("Vector store is already up to date.")
+        if index_dir and not index_is_current(index_dir, live_name):
+            export_vector_index(keyed, live, {**active, "collection": live_name,
+                                              "embedding_model": EMBEDDING_MODEL}, index_dir)
+        return stats
 
-    # Test retrieval
-    print("\n--- Sanity Check: Test Query ---")
-    test_query = "What is the eligibility criteria for a home loan?"
-    results = vectorstore.similarity_search_with_score(test_query, k=3)
-    for i, (doc, score) in enumerate(results):
-        source = os.path.basename(doc.metadata.get("source", "unknown"))
-        print(f"  [{i+1}] score={score:.4f} | source={source}")
-        print(f"      {doc.page_content[:120]}...")
-    print("--- Done ---")
+    embedder = None
+    embeddings = live
+    if new:
+        print(f"Embedding {len(new)} chunks with {EMBEDDING_MODEL} (batch_size={batch_size})")
+        embedder = EmbeddingService(EMBEDDING_MODEL)
+        t0 = time.perf_counter()
+        vectors = embed_texts(embedder, list(new.values()), batch_size)
+        stats["embed_sec"] = time.perf_counter() - t0
+        embeddings.update(zip(new.keys(), vectors))
+        print(f"Embedded {len(new)} chunks in {stats['embed_sec']:.1f}s "
+              f"({_rate(len(new), stats['embed_sec'])})")
 
-    return vectorstore
+    # Build the complete index in a staging collection readers do not use yet
+    generation = int(active.get("generation", 0)) + 1
+    staging_name = f"{COLLECTION_NAME}_g{generation}"
+    if staging_name in _collection_names(client):  # left over from a failed run
+        client.delete_collection(staging_name)
+    staging = client.create_collection(staging_name, embedding_function=None)
+    write_batch = _write_batch_size(client)
+    print(f"Writing {len(keyed)} vectors to staging collection '{staging_name}' "
+          f"in batches of {write_batch}...")
+    t0 = time.perf_counter()
+    for start in range(0, len(keyed), write_batch):
+        batch = keyed[start:start + write_batch]
+        staging.add(
+            ids=[cid for cid, _, _ in batch],
+            embeddings=np.stack([embeddings[digest] for _, digest, _ in batch]).tolist(),
+            documents=[c.page_content for _, _, c in batch],
+            metadatas=[{**c.metadata, "chunk_hash": digest} for _, digest, c in batch],
+        )
+    stats["write_sec"] = time.perf_counter() - t0
+    count = staging.count()
+    if count != len(keyed):
+        raise RuntimeError(f"Staging collection has {count} vectors, expected {len(keyed)}")
+    print(f"Wrote {count} vectors in {stats['write_sec']:.1f}s ({_rate(count, stats['write_sec'])})")
+
+    # Atomic switch, then drop everything older than the previous generation
+    manifest = {
+        "collection": staging_name,
+        "generation": generation,
+        "embedding_model": EMBEDDING_MODEL,
+        "chunks": count,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    write_active_collection(persist_dir, manifest)
+    stats["collection"] = staging_name
+    print(f"Switched {ACTIVE_POINTER} to '{staging_name}' ({count} vectors)")
+    for name in _collection_names(client):
+        is_index = name == COLLECTION_NAME or name.startswith(COLLECTION_NAME + "_g")
+        if is_index and name not in (staging_name, live_name):
+            client.delete_collection(name)
+            print(f"Deleted stale collection '{name}'")
+    if index_dir:
+        export_vector_index(keyed, embeddings, manifest, index_dir)
+
+    if sanity_check:
+        # Quick sanity check against the new collection
+        print("\n--- Sanity Check: Test Query ---")
+        test_query = "What is the eligibility criteria for a home loan?"
+        embedder = embedder or EmbeddingService(EMBEDDING_MODEL)
+        results = staging.query(
+            query_embeddings=[embedder.encode([test_query])[0].tolist()],
+            n_results=3,
+            include=["documents", "metadatas", "distances"],
+        )
+        for i, (doc, meta, score) in enumerate(zip(
+            results["documents"][0], results["metadatas"][0], results["distances"][0]
+        )):
+            source = os.path.basename((meta or {}).get("source", "unknown"))
+            print(f"  [{i+1}] score={score:.4f} | source={source}")
+            print(f"      {doc[:120]}...")
+        print("--- Done ---")
+
+    return stats
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Build or update the RAG vector store")
+    parser.add_argument("--full", action="store_true", help="re-embed every chunk")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help="processes for loading/splitting (0 = one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                        help="texts per encoder forward pass")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("BFSI Knowledge Base → ChromaDB Vector Store Builder")
     print("=" * 60)
 
-    docs = load_documents()
-    if not docs:
+    t0 = time.perf_counter()
+    chunks = load_and_split(KNOWLEDGE_BASE_DIR, args.workers)
+    split_sec = time.perf_counter() - t0
+    if not chunks:
         print("ERROR: No documents found. Check the knowledge_base directory.")
         sys.exit(1)
+    print(f"Load + split: {split_sec:.1f}s ({_rate(len(chunks), split_sec)})")
 
-    chunks = split_documents(docs)
-    build_vectorstore(chunks)
-
+    stats = build_vectorstore(chunks, full=args.full, batch_size=args.batch_size)
+    total = time.perf_counter() - t0
+    print(f"\nTotal: {len(chunks)} chunks in {total:.1f}s ({_rate(len(chunks), total)}), "
+          f"{stats['embedded']} embedded")
     print("\n✓ Vector store is ready for RAG retrieval.")
 
 
@@ -0,0 +1,113 @@
+"""Merge the LoRA adapter into the base weights and export one checkpoint.
+
+Produces a standalone safetensors checkpoint at MERGED_MODEL_PATH that
+SLMEngine loads instead of base model + PeftModel, so start-up is a single
+load and inference has no extra LoRA matmuls.  A manifest.json records the
+base model, adapter hash and quantisation so stale artifacts are ignored.
+
+Usage:
+    python scripts/export_merged_model.py                     # fp16 weights
+    python scripts/export_merged_model.py --quantization nf4  # pre-quantised 4-bit (CUDA)
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import torch
+from dotenv import load_dotenv
+from peft import PeftModel
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+
+from src.slm_engine import BASE_MODEL, LORA_PATH, MERGED_MODEL_PATH, adapter_hash
+
+load_dotenv()
+
+
+def merge_adapter(merged_dir: str):
+    """Fold the LoRA weights into an fp16 copy of the base model."""
+    print(f"\n[1/3] Loading base model {BASE_MODEL} (fp16) ...")
+    model = AutoModelForCausalLM.from_pretrained(
+        BASE_MODEL,
+        torch_dtype=torch.float16,
+        low_cpu_mem_usage=True,
+        trust_remote_code=True,
+    )
+    print(f"\n[2/3] Merging LoRA adapter from {LORA_PATH} ...")
+    model = PeftModel.from_pretrained(model, LORA_PATH).merge_and_unload()
+    model.save_pretrained(merged_dir, safe_serialization=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export merged BFSI model")
+    parser.add_argument("--quantization", choices=["fp16", "nf4"], default="fp16")
+    parser.add_argument("--output", default=MERGED_MODEL_PATH)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("LoRA merge & export  ->  standalone inference artifact")
+    print("=" * 60)
+
+    if not os.path.isdir(LORA_PATH):
+        print(f"ERROR: No LoRA adapter found at {LORA_PATH}. Run scripts/train.py first.")
+        sys.exit(1)
+
+    parent = os.path.dirname(args.output) or "."
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix="bfsi-merged-", dir=parent)
+    try:
+        if args.quantization == "fp16":
+            merge_adapter(staging)
+        else:
+            if not torch.cuda.is_available():
+                print("ERROR: nf4 export needs a CUDA GPU (bitsandbytes).")
+                sys.exit(1)
+            with tempfile.TemporaryDirectory() as fp16_dir:
+                merge_adapter(fp16_dir)
+                print("\n      Re-loading merged weights with NF4 quantisation ...")
+                model = AutoModelForCausalLM.from_pretrained(
+                    fp16_dir,
+                    quantization_config=BitsAndBytesConfig(
+                        load_in_4bit=True,
+                        bnb_4bit_quant_type="nf4",
+                        bnb_4bit_compute_dtype=torch.float16,
+                        bnb_4bit_use_double_quant=True,
+                    ),
+                    device_map="auto",
+                )
+                model.save_pretrained(staging, safe_serialization=True)
+
+        print("\n[3/3] Writing tokenizer and manifest ...")
+        AutoTokenizer.from_pretrained(BASE_MODEL, trust_remote_code=True).save_pretrained(staging)
+        with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "base_model": BASE_MODEL,
+                    "adapter_path": LORA_PATH,
+                    "adapter_hash": adapter_hash(LORA_PATH),
+                    "quantization": args.quantization,
+                    "format": "safetensors",
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                f,
+                indent=2,
+            )
+
+        # Replace the previous artifact only once the new one is complete
+        if os.path.isdir(args.output):
+            shutil.rmtree(args.output)
+        os.replace(staging, args.output)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+
+    print(f"\n  Merged model saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
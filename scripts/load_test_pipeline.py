@@ -0,0 +1,121 @@
+"""Load test: Tier 1 tail latency under mixed traffic.
+
+Fires a Poisson stream of queries – mostly curated-dataset questions plus
+a share that needs SLM generation – at the pipeline in two modes:
+
+  blocking  every request runs ``pipeline.run`` on one shared worker pool
+            (the old behaviour: dataset hits wait behind generations)
+  async     every request awaits ``pipeline.arun``
+
+and reports p50/p95/p99 latency per tier.  Uses the stub engines by
+default so it runs anywhere; ``--real`` loads the actual models.
+
+Usage:
+    python scripts/load_test_pipeline.py [--rps 20] [--duration 10] [--slm-share 0.3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.guardrails import Guardrails
+from src.pipeline import GENERATION_WORKERS, BFSIPipeline
+
+DATASET_PATH = os.path.join("data", "alpaca_bfsi_dataset.json")
+SLM_QUERIES = [
+    "Write an email to a customer explaining a delayed loan disbursement.",
+    "Draft a reply to a customer asking why their card was blocked abroad.",
+    "Can you explain how a floating interest rate affects my EMI over time?",
+    "What should I consider before taking a top-up on my existing home loan?",
+]
+
+
+def build_pipeline(real: bool) -> BFSIPipeline:
+    if not real:
+        from src.stub_engines import StubDatasetMatcher, StubRAGEngine, StubSLMEngine
+        return BFSIPipeline(
+            StubDatasetMatcher(), StubSLMEngine(), StubRAGEngine(), Guardrails()
+        )
+    from src.batching import MicroBatchScheduler
+    from src.dataset_matcher import DatasetMatcher
+    from src.embeddings import EmbeddingService
+    from src.rag_engine import RAGEngine
+    from src.slm_engine import SLMEngine
+    embedder = EmbeddingService()
+    return BFSIPipeline(
+        DatasetMatcher(embedder=embedder),
+        MicroBatchScheduler(SLMEngine(use_lora=True)),
+        RAGEngine(embedder=embedder),
+        Guardrails(),
+    )
+
+
+def _percentiles(samples):
+    if not samples:
+        return "      -        -        -"
+    p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+    return f"{p50:8.1f} {p95:8.1f} {p99:8.1f}"
+
+
+async def _drive(pipeline, mode, queries, rps, seed):
+    loop = asyncio.get_running_loop()
+    blocking_pool = ThreadPoolExecutor(max_workers=GENERATION_WORKERS)
+    rng = random.Random(seed)
+    latencies = {}
+
+    async def _one(query):
+        t0 = time.perf_counter()
+        if mode == "async":
+            result = await pipeline.arun(query)
+        else:
+            result = await loop.run_in_executor(blocking_pool, pipeline.run, query)
+        latencies.setdefault(result["tier_used"], []).append(time.perf_counter() - t0)
+
+    tasks = []
+    for query in queries:
+        tasks.append(asyncio.create_task(_one(query)))
+        await asyncio.sleep(rng.expovariate(rps))
+    await asyncio.gather(*tasks)
+    blocking_pool.shutdown()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic pipeline load test")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic")
+    parser.add_argument("--slm-share", type=float, default=0.3)
+    parser.add_argument("--real", action="store_true", help="load the real models")
+    args = parser.parse_args()
+
+    with open(DATASET_PATH, "r", encoding="utf-8") as f:
+        faq = [s["instruction"] for s in json.load(f)]
+    rng = random.Random(0)
+    queries = [
+        rng.choice(SLM_QUERIES) if rng.random() < args.slm_share else rng.choice(faq)
+        for _ in range(int(args.rps * args.duration))
+    ]
+
+    pipeline = build_pipeline(args.real)
+    print("=" * 60)
+    print(f"Load test: {len(queries)} queries at {args.rps} rps, "
+          f"{args.slm_share:.0%} need generation")
+    print("=" * 60)
+    print(f"\n{'mode':<10}{'tier':<10}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for mode in ("blocking", "async"):
+        latencies = asyncio.run(_drive(pipeline, mode, queries, args.rps, seed=1))
+        for tier in sorted(latencies):
+            print(f"{mode:<10}{tier:<10}{len(latencies[tier]):>6} {_percentiles(latencies[tier])}")
+    pipeline.close()
+
+
+if __name__ == "__main__":
+    main()
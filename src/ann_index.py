@@ -0,0 +1,144 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index for Tier 1.
+
+Exact search scores every row of the instruction matrix per query, which
+is fine for a few thousand curated answers but not for the hundreds of
+thousands of historic-ticket Q&A pairs Tier 1 is meant to grow into.
+The IVF index partitions the unit-norm rows into ``n_lists`` clusters
+(spherical k-means on a sample) and only scores the rows of the
+``nprobe`` clusters whose centroids are closest to the query:
+
+  nprobe   recall / latency knob – more lists probed, higher recall@1,
+           more rows scored (``nprobe = n_lists`` is exact search)
+
+The index stores only the centroids and a permutation of row ids grouped
+by cluster; vectors are gathered from the (memory-mapped) embedding
+matrix it was built on, so it adds ~4 bytes per row.  It is persisted as
+an ``.npz`` next to the ``EmbeddingCache`` matrix it was built from.
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64   # training rows per centroid
+ASSIGN_BLOCK = 65536          # rows scored against the centroids at once
+
+
+def default_lists(n_rows: int) -> int:
+    """Number of clusters for ``n_rows`` vectors (~sqrt(N), as usual for IVF)."""
+    return max(1, int(round(np.sqrt(n_rows))))
+
+
+def _assign(vectors, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid for every row, computed block-wise."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = np.asarray(vectors[start:start + ASSIGN_BLOCK], dtype=np.float32)
+        out[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def _normalise(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def train_centroids(
+    vectors, n_lists: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means on a random sample of ``vectors``; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    n_lists = min(n_lists, n)
+    sample_size = min(n, n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(
+        vectors[np.sort(rng.choice(n, size=sample_size, replace=False))], dtype=np.float32
+    )
+    centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+        filled = counts > 0
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        # Re-seed empty clusters from random sample rows
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(sample_size, size=len(empty), replace=False)]
+        centroids = _normalise(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Top-1 inner-product search over the rows of ``vectors`` via IVF lists."""
+
+    def __init__(self, vectors, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.order = order        # row ids grouped by list, ascending within a list
+        self.offsets = offsets    # list l holds order[offsets[l]:offsets[l + 1]]
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, n_lists: int = 0, iterations: int = KMEANS_ITERATIONS,
+              seed: int = 0) -> "IVFIndex":
+        centroids = train_centroids(vectors, n_lists or default_lists(len(vectors)),
+                                    iterations, seed)
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=offsets[1:])
+        return cls(vectors, centroids, order, offsets)
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, vectors) -> Optional["IVFIndex"]:
+        """Load a saved index for ``vectors``; ``None`` if missing or for other rows."""
+        try:
+            with np.load(path) as data:
+                index = cls(vectors, data["centroids"], data["order"], data["offsets"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(index.order) != len(vectors) or index.centroids.shape[1] != vectors.shape[1]:
+            return None
+        return index
+
+    def search(self, queries, nprobe: int, quantized=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(best_row, best_score)`` arrays for a (B, dim) query matrix.
+
+        With ``quantized`` (a ``QuantizedVectors`` over the same rows) the
+        probed lists are scored by their codes and a shortlist re-ranked
+        in float, instead of reading every probed float row.
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        nprobe = max(1, min(nprobe, self.n_lists))
+        centroid_scores = q @ self.centroids.T
+        if nprobe < self.n_lists:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.n_lists), centroid_scores.shape)
+        best_rows = np.empty(len(q), dtype=np.int64)
+        best_scores = np.empty(len(q), dtype=np.float32)
+        for b, lists in enumerate(probes):
+            rows = np.concatenate(
+                [self.order[self.offsets[l]:self.offsets[l + 1]] for l in np.sort(lists)]
+            )
+            if not len(rows):  # every probed list is empty – score everything
+                rows = self.order
+            if quantized is not None:
+                top_rows, top_scores = quantized.search_rows(q[b], rows, k=1)
+                best_rows[b], best_scores[b] = top_rows[0], top_scores[0]
+                continue
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ q[b]
+            j = int(np.argmax(scores))
+            best_rows[b], best_scores[b] = rows[j], scores[j]
+        return best_rows, best_scores
@@ -0,0 +1,233 @@
+"""Dynamic micro-batching for SLM generation.
+
+Concurrent callers each ask for a single generation.  ``MicroBatchScheduler``
+queues those requests, waits at most ``max_wait_ms`` for more to arrive
+(up to ``max_batch_size``) and runs them as one left-padded
+``SLMEngine.generate_batch`` call, then hands each decoded answer back to
+its caller.  It exposes the same ``generate`` signature as ``SLMEngine`` so
+the pipeline can use it as a drop-in replacement.
+
+Batched generation cannot use assisted decoding, so when the engine has
+``SLM_SPECULATIVE`` enabled a request that ends up alone in its group is
+sent through ``SLMEngine.generate`` instead and still speculates.
+
+Streaming generations run unbatched on a producer thread that holds the
+model lock only while the model decodes; text reaches the caller through
+a queue, so a slow or departed reader never blocks other generations.
+"""
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_BATCH_SIZE = int(os.getenv("SLM_SCHEDULER_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.getenv("SLM_SCHEDULER_MAX_WAIT_MS", "10"))
+
+_STREAM_END = object()
+
+
+class _Request:
+    __slots__ = ("query", "rag_context", "max_new_tokens", "temperature", "deadline", "future")
+
+    def __init__(self, query, rag_context, max_new_tokens, temperature, deadline=None):
+        self.query = query
+        self.rag_context = rag_context
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.deadline = deadline
+        self.future: Future = Future()
+
+
+class MicroBatchScheduler:
+    """Collect concurrent ``generate`` calls into batched model calls."""
+
+    def __init__(
+        self,
+        engine,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+    ):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        # Serialises every model call, including pass-through generate_batch
+        self._model_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.batch_sizes: Counter = Counter()
+        self._worker = threading.Thread(
+            target=self._loop, name="slm-micro-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def __getattr__(self, name):
+        # Delegate everything else (temperature, version, tokenizer, ...) to the engine
+        return getattr(self.engine, name)
+
+    # ── Public API ────────────────────────────────────────────────────
+    def generate(
+        self,
+        query: str,
+        rag_context: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        """Queue one generation and block until its batch has been decoded.
+
+        Rows with different deadlines still share a batch; each one is cut
+        off at its own ``deadline`` (``None`` is returned for it).
+        """
+        request = _Request(query, rag_context, max_new_tokens, temperature, deadline)
+        self._queue.put(request)
+        with self._stats_lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return request.future.result()
+
+    def generate_batch(self, queries: List[str], **kwargs) -> List[str]:
+        """Already-batched work goes straight to the engine."""
+        with self._model_lock:
+            return self.engine.generate_batch(queries, **kwargs)
+
+    def generate_stream(self, *args, **kwargs) -> Iterator[str]:
+        """Stream one unbatched generation, TextIteratorStreamer-style.
+
+        A producer thread runs the engine's stream under the model lock and
+        queues the text; the lock is never held across a ``yield`` to the
+        caller.  If the caller stops reading, the producer still drains the
+        engine (bounded by the token budget) so the lock covers the whole
+        model call, but discards the text.
+        """
+        chunks: "queue.Queue" = queue.Queue()
+        abandoned = threading.Event()
+
+        def _produce():
+            try:
+                with self._model_lock:
+                    for text in self.engine.generate_stream(*args, **kwargs):
+                        if not abandoned.is_set():
+                            chunks.put(text)
+            except Exception as exc:  # re-raised in the consumer
+                chunks.put(exc)
+            finally:
+                chunks.put(_STREAM_END)
+
+        # Copy the context so engine spans still reach the caller's trace
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run, args=(_produce,), name="slm-stream", daemon=True
+        ).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            abandoned.set()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = sum(size * n for size, n in self.batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": total / self.batches if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            }
+
+    def close(self) -> None:
+        """Stop the worker thread after the queued requests are served."""
+        self._queue.put(None)
+        self._worker.join()
+
+    # ── Worker ────────────────────────────────────────────────────────
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:  # shutdown sentinel – finish this batch first
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+
+            # Requests can only share a generate call if their decoding settings match
+            groups = {}
+            for request in batch:
+                groups.setdefault((request.max_new_tokens, request.temperature), []).append(request)
+
+            for (max_new_tokens, temperature), requests in groups.items():
+                with self._stats_lock:
+                    self.batches += 1
+                    self.batch_sizes[len(requests)] += 1
+                if len(requests) == 1 and self._speculates():
+                    self._generate_one(requests[0])
+                    continue
+                kwargs = {"temperature": temperature, "batch_size": len(requests)}
+                if any(r.deadline is not None for r in requests):
+                    kwargs["deadlines"] = [r.deadline for r in requests]
+                if max_new_tokens is not None:
+                    kwargs["max_new_tokens"] = max_new_tokens
+                try:
+                    with self._model_lock:
+                        outputs = self.engine.generate_batch(
+                            [r.query for r in requests],
+                            rag_contexts=[r.rag_context for r in requests],
+                            **kwargs,
+                        )
+                except Exception as exc:  # propagate to every waiting caller
+                    for r in requests:
+                        r.future.set_exception(exc)
+                    continue
+                for r, out in zip(requests, outputs):
+                    r.future.set_result(out)
+
+    def _speculates(self) -> bool:
+        return getattr(self.engine, "speculative", "off") != "off"
+
+    def _generate_one(self, request: _Request) -> None:
+        """Serve a lone request with ``generate`` so assisted decoding applies."""
+        try:
+            with self._model_lock:
+                out = self.engine.generate(
+                    request.query,
+                    rag_context=request.rag_context,
+                    max_new_tokens=request.max_new_tokens,
+                    temperature=request.temperature,
+                    deadline=request.deadline,
+                )
+        except Exception as exc:  # propagate to the waiting caller
+            request.future.set_exception(exc)
+            return
+        request.future.set_result(out)
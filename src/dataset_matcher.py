@@ -4,40 +4,169 @@ Embeds the Alpaca dataset instructions using SentenceTransformers and
 performs cosine-similarity search at query time.  If the best match
 exceeds DATASET_MATCH_THRESHOLD the cached output is returned directly,
 bypassing the SLM and RAG layers.
+
+Instruction embeddings are persisted through ``EmbeddingCache`` so a
+cold start only memory-maps the matrix instead of re-encoding it.
+
+For large datasets an inverted-file ANN index (``src/ann_index.py``) can
+replace the exact scan: ``DATASET_ANN=ivf`` enables it once the dataset
+has ``DATASET_ANN_MIN_ROWS`` rows (smaller ones stay exact), and
+``DATASET_ANN_NPROBE`` trades recall for latency.  The index is persisted
+next to the cached embedding matrix.
+
+``DATASET_QUANTIZATION=int8|binary`` makes the search read compact codes
+instead of the float matrix and re-rank a shortlist in float
+(``src/quantization.py``); the codes are persisted the same way.  The two
+combine: with the IVF index active, the rows of the probed lists are
+scored by their codes; otherwise the codes replace the exact scan.
 """
 import json
 import os
+from typing import Optional
 
 import numpy as np
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+
+from src.ann_index import IVFIndex, default_lists
+from src.embedding_cache import EmbeddingCache
+from src.embeddings import EmbeddingService
+from src.quantization import QUANT_MODES, QuantizedVectors
+from src.response_cache import path_signature
 
 load_dotenv()
 
 DATASET_PATH = os.path.join("data", "alpaca_bfsi_dataset.json")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
 THRESHOLD = float(os.getenv("DATASET_MATCH_THRESHOLD", "0.85"))
+DATASET_ANN = os.getenv("DATASET_ANN", "off")  # "off" | "ivf"
+ANN_MIN_ROWS = int(os.getenv("DATASET_ANN_MIN_ROWS", "20000"))  # exact search below this
+ANN_NPROBE = int(os.getenv("DATASET_ANN_NPROBE", "16"))         # IVF lists scored per query
+ANN_LISTS = int(os.getenv("DATASET_ANN_LISTS", "0"))            # 0 = ~sqrt(rows)
+DATASET_QUANTIZATION = os.getenv("DATASET_QUANTIZATION", "none")  # "none" | "int8" | "binary"
 
 
 class DatasetMatcher:
     """Find the closest pre-curated answer from the Alpaca dataset."""
 
-    def __init__(self, dataset_path: str = DATASET_PATH, model_name: str = EMBEDDING_MODEL):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        dataset_path: str = DATASET_PATH,
+        model_name: str = EMBEDDING_MODEL,
+        use_cache: bool = True,
+        embedder: Optional[EmbeddingService] = None,
+        ann: str = DATASET_ANN,
+        nprobe: int = ANN_NPROBE,
+        quantization: str = DATASET_QUANTIZATION,
+    ):
+        if ann not in ("off", "ivf"):
+            raise ValueError(f"Unknown DATASET_ANN: {ann}")
+        if quantization not in QUANT_MODES:
+            raise ValueError(f"Unknown DATASET_QUANTIZATION: {quantization}")
+        self.embedder = embedder or EmbeddingService(model_name)
+        self.model = self.embedder.model
+        self.dataset_path = dataset_path
         with open(dataset_path, "r", encoding="utf-8") as f:
             self.dataset = json.load(f)
-        # Pre-compute instruction embeddings
+        # Pre-compute (or load cached) instruction embeddings
         instructions = [s["instruction"] for s in self.dataset]
-        self.instruction_embeddings = self.model.encode(
-            instructions, normalize_embeddings=True, show_progress_bar=False
-        )
-
-    def search(self, query: str, threshold: float = THRESHOLD):
-        """Return (answer, score) if above threshold, else (None, score)."""
-        query_emb = self.model.encode([query], normalize_embeddings=True)
-        scores = np.dot(self.instruction_embeddings, query_emb.T).flatten()
-        best_idx = int(np.argmax(scores))
-        best_score = float(scores[best_idx])
+        cache = EmbeddingCache() if use_cache else None
+        if cache is not None:
+            self.instruction_embeddings = cache.load_or_build(
+                instructions, self.embedder.model_name, self.embedder.encode,
+                dataset_key=dataset_path,
+            )
+        else:
+            self.instruction_embeddings = self.embedder.encode(instructions)
+        matrix_path = cache.matrix_path if cache else None
+        self.nprobe = nprobe
+        self.ann_index = None
+        self.quantized = None
+        if ann == "ivf" and len(self.instruction_embeddings) >= ANN_MIN_ROWS:
+            self.ann_index = self._load_ann_index(matrix_path)
+        if quantization != "none":
+            self.quantized = QuantizedVectors.load_or_build(
+                self.instruction_embeddings, quantization,
+                os.path.splitext(matrix_path)[0] if matrix_path else None,
+            )
+            print(f"[DatasetMatcher] Using {quantization} codes "
+                  f"({self.quantized.nbytes / 1e6:.1f} MB vs "
+                  f"{self.instruction_embeddings.nbytes / 1e6:.1f} MB float)")
+
+    def _load_ann_index(self, matrix_path: Optional[str]) -> IVFIndex:
+        """Load the IVF index saved next to ``matrix_path``, or build (and save) it."""
+        n_lists = ANN_LISTS or default_lists(len(self.instruction_embeddings))
+        path = f"{os.path.splitext(matrix_path)[0]}-ivf{n_lists}.npz" if matrix_path else None
+        index = IVFIndex.load(path, self.instruction_embeddings) if path else None
+        if index is None:
+            print(f"[DatasetMatcher] Building IVF index ({n_lists} lists) over "
+                  f"{len(self.instruction_embeddings)} rows...")
+            index = IVFIndex.build(self.instruction_embeddings, n_lists)
+            if path:
+                index.save(path)
+        print(f"[DatasetMatcher] Using IVF index: {index.n_lists} lists, nprobe={self.nprobe}")
+        return index
+
+    @property
+    def version(self) -> str:
+        """Signature of the dataset file, used to invalidate response caches."""
+        return path_signature(self.dataset_path)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Return the normalised query vector shared with the other tiers."""
+        return self.embedder.encode([query])[0]
+
+    def embed_queries(self, queries) -> np.ndarray:
+        """Encode a batch of queries in one vectorised call."""
+        return self.embedder.encode(list(queries))
+
+    def search(
+        self,
+        query: str,
+        threshold: float = THRESHOLD,
+        query_embedding: Optional[np.ndarray] = None,
+    ):
+        """Return (answer, score) if above threshold, else (None, score).
+
+        Pass ``query_embedding`` to reuse a vector computed earlier in the
+        pipeline instead of encoding the query again.
+        """
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        if self.ann_index is not None:
+            rows, scores = self.ann_index.search(
+                query_embedding[None, :], self.nprobe, self.quantized
+            )
+            best_idx, best_score = int(rows[0]), float(scores[0])
+        elif self.quantized is not None:
+            rows, scores = self.quantized.search(query_embedding[None, :], k=1)
+            best_idx, best_score = int(rows[0, 0]), float(scores[0, 0])
+        else:
+            scores = np.dot(self.instruction_embeddings, query_embedding)
+            best_idx = int(np.argmax(scores))
+            best_score = float(scores[best_idx])
         if best_score >= threshold:
             return self.dataset[best_idx]["output"], best_score
         return None, best_score
+
+    def search_batch(self, query_embeddings: np.ndarray, threshold: float = THRESHOLD):
+        """Vectorised ``search`` for a (B, dim) matrix of query embeddings.
+
+        Returns a list of ``(answer | None, score)`` in input order.
+        """
+        if self.ann_index is not None:
+            best_idx, best_scores = self.ann_index.search(
+                query_embeddings, self.nprobe, self.quantized
+            )
+        elif self.quantized is not None:
+            rows, scores = self.quantized.search(query_embeddings, k=1)
+            best_idx, best_scores = rows[:, 0], scores[:, 0]
+        else:
+            scores = np.dot(self.instruction_embeddings, query_embeddings.T)  # (N, B)
+            best_idx = np.argmax(scores, axis=0)
+            best_scores = scores[best_idx, np.arange(scores.shape[1])]
+        results = []
+        for idx, score in zip(best_idx, best_scores):
+            score = float(score)
+            answer = self.dataset[int(idx)]["output"] if score >= threshold else None
+            results.append((answer, score))
+        return results
@@ -0,0 +1,162 @@
+"""Persistent embedding cache for the Tier 1 dataset matcher.
+
+Instruction embeddings are written to disk as a ``.npy`` matrix whose
+file name is keyed by the dataset (its path), the embedding model and
+a hash of the dataset content.  On start-up a matching file is memory-mapped instead of being
+re-encoded; when the dataset changes only the new or edited rows are
+sent through the encoder and the rest are copied from the previous file
+of the same dataset.  Each (dataset, model) pair has its own manifest, so
+several datasets can share one cache directory and model.
+Files derived from a matrix (e.g. the Tier 1 ANN index) are named after
+it and removed together with it.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import Callable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("data", "embedding_cache"))
+CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")  # "float32" | "float16"
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _model_slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+def _dataset_slug(dataset_key: str) -> str:
+    """Readable, collision-free file-name part for a dataset path."""
+    if not dataset_key:
+        return ""
+    digest = _hash_text(os.path.abspath(dataset_key))[:8]
+    return f"{_model_slug(os.path.basename(dataset_key))}-{digest}--"
+
+
+class EmbeddingCache:
+    """Memory-mapped ``.npy`` store keyed by dataset + model name + content hash."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, dtype: str = CACHE_DTYPE):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self.matrix_path: Optional[str] = None  # file behind the last load_or_build
+
+    # ── Paths ─────────────────────────────────────────────────────────
+    def _manifest_path(self, model_name: str, dataset_key: str) -> str:
+        name = _dataset_slug(dataset_key) + _model_slug(model_name) + ".json"
+        return os.path.join(self.cache_dir, name)
+
+    def _matrix_path(self, model_name: str, dataset_key: str, dataset_hash: str) -> str:
+        name = (f"{_dataset_slug(dataset_key)}{_model_slug(model_name)}"
+                f"-{self.dtype}-{dataset_hash[:16]}.npy")
+        return os.path.join(self.cache_dir, name)
+
+    def _read_manifest(self, model_name: str, dataset_key: str) -> Optional[dict]:
+        try:
+            with open(self._manifest_path(model_name, dataset_key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # ── Public API ────────────────────────────────────────────────────
+    def load_or_build(
+        self,
+        texts: List[str],
+        model_name: str,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        dataset_key: str = "",
+    ) -> np.ndarray:
+        """Return a read-only (memory-mapped) embedding matrix for ``texts``.
+
+        ``dataset_key`` names the dataset (e.g. its path) so that datasets
+        embedded with the same model keep separate files.  ``encode_fn`` is
+        only called for rows that are not already present in the previous
+        cache file for the same dataset and model.
+        """
+        row_hashes = [_hash_text(t) for t in texts]
+        dataset_hash = _hash_text("\n".join(row_hashes))
+        matrix_path = self._matrix_path(model_name, dataset_key, dataset_hash)
+        self.matrix_path = matrix_path
+
+        # 1. Exact hit – zero-copy load
+        if os.path.exists(matrix_path):
+            return np.load(matrix_path, mmap_mode="r")
+
+        # 2. Partial hit – reuse rows whose text is unchanged
+        previous = None
+        reuse = {}
+        manifest = self._read_manifest(model_name, dataset_key)
+        if manifest and manifest.get("dtype") == self.dtype:
+            prev_path = os.path.join(self.cache_dir, manifest.get("file", ""))
+            if os.path.isfile(prev_path):
+                previous = np.load(prev_path, mmap_mode="r")
+                for i, h in enumerate(manifest.get("row_hashes", [])):
+                    reuse.setdefault(h, i)
+
+        missing = [i for i, h in enumerate(row_hashes) if h not in reuse]
+        fresh = encode_fn([texts[i] for i in missing]) if missing else None
+        if fresh is not None:
+            dim = fresh.shape[1]
+        elif previous is not None:
+            dim = previous.shape[1]
+        else:
+            raise ValueError("Cannot build an embedding cache for an empty dataset.")
+
+        print(
+            f"[EmbeddingCache] Encoding {len(missing)} of {len(texts)} rows "
+            f"(reused {len(texts) - len(missing)})."
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = matrix_path + ".tmp"
+        out = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=self.dtype, shape=(len(texts), dim)
+        )
+        fresh_pos = {row: j for j, row in enumerate(missing)}
+        for i, h in enumerate(row_hashes):
+            if i in fresh_pos:
+                out[i] = fresh[fresh_pos[i]]
+            else:
+                out[i] = previous[reuse[h]]
+        out.flush()
+        del out
+        os.replace(tmp_path, matrix_path)
+
+        # Manifest is written last so readers never see it point at a
+        # half-written matrix.
+        manifest_path = self._manifest_path(model_name, dataset_key)
+        manifest_tmp = manifest_path + ".tmp"
+        with open(manifest_tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "model_name": model_name,
+                    "dataset": dataset_key,
+                    "dataset_hash": dataset_hash,
+                    "dtype": self.dtype,
+                    "file": os.path.basename(matrix_path),
+                    "row_hashes": row_hashes,
+                },
+                f,
+            )
+        os.replace(manifest_tmp, manifest_path)
+
+        if manifest and manifest.get("file") and manifest["file"] != os.path.basename(matrix_path):
+            previous = None
+            stale = os.path.join(self.cache_dir, manifest["file"])
+            for path in [stale] + glob.glob(os.path.splitext(stale)[0] + "-*"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # still mapped by another process (Windows) – harmless
+
+        return np.load(matrix_path, mmap_mode="r")
@@ -0,0 +1,41 @@
+"""Shared embedding service.
+
+A single SentenceTransformer instance used by both the Tier 1 dataset
+matcher and the Tier 3 RAG engine.  It implements the LangChain
+``Embeddings`` interface so it can be handed to Chroma directly, and a
+NumPy ``encode`` API for the dataset matcher.
+"""
+import os
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from sentence_transformers import SentenceTransformer
+
+from src import metrics
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+
+
+class EmbeddingService(Embeddings):
+    """One MiniLM encoder shared across tiers."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, device: str = "cpu"):
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Return L2-normalised float32 embeddings, one row per text."""
+        with metrics.span("embedding"):
+            return self.model.encode(
+                texts, batch_size=batch_size, normalize_embeddings=True, show_progress_bar=False
+            ).astype(np.float32)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
@@ -7,7 +7,7 @@ Implements pre-query and post-response guardrails as specified in the PRD:
   - Add compliance disclaimers where appropriate
 """
 import re
-from typing import Tuple
+from typing import Any, Iterable, Iterator, Optional, Tuple
 
 
 # ── Keywords / Patterns ──────────────────────────────────────────────
@@ -33,21 +33,29 @@ HARMFUL_INTENT_PATTERNS = [
     r"\b(bypass\s+kyc|fake\s+id|money\s+laundering)\b",
 ]
 
+_AADHAAR = r"\b\d{4}\s?\d{4}\s?\d{4}\b"
+
+# Applied in list order: a later rule never claims digits an earlier one
+# redacts.  The phone rule therefore may not run into the start of an
+# Aadhaar number after one of its separators.
 PII_PATTERNS = [
-    (r"\b\d{4}\s?\d{4}\s?\d{4}\b", "[AADHAAR_REDACTED]"),       # Aadhaar
+    (_AADHAAR, "[AADHAAR_REDACTED]"),                             # Aadhaar
     (r"\b[A-Z]{5}\d{4}[A-Z]\b", "[PAN_REDACTED]"),               # PAN
     (r"\b\d{9,18}\b", "[ACCOUNT_NUMBER_REDACTED]"),               # Account numbers
-    (r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b", "[PHONE_REDACTED]"),  # Phone (US-style)
+    (rf"\b\d{{3}}[-.\s]?(?!{_AADHAAR})\d{{3}}[-.\s]?(?!{_AADHAAR})\d{{4}}\b",
+     "[PHONE_REDACTED]"),                                          # Phone (US-style)
     (r"\b\d{10}\b", "[PHONE_REDACTED]"),                          # Indian phone
 ]
 
-# Phrases suggesting fabricated specifics
+# Phrases suggesting fabricated specifics (matched case-insensitively)
 FABRICATION_PATTERNS = [
-    r"(?i)\byour\s+(exact|specific)\s+(balance|amount|rate)\s+is\b",
-    r"(?i)\byour\s+account\s+number\s+is\b",
-    r"(?i)\byour\s+otp\s+is\b",
+    r"\byour\s+(exact|specific)\s+(balance|amount|rate)\s+is\b",
+    r"\byour\s+account\s+number\s+is\b",
+    r"\byour\s+otp\s+is\b",
 ]
 
+FABRICATION_REPLACEMENT = "[REDACTED — contact your branch for specifics]"
+
 OUT_OF_DOMAIN_RESPONSE = (
     "I'm sorry, but I can only help with banking, financial services, "
     "and insurance related queries. Could you please ask a BFSI-related "
@@ -61,6 +69,115 @@ HARMFUL_RESPONSE = (
     "I'm happy to help."
 )
 
+FINANCIAL_ADVICE_KEYWORDS = [
+    "interest rate", "emi", "premium", "tax benefit",
+    "loan amount", "eligibility", "credit score",
+]
+
+GREETINGS = (
+    "hi", "hello", "hey", "good morning", "good evening",
+    "thanks", "thank you", "bye", "help", "what can you do",
+)
+
+# Drafting / creative requests: they skip RAG (pipeline) and get the larger
+# drafting token budget (SLM engine)
+DRAFTING_PREFIXES = ("write", "draft", "compose", "generate", "suggest", "create")
+
+
+def is_drafting_task(query: str) -> bool:
+    """True if ``query`` asks for a drafted text (email, letter, ...)."""
+    return query.lower().strip().startswith(DRAFTING_PREFIXES)
+
+
+def _keyword_regex(words) -> str:
+    """Alternation of ``words`` factored into a prefix trie.
+
+    Matching is then one walk down the trie per text position instead of
+    one attempt per keyword.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def _emit(node):
+        branches = [re.escape(ch) + _emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ends here: whatever follows is optional
+        return "(?:" + body + ")?" if "" in node else body
+
+    return _emit(trie)
+
+
+# ── Compiled matchers ────────────────────────────────────────────────
+_BFSI_KEYWORD_RE = re.compile(_keyword_regex(BFSI_KEYWORDS))
+_HARMFUL_RE = re.compile("|".join(f"(?:{p})" for p in HARMFUL_INTENT_PATTERNS))
+
+# Every PII and fabrication rule as one named alternative, so a response
+# is redacted in a single scan.  All rules start at a word boundary with a
+# digit, a capital (PAN) or "your"; the guard in front lets the scanner
+# skip every other position without trying the alternatives.
+_REDACTIONS = [replacement for _, replacement in PII_PATTERNS]
+_REDACTIONS += [FABRICATION_REPLACEMENT] * len(FABRICATION_PATTERNS)
+_REDACTION_RE = re.compile(r"\b(?=[\dA-ZyY])(?:" + "|".join(
+    [f"(?P<r{i}>{pattern})" for i, (pattern, _) in enumerate(PII_PATTERNS)]
+    + [f"(?P<r{len(PII_PATTERNS) + i}>(?i:{pattern}))"
+       for i, pattern in enumerate(FABRICATION_PATTERNS)]
+) + ")")
+
+
+def _replace(match: "re.Match") -> str:
+    return _REDACTIONS[int(match.lastgroup[1:])]
+
+
+
+# ── Partial matches (streaming) ──────────────────────────────────────
+def _prefix_regex(parts) -> str:
+    """Regex for every non-empty prefix of a phrase.
+
+    ``parts`` is a sequence of words, lists of alternative words, or
+    ``r"\\s+"``; e.g. ``["your", r"\\s+", "otp"]`` matches "y", "you",
+    "your  o", ... up to "your otp".
+    """
+    if not parts:
+        return ""
+    head, rest = parts[0], _prefix_regex(parts[1:])
+    optional_rest = f"(?:{rest})?" if rest else ""
+    if head == r"\s+":
+        return head + optional_rest
+    branches = []
+    for word in ([head] if isinstance(head, str) else head):
+        regex = rest
+        for ch in reversed(word):
+            regex = re.escape(ch) + (f"(?:{regex})?" if regex else "")
+        branches.append(regex)
+    return "(?:" + "|".join(branches) + ")"
+
+
+# Every text that a rule in PII_PATTERNS / FABRICATION_PATTERNS could still
+# match once more characters arrive.  Anchored to the end of the buffer, the
+# leftmost hit is where a streaming sanitiser has to stop emitting.
+_AADHAAR_PARTIAL = r"\d{1,4}|\d{4}\s|\d{4}\s?\d{1,4}|\d{4}\s?\d{4}\s|\d{4}\s?\d{4}\s?\d{1,4}"
+_PARTIAL_PATTERNS = [
+    _AADHAAR_PARTIAL,                                                            # Aadhaar
+    r"[A-Z]{1,5}|[A-Z]{5}\d{1,4}|[A-Z]{5}\d{4}[A-Z]",                               # PAN
+    r"\d{1,18}",                                                                 # Account / phone
+    r"\d{3}[-.\s]|\d{3}[-.\s]?\d{1,3}|\d{3}[-.\s]?\d{3}[-.\s]|\d{3}[-.\s]?\d{3}[-.\s]?\d{1,4}",
+    # A phone number whose Aadhaar look-ahead still reads pending digits may
+    # yet be accepted or rejected, so it is held back as a whole.
+    rf"\d{{3}}[-.\s]?(?:{_AADHAAR_PARTIAL})|\d{{3}}[-.\s]?\d{{3}}[-.\s]?(?:{_AADHAAR_PARTIAL})",
+    "(?i:" + "|".join(_prefix_regex(phrase) for phrase in (
+        ["your", r"\s+", ["exact", "specific"], r"\s+", ["balance", "amount", "rate"], r"\s+", "is"],
+        ["your", r"\s+", "account", r"\s+", "number", r"\s+", "is"],
+        ["your", r"\s+", "otp", r"\s+", "is"],
+    )) + ")",                                                                    # Fabrication
+]
+_PENDING_RE = re.compile(r"\b(?:" + "|".join(_PARTIAL_PATTERNS) + r")\Z")
+
 DISCLAIMER = (
     "\n\n*Disclaimer: This information is for general guidance only. "
     "For specific rates, charges, or account-level details, please "
@@ -69,9 +186,51 @@ DISCLAIMER = (
 
 
 class Guardrails:
-    """Pre- and post-processing safety filters."""
+    """Pre- and post-processing safety filters.
+
+    With a ``DomainClassifier`` the domain check scores the query
+    embedding instead of scanning for keywords (``GUARDRAIL_MODE=embedding``).
+    """
+
+    def __init__(self, classifier: Optional[Any] = None):
+        self.classifier = classifier
 
     # ── Pre-query checks ──────────────────────────────────────────────
+    def check(self, query: str, query_embedding: Optional[Any] = None) -> Tuple[bool, str]:
+        """Pipeline entry point: ``check_query`` or the embedding classifier."""
+        if self.classifier is None or query_embedding is None:
+            return self.check_query(query)
+
+        is_valid, reason = self.check_rules(query)
+        if not is_valid:
+            return is_valid, reason
+
+        q_lower = query.lower().strip()
+        label, _ = self.classifier.classify(query_embedding)
+        if label == "harmful":
+            return False, HARMFUL_RESPONSE
+        if label == "out_of_domain":
+            if q_lower.startswith(GREETINGS):
+                return True, ""
+            return False, OUT_OF_DOMAIN_RESPONSE
+        return True, ""
+
+    def check_rules(self, query: str) -> Tuple[bool, str]:
+        """The text rules of ``check``, without computing an embedding.
+
+        ``check_query`` without a classifier; with one, only the empty-query
+        and harmful-term rules that the classifier cannot override.
+        """
+        if self.classifier is None:
+            return self.check_query(query)
+        q_lower = query.lower().strip()
+        if not q_lower:
+            return False, "Please enter a valid question."
+        # Explicit harmful terms stay a hard rule
+        if _HARMFUL_RE.search(q_lower):
+            return False, HARMFUL_RESPONSE
+        return True, ""
+
     @staticmethod
     def check_query(query: str) -> Tuple[bool, str]:
         """Validate the user query before processing.
@@ -87,45 +246,121 @@ class Guardrails:
             return False, "Please enter a valid question."
 
         # 2. Harmful intent
-        for pattern in HARMFUL_INTENT_PATTERNS:
-            if re.search(pattern, q_lower):
-                return False, HARMFUL_RESPONSE
+        if _HARMFUL_RE.search(q_lower):
+            return False, HARMFUL_RESPONSE
 
         # 3. Domain check – at least one BFSI keyword should appear
-        if not any(kw in q_lower for kw in BFSI_KEYWORDS):
+        if not _BFSI_KEYWORD_RE.search(q_lower):
             # Allow greetings / meta questions through
-            greetings = ["hi", "hello", "hey", "good morning", "good evening",
-                         "thanks", "thank you", "bye", "help", "what can you do"]
-            if any(q_lower.startswith(g) or q_lower == g for g in greetings):
+            if q_lower.startswith(GREETINGS):
                 return True, ""
             return False, OUT_OF_DOMAIN_RESPONSE
 
         return True, ""
 
     # ── Post-response checks ─────────────────────────────────────────
+    @staticmethod
+    def _redact(text: str) -> str:
+        """Apply the PII and fabrication rules in one pass."""
+        return _REDACTION_RE.sub(_replace, text)
+
+    @staticmethod
+    def _needs_disclaimer(text: str) -> bool:
+        text_lower = text.lower()
+        return (
+            any(kw in text_lower for kw in FINANCIAL_ADVICE_KEYWORDS)
+            and "Disclaimer" not in text
+        )
+
     @staticmethod
     def sanitise_response(response: str) -> str:
         """Clean the model's response before showing to the user."""
-        # 1. Redact any PII that leaked through
-        for pattern, replacement in PII_PATTERNS:
-            response = re.sub(pattern, replacement, response)
-
-        # 2. Flag fabricated-sounding specifics
-        for pattern in FABRICATION_PATTERNS:
-            if re.search(pattern, response):
-                response = re.sub(
-                    pattern,
-                    "[REDACTED — contact your branch for specifics]",
-                    response,
-                )
+        response = Guardrails._redact(response)
 
         # 3. Add disclaimer for financial advice
-        financial_advice_keywords = [
-            "interest rate", "emi", "premium", "tax benefit",
-            "loan amount", "eligibility", "credit score",
-        ]
-        if any(kw in response.lower() for kw in financial_advice_keywords):
-            if "Disclaimer" not in response:
-                response += DISCLAIMER
+        if Guardrails._needs_disclaimer(response):
+            response += DISCLAIMER
 
         return response.strip()
+
+    @staticmethod
+    def sanitise_stream(chunks: Iterable[str]) -> Iterator[str]:
+        """Streaming counterpart of ``sanitise_response``.
+
+        The concatenated output equals ``sanitise_response`` applied to
+        the whole text; see ``IncrementalSanitiser``.
+        """
+        sanitiser = IncrementalSanitiser()
+        for chunk in chunks:
+            out = sanitiser.feed(chunk)
+            if out:
+                yield out
+        out = sanitiser.finish()
+        if out:
+            yield out
+
+
+class IncrementalSanitiser:
+    """Redact text chunk by chunk as it is generated.
+
+    ``feed`` returns the redacted text that can no longer be affected by
+    what follows: only a suffix that some rule could still match (e.g. a
+    digit run that may become an Aadhaar or account number) and trailing
+    whitespace are held back.  ``finish`` flushes the rest and appends the
+    disclaimer.  For any chunking, the concatenated output equals
+    ``Guardrails.sanitise_response`` on the joined text.
+    """
+
+    def __init__(self):
+        self._buffer = " "       # last emitted char (word-boundary context) + pending text
+        self._redacted = []      # for the disclaimer check at the end
+        self._held_ws = ""       # trailing whitespace, only emitted if more text follows
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        return self._emit(self._advance(final=False))
+
+    def finish(self) -> str:
+        out = self._emit(self._advance(final=True))
+        if Guardrails._needs_disclaimer("".join(self._redacted)):
+            out += self._held_ws + DISCLAIMER if self._started else DISCLAIMER.strip()
+        self._held_ws = ""
+        return out
+
+    def _advance(self, final: bool) -> str:
+        """Redact and consume the settled part of the buffer."""
+        buf = self._buffer
+        pos = 1
+        parts = []
+        while True:
+            pending = None if final else _PENDING_RE.search(buf, pos)
+            limit = pending.start() if pending else len(buf)
+            # A match ending by ``limit`` cannot change any more.  One that
+            # runs past it may still lose to a rule it looks ahead for
+            # (phone vs. Aadhaar), so it waits.
+            match = _REDACTION_RE.search(buf, pos)
+            if match is None or match.end() > limit:
+                end = limit if match is None else min(limit, match.start())
+                parts.append(buf[pos:end])
+                pos = end
+                break
+            parts.append(buf[pos:match.start()] + _replace(match))
+            pos = match.end()
+        self._buffer = buf[pos - 1:]
+        text = "".join(parts)
+        self._redacted.append(text)
+        return text
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+        body = text.rstrip()
+        if body:
+            out = self._held_ws + body
+            self._held_ws = text[len(body):]
+            self._started = True
+            return out
+        if self._started:
+            self._held_ws += text
+        return ""
@@ -0,0 +1,305 @@
+"""Latency instrumentation for the BFSI pipeline.
+
+A small in-process registry – no Prometheus client or LangSmith needed –
+that the pipeline and engines report into:
+
+  node  one LangGraph node (guardrail_check, dataset_match, slm_generate,
+        post_process)
+  step  a sub-step inside a node (embedding, vector_search, tokenize,
+        prefill, decode, detokenize)
+
+Durations go into cumulative histograms labelled by node / step, every
+request is counted by tier, and SLM decode throughput is kept as token
+and second counters.  ``prometheus_text`` renders the registry in the
+Prometheus text exposition format; with ``METRICS_TRACE_PATH`` set, each
+request is also appended as one JSON line with its spans (the query text
+is not logged, only its length).
+
+Spans attach to the request's ``Trace`` through a context variable, so
+work offloaded with ``contextvars.copy_context`` is still attributed;
+steps run on other threads (the micro-batch scheduler, streaming
+generation) are recorded in the histograms only.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TRACE_PATH = os.getenv("METRICS_TRACE_PATH", "")  # JSONL file, "" = off
+
+# Upper bounds in seconds; a model call can take tens of seconds on CPU
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+HELP = {
+    "bfsi_request_duration_seconds": "End-to-end pipeline latency per request.",
+    "bfsi_node_duration_seconds": "Latency of each LangGraph node.",
+    "bfsi_step_duration_seconds": "Latency of each sub-step inside a node.",
+    "bfsi_requests_total": "Requests answered, by tier and cache hit.",
+    "bfsi_decode_tokens_total": "Tokens generated by the SLM after the first one.",
+    "bfsi_decode_seconds_total": "Time spent in SLM decoding (after prefill).",
+    "bfsi_decode_tokens_per_second": "SLM decode throughput since start-up.",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound below which a share ``q`` of observations fall."""
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.max
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters keyed by metric name and labels."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Optional[dict]) -> LabelKey:
+        return tuple(sorted((labels or {}).items()))
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[dict] = None) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def tokens_per_second(self) -> float:
+        with self._lock:
+            tokens = sum(self._counters.get("bfsi_decode_tokens_total", {}).values())
+            seconds = sum(self._counters.get("bfsi_decode_seconds_total", {}).values())
+        return tokens / seconds if seconds else 0.0
+
+    def snapshot(self) -> dict:
+        """JSON-friendly summary: count / mean / p50 / p95 / max per series."""
+        with self._lock:
+            histograms = {
+                name: {
+                    _label_text(key) or "all": {
+                        "count": h.count,
+                        "mean_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                        "p50_ms": round(h.quantile(0.5) * 1000, 2),
+                        "p95_ms": round(h.quantile(0.95) * 1000, 2),
+                        "max_ms": round(h.max * 1000, 2),
+                    }
+                    for key, h in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: {_label_text(key) or "all": value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+        return {
+            "histograms": histograms,
+            "counters": counters,
+            "decode_tokens_per_second": round(self.tokens_per_second(), 2),
+        }
+
+    def prometheus_text(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._histograms):
+                lines += _header(name, "histogram")
+                for key, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        cumulative += n
+                        le = key + (("le", repr(bound)),)
+                        lines.append(f"{name}_bucket{_labels(le)} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {h.count}")
+            for name in sorted(self._counters):
+                lines += _header(name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+        lines += _header("bfsi_decode_tokens_per_second", "gauge")
+        lines.append(f"bfsi_decode_tokens_per_second {self.tokens_per_second():.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, kind: str) -> list:
+    return [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} {kind}"]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in key) + "}"
+
+
+def _label_text(key: LabelKey) -> str:
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ── Per-request traces ────────────────────────────────────────────────
+class Trace:
+    """Spans of one pipeline request, finished into metrics and the JSONL log."""
+
+    def __init__(self, entry: str, query: str = ""):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.entry = entry
+        self.query_chars = len(query)
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, kind: str, start: float, duration: float) -> None:
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "kind": kind,
+                "start_ms": round((start - self.start) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+            })
+
+    def finish(self, results, registry: MetricsRegistry = REGISTRY) -> dict:
+        """Record the request(s) in ``registry``, log the trace and return it.
+
+        ``results`` is one final pipeline state, or a list for ``run_batch``.
+        """
+        total = time.perf_counter() - self.start
+        batch = results if isinstance(results, list) else [results]
+        tiers = [r.get("tier_used") or "none" for r in batch]
+        if METRICS_ENABLED:
+            for result, tier in zip(batch, tiers):
+                cache_hit = bool(result.get("cache_hit") or result.get("semantic_cache_hit"))
+                registry.inc(
+                    "bfsi_requests_total", labels={"tier": tier, "cache_hit": str(cache_hit).lower()}
+                )
+            registry.observe(
+                "bfsi_request_duration_seconds", total,
+                {"entry": self.entry, "tier": tiers[0] if len(tiers) == 1 else "batch"},
+            )
+        with self._lock:
+            record = {
+                "trace_id": self.trace_id,
+                "ts": round(self.wall_start, 3),
+                "entry": self.entry,
+                "query_chars": self.query_chars,
+                "tier": tiers[0] if len(tiers) == 1 else tiers,
+                "total_ms": round(total * 1000, 3),
+                "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+            }
+        if METRICS_TRACE_PATH:
+            _write_trace(record)
+        return record
+
+
+_CURRENT_TRACE: ContextVar[Optional[Trace]] = ContextVar("bfsi_trace", default=None)
+_TRACE_FILE_LOCK = threading.Lock()
+
+
+def _write_trace(record: dict, path: Optional[str] = None) -> None:
+    path = path or METRICS_TRACE_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record) + "\n"
+    with _TRACE_FILE_LOCK:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def current_trace() -> Optional[Trace]:
+    return _CURRENT_TRACE.get()
+
+
+@contextmanager
+def activate(trace: Trace) -> Iterator[Trace]:
+    """Make ``trace`` the target of ``span``/``record`` in this context."""
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+
+
+def record(name: str, kind: str, start: float, duration: float,
+           trace: Optional[Trace] = None) -> None:
+    """Record a measured ``duration`` (seconds) that began at ``perf_counter`` ``start``."""
+    if not METRICS_ENABLED:
+        return
+    REGISTRY.observe(f"bfsi_{kind}_duration_seconds", duration, {kind: name})
+    trace = trace or _CURRENT_TRACE.get()
+    if trace is not None:
+        trace.add(name, kind, start, duration)
+
+
+@contextmanager
+def span(name: str, kind: str = "step") -> Iterator[None]:
+    """Time the enclosed block as a ``node`` or ``step``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, kind, start, time.perf_counter() - start)
+
+
+def record_decode(tokens: int, seconds: float) -> None:
+    """Count SLM tokens decoded after prefill, for tokens/sec."""
+    if METRICS_ENABLED and tokens > 0:
+        REGISTRY.inc("bfsi_decode_tokens_total", tokens)
+        REGISTRY.inc("bfsi_decode_seconds_total", seconds)
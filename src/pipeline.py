@@ -10,44 +10,186 @@ State graph:
   slm_generate     ->  post_process   (otherwise)
   rag_augment      ->  post_process
   post_process     ->  END
+
+``run_stream`` runs the same tiers but returns the Tier 2/3 answer as a
+token stream.  ``run_batch`` executes the same tiers over many queries at once for bulk
+replays, vectorising each stage instead of invoking the graph per query.
+
+``arun`` is the asyncio entry point: the same graph compiled with async
+nodes that offload blocking work to two bounded thread pools – one for
+the encoder / vector search, one for SLM generation – so cheap guardrail
+and Tier 1 answers are never queued behind generations.
+
+Every entry point takes an optional ``latency_budget`` (seconds).  The
+resulting deadline travels in ``PipelineState``; when generation cannot
+finish in time the SLM is cut off and the pipeline degrades to the best
+dataset answer below the match threshold (``dataset_fallback``), an
+extractive summary of the top RAG chunk (``rag_fallback``) or a static
+hand-off message (``fallback``).
+
+Each node and entry point is timed into ``src.metrics``; the finished
+per-request trace is returned under ``result["trace"]``.
 """
+import asyncio
+import contextvars
+import functools
 import os
-from typing import TypedDict, Optional
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple, TypedDict
 
+import numpy as np
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
 
+from src import metrics
+from src.guardrails import is_drafting_task
+from src.response_cache import ResponseCache, SemanticCache
+
 load_dotenv()
 
 RAG_RELEVANCE_THRESHOLD = float(os.getenv("RAG_RELEVANCE_THRESHOLD", "0.5"))
+# Thread pools behind ``arun``
+RETRIEVAL_WORKERS = int(os.getenv("PIPELINE_RETRIEVAL_WORKERS", "4"))   # encoder + vector search
+GENERATION_WORKERS = int(os.getenv("PIPELINE_GENERATION_WORKERS", "8"))  # SLM calls
+# Per-request latency budget in seconds (0 = no deadline)
+LATENCY_BUDGET = float(os.getenv("PIPELINE_LATENCY_BUDGET", "0"))
+# Skip the SLM outright when less than this is left of the budget
+MIN_GENERATION_SEC = float(os.getenv("PIPELINE_MIN_GENERATION_SEC", "0.5"))
+# Lowest Tier 1 similarity still worth serving as a degraded answer
+FALLBACK_DATASET_MIN = float(os.getenv("PIPELINE_FALLBACK_DATASET_MIN", "0.6"))
+FALLBACK_SENTENCES = 2
+
+DEGRADED_RESPONSE = (
+    "I'm sorry, I can't answer that in full right now. Please try again in a "
+    "moment or contact customer support for assistance."
+)
+
+# Sentence or line boundaries; knowledge-base chunks are mostly Markdown bullets
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class TierTimeoutError(TimeoutError):
+    """An ``arun`` stage ("retrieval" or "generation") exceeded its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} stage exceeded {timeout:.1f}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def _timed_node(name: str, fn):
+    """Wrap a (sync or async) node so each call is recorded as a ``node`` span."""
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def _anode(state):
+            with metrics.span(name, "node"):
+                return await fn(state)
+        return _anode
+
+    @functools.wraps(fn)
+    def _node(state):
+        with metrics.span(name, "node"):
+            return fn(state)
+    return _node
 
 
 # ── State schema ──────────────────────────────────────────────────────
 class PipelineState(TypedDict):
     query: str
     response: str
-    tier_used: str          # "dataset" | "slm" | "rag" | "guardrail"
+    tier_used: str          # "dataset" | "slm" | "rag" | "guardrail" | "*fallback"
     dataset_score: float
     rag_score: float
     rag_context: str
+    rag_chunks: list        # chunks retrieved for Tier 3, kept for the fallback
     is_valid: bool
     rejection_reason: str
+    query_embedding: Any    # np.ndarray shared by Tier 1 and Tier 3
+    cache_hit: bool
+    semantic_cache_hit: bool
+    deadline: float         # time.monotonic() deadline, 0.0 = none
 
 
 # ── Pipeline Builder ──────────────────────────────────────────────────
 class BFSIPipeline:
     """Build and run the 3-tier LangGraph pipeline."""
 
-    def __init__(self, dataset_matcher, slm_engine, rag_engine, guardrails):
+    def __init__(
+        self,
+        dataset_matcher,
+        slm_engine,
+        rag_engine,
+        guardrails,
+        response_cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        timeouts: Optional[dict] = None,
+    ):
         self.dataset_matcher = dataset_matcher
         self.slm_engine = slm_engine
         self.rag_engine = rag_engine
         self.guardrails = guardrails
-        self.graph = self._build_graph()
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.graph = self._build_graph({
+            "guardrail_check": self._guardrail_check,
+            "dataset_match": self._dataset_match,
+            "slm_generate": self._slm_generate,
+            "post_process": self._post_process,
+        })
+        self.async_graph = self._build_graph({
+            "guardrail_check": self._aguardrail_check,
+            "dataset_match": self._adataset_match,
+            "slm_generate": self._aslm_generate,
+            "post_process": self._apost_process,
+        })
+        # Threads are only started when ``arun`` first needs them
+        self._pools = {
+            "retrieval": ThreadPoolExecutor(
+                max_workers=RETRIEVAL_WORKERS, thread_name_prefix="bfsi-retrieval"
+            ),
+            "generation": ThreadPoolExecutor(
+                max_workers=GENERATION_WORKERS, thread_name_prefix="bfsi-generation"
+            ),
+        }
+        # Optional per-stage limits in seconds for ``arun``, e.g. {"generation": 30}
+        self.timeouts = dict(timeouts or {})
+
+    # ── Response cache helpers ────────────────────────────────────────
+    def _cache_version(self) -> str:
+        """Combined dataset / vector store / adapter signature."""
+        return "||".join(
+            str(getattr(component, "version", ""))
+            for component in (self.dataset_matcher, self.rag_engine, self.slm_engine)
+        )
+
+    def _is_cacheable(self, result: dict) -> bool:
+        """Only deterministic tiers may be served from the cache.
+
+        Guardrail rejections are not cached: they are cheap to recompute
+        and depend on punctuation the cache key drops ("bypass-kyc").
+        """
+        tier = result.get("tier_used")
+        if tier == "dataset":
+            return True
+        if tier == "rag":
+            return getattr(self.slm_engine, "temperature", None) == 0
+        return False
 
     # ── Node functions ────────────────────────────────────────────────
+    def _uses_embedding_guardrail(self) -> bool:
+        return getattr(self.guardrails, "classifier", None) is not None
+
     def _guardrail_check(self, state: PipelineState) -> PipelineState:
-        is_valid, reason = self.guardrails.check_query(state["query"])
+        if self._uses_embedding_guardrail() and state["query"].strip():
+            # Embed here instead of in Tier 1; the vector is reused below
+            if state.get("query_embedding") is None:
+                state["query_embedding"] = self.dataset_matcher.embed_query(state["query"])
+            is_valid, reason = self.guardrails.check(state["query"], state["query_embedding"])
+        else:
+            is_valid, reason = self.guardrails.check_query(state["query"])
         state["is_valid"] = is_valid
         state["rejection_reason"] = reason
         if not is_valid:
@@ -56,59 +198,181 @@ class BFSIPipeline:
         return state
 
     def _dataset_match(self, state: PipelineState) -> PipelineState:
-        answer, score = self.dataset_matcher.search(state["query"])
+        # Embed once; the vector is reused by the RAG retrieval below.
+        query_emb = state.get("query_embedding")
+        if query_emb is None:
+            query_emb = self.dataset_matcher.embed_query(state["query"])
+            state["query_embedding"] = query_emb
+        answer, score = self.dataset_matcher.search(
+            state["query"], query_embedding=query_emb
+        )
         state["dataset_score"] = score
         if answer is not None:
             state["response"] = answer
             state["tier_used"] = "dataset"
+        elif self.semantic_cache is not None:
+            # Paraphrase of an earlier Tier 2/3 question – reuse its answer
+            cached = self.semantic_cache.get(query_emb)
+            if cached is not None:
+                state["response"] = cached["response"]
+                state["tier_used"] = cached["tier_used"]
+                state["rag_score"] = cached.get("rag_score", 0.0)
+                state["semantic_cache_hit"] = True
         return state
 
-    def _slm_generate(self, state: PipelineState) -> PipelineState:
+    @staticmethod
+    def _is_creative_task(query: str) -> bool:
         # Heuristic: Skip RAG for creative/generative tasks to avoid context constraining the output
-        creative_prefixes = ("write", "draft", "compose", "generate", "suggest", "create")
-        is_creative_task = state["query"].lower().strip().startswith(creative_prefixes)
+        return is_drafting_task(query)
+
+    def _select_context(self, state: PipelineState) -> Optional[str]:
+        """Choose between Tier 2 and Tier 3; return the RAG context if any."""
+        is_creative_task = self._is_creative_task(state["query"])
 
         # Try RAG retrieval first to see if we should augment (unless it's a creative task)
         if self.rag_engine is not None and not is_creative_task:
-            chunks = self.rag_engine.retrieve(state["query"], k=3)
+            # One vector search yields both the scores and the prompt context
+            chunks, context = self.rag_engine.retrieve_with_context(
+                state["query"], k=3, query_embedding=state.get("query_embedding")
+            )
+            state["rag_chunks"] = chunks
             if chunks and chunks[0]["score"] <= RAG_RELEVANCE_THRESHOLD:
                 # Low distance = high relevance in ChromaDB
-                context = self.rag_engine.get_context_string(state["query"])
                 state["rag_context"] = context
                 state["rag_score"] = chunks[0]["score"]
-                response = self.slm_engine.generate(
-                    state["query"], rag_context=context
-                )
-                state["response"] = response
                 state["tier_used"] = "rag"
-                return state
+                return context
 
         # Pure SLM generation (no RAG context)
-        response = self.slm_engine.generate(state["query"])
-        state["response"] = response
         state["tier_used"] = "slm"
+        return None
+
+    def _generate(self, query: str, context: Optional[str], deadline: float = 0.0) -> Optional[str]:
+        kwargs = {"deadline": deadline} if deadline else {}
+        if context is not None:
+            return self.slm_engine.generate(query, rag_context=context, **kwargs)
+        return self.slm_engine.generate(query, **kwargs)
+
+    @staticmethod
+    def _out_of_time(state: PipelineState) -> bool:
+        """True if too little of the budget is left to start generating."""
+        deadline = state.get("deadline")
+        return bool(deadline) and deadline - time.monotonic() < MIN_GENERATION_SEC
+
+    def _slm_generate(self, state: PipelineState) -> PipelineState:
+        context = self._select_context(state)
+        response = None
+        if not self._out_of_time(state):
+            response = self._generate(state["query"], context, state.get("deadline", 0.0))
+        return self._set_generated(state, response)
+
+    def _set_generated(self, state: PipelineState, response: Optional[str]) -> PipelineState:
+        """Store the SLM answer, or degrade if it was cut off by the deadline."""
+        if response is None:
+            return self._degrade(state)
+        state["response"] = response
+        return state
+
+    # ── Graceful degradation ──────────────────────────────────────────
+    @staticmethod
+    def _summarise(query: str, text: str, n: int = FALLBACK_SENTENCES) -> str:
+        """Extractive summary: the ``n`` sentences sharing most words with the query."""
+        sentences = []
+        for part in _SENTENCE_RE.split(text):
+            part = part.strip().lstrip("-*").strip()
+            if part and not part.startswith("#"):
+                sentences.append(part if part[-1] in ".!?" else part + ".")
+        query_words = set(_WORD_RE.findall(query.lower()))
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (-len(query_words & set(_WORD_RE.findall(sentences[i].lower()))), i),
+        )
+        return " ".join(sentences[i] for i in sorted(ranked[:n]))
+
+    def _degrade(self, state: PipelineState) -> PipelineState:
+        """Answer without the SLM: best dataset match, top RAG chunk, or a hand-off."""
+        if state.get("dataset_score", 0.0) >= FALLBACK_DATASET_MIN:
+            answer, _ = self.dataset_matcher.search(
+                state["query"],
+                threshold=FALLBACK_DATASET_MIN,
+                query_embedding=state.get("query_embedding"),
+            )
+            if answer is not None:
+                state["response"] = answer
+                state["tier_used"] = "dataset_fallback"
+                return state
+        for chunk in state.get("rag_chunks") or []:
+            if chunk["score"] > RAG_RELEVANCE_THRESHOLD:
+                break
+            # The top relevant chunk that is more than a heading
+            summary = self._summarise(state["query"], chunk["content"])
+            if summary:
+                state["response"] = f"{summary} (Source: {chunk['source']})"
+                state["tier_used"] = "rag_fallback"
+                return state
+        state["response"] = DEGRADED_RESPONSE
+        state["tier_used"] = "fallback"
         return state
 
     def _post_process(self, state: PipelineState) -> PipelineState:
         state["response"] = self.guardrails.sanitise_response(state["response"])
         return state
 
+    # ── Async node functions ──────────────────────────────────────────
+    async def _offload(self, stage: str, fn, *args):
+        """Run blocking ``fn`` on the ``stage`` pool, bounded by its timeout.
+
+        A timed-out call keeps its worker thread until it returns; only the
+        waiting request is released.
+        """
+        loop = asyncio.get_running_loop()
+        # Carry the request's trace into the worker thread
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(
+            self._pools[stage], functools.partial(context.run, fn, *args)
+        )
+        timeout = self.timeouts.get(stage)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TierTimeoutError(stage, timeout) from None
+
+    async def _aguardrail_check(self, state: PipelineState) -> PipelineState:
+        if self._uses_embedding_guardrail():
+            return await self._offload("retrieval", self._guardrail_check, state)
+        return self._guardrail_check(state)  # regex only – cheaper than a thread hop
+
+    async def _adataset_match(self, state: PipelineState) -> PipelineState:
+        return await self._offload("retrieval", self._dataset_match, state)
+
+    async def _aslm_generate(self, state: PipelineState) -> PipelineState:
+        context = await self._offload("retrieval", self._select_context, state)
+        response = None
+        if not self._out_of_time(state):
+            response = await self._offload(
+                "generation", self._generate, state["query"], context, state.get("deadline", 0.0)
+            )
+        return self._set_generated(state, response)
+
+    async def _apost_process(self, state: PipelineState) -> PipelineState:
+        return self._post_process(state)
+
     # ── Routing functions ─────────────────────────────────────────────
     def _route_after_guardrail(self, state: PipelineState) -> str:
         return "dataset_match" if state["is_valid"] else "end"
 
     def _route_after_dataset(self, state: PipelineState) -> str:
-        return "end" if state.get("tier_used") == "dataset" else "slm_generate"
+        if state.get("tier_used") == "dataset" or state.get("semantic_cache_hit"):
+            return "end"
+        return "slm_generate"
 
     # ── Graph construction ────────────────────────────────────────────
-    def _build_graph(self):
+    def _build_graph(self, nodes: dict):
         builder = StateGraph(PipelineState)
 
         # Add nodes
-        builder.add_node("guardrail_check", self._guardrail_check)
-        builder.add_node("dataset_match", self._dataset_match)
-        builder.add_node("slm_generate", self._slm_generate)
-        builder.add_node("post_process", self._post_process)
+        for name, fn in nodes.items():
+            builder.add_node(name, _timed_node(name, fn))
 
         # Set entry point
         builder.set_entry_point("guardrail_check")
@@ -132,17 +396,287 @@ class BFSIPipeline:
         return builder.compile()
 
     # ── Public API ────────────────────────────────────────────────────
-    def run(self, query: str) -> dict:
-        """Execute the pipeline and return the final state."""
-        initial_state: PipelineState = {
+    @staticmethod
+    def _deadline(latency_budget: Optional[float]) -> float:
+        """Absolute ``time.monotonic()`` deadline for a budget; 0.0 = none."""
+        if latency_budget is None:
+            latency_budget = LATENCY_BUDGET
+        return time.monotonic() + latency_budget if latency_budget > 0 else 0.0
+
+    @staticmethod
+    def _initial_state(query: str, deadline: float = 0.0) -> PipelineState:
+        return {
             "query": query,
             "response": "",
             "tier_used": "",
             "dataset_score": 0.0,
             "rag_score": 0.0,
             "rag_context": "",
+            "rag_chunks": [],
             "is_valid": True,
             "rejection_reason": "",
+            "query_embedding": None,
+            "cache_hit": False,
+            "semantic_cache_hit": False,
+            "deadline": deadline,
         }
-        result = self.graph.invoke(initial_state)
+
+    def _check_caches(self, query: str) -> Optional[dict]:
+        version = self._cache_version()
+        if self.semantic_cache is not None:
+            self.semantic_cache.set_version(version)
+        if self.response_cache is not None:
+            self.response_cache.set_version(version)
+            # The key is normalised, so an entry may stem from a differently
+            # punctuated query: the raw text must pass the guardrail rules too
+            if not self.guardrails.check_rules(query)[0]:
+                return None
+            cached = self.response_cache.get(query)
+            if cached is not None:
+                cached.update(query=query, cache_hit=True)
+                return cached
+        return None
+
+    def _store_caches(self, query: str, result: dict) -> None:
+        if self.response_cache is not None and self._is_cacheable(result):
+            self.response_cache.put(query, result)
+        if (
+            self.semantic_cache is not None
+            and result.get("tier_used") in ("slm", "rag")
+            and not result.get("semantic_cache_hit")
+        ):
+            self.semantic_cache.put(result["query_embedding"], result)
+
+    def run(self, query: str, latency_budget: Optional[float] = None) -> dict:
+        """Execute the pipeline and return the final state.
+
+        ``latency_budget`` (seconds, default ``PIPELINE_LATENCY_BUDGET``)
+        bounds SLM generation; see the module docstring for the fallbacks.
+        """
+        trace = metrics.Trace("run", query)
+        with metrics.activate(trace):
+            result = self._check_caches(query)
+            if result is None:
+                state = self._initial_state(query, self._deadline(latency_budget))
+                result = self.graph.invoke(state)
+                self._store_caches(query, result)
+        result["trace"] = trace.finish(result)
+        return result
+
+    async def arun(self, query: str, latency_budget: Optional[float] = None) -> dict:
+        """Async ``run``: awaits the graph while blocking work runs in thread pools."""
+        trace = metrics.Trace("arun", query)
+        with metrics.activate(trace):
+            result = self._check_caches(query)
+            if result is None:
+                state = self._initial_state(query, self._deadline(latency_budget))
+                result = await self.async_graph.ainvoke(state)
+                self._store_caches(query, result)
+        result["trace"] = trace.finish(result)
         return result
+
+    async def arun_stream(
+        self, query: str, latency_budget: Optional[float] = None
+    ) -> Tuple[dict, Iterator[str]]:
+        """Async ``run_stream``; routing and retrieval run on the retrieval pool.
+
+        The returned chunk iterator still blocks while tokens are decoded,
+        so consume it off the event loop, e.g. with ``astream_chunks``.
+        """
+        return await self._offload("retrieval", self.run_stream, query, latency_budget)
+
+    async def astream_chunks(self, chunks: Iterator[str]) -> AsyncIterator[str]:
+        """Drain an ``arun_stream`` chunk iterator on the generation pool.
+
+        The generation timeout bounds the whole stream: once it expires
+        ``TierTimeoutError`` is raised.  The iterator is closed when the
+        stream ends or is abandoned, after any decode step still running.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pools["generation"]
+        timeout = self.timeouts.get("generation")
+        deadline = None if timeout is None else loop.time() + timeout
+        context = contextvars.copy_context()
+        end = object()
+        future = None
+        try:
+            while True:
+                future = loop.run_in_executor(
+                    pool, functools.partial(context.run, next, chunks, end)
+                )
+                remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                try:
+                    # Shielded: a step that times out finishes before the close
+                    text = await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    raise TierTimeoutError("generation", timeout) from None
+                if text is end:
+                    return
+                yield text
+        finally:
+            if future is not None and not future.done():
+                future.add_done_callback(lambda _: pool.submit(chunks.close))
+            else:
+                chunks.close()
+
+    async def arun_batch(
+        self, queries: List[str], latency_budget: Optional[float] = None
+    ) -> List[dict]:
+        """Async ``run_batch`` on the generation pool (no per-stage timeout)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pools["generation"],
+            functools.partial(self.run_batch, queries, latency_budget),
+        )
+
+    def close(self) -> None:
+        """Shut down the ``arun`` thread pools."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+
+    def run_stream(
+        self, query: str, latency_budget: Optional[float] = None
+    ) -> Tuple[dict, Iterator[str]]:
+        """Streaming variant of ``run``.
+
+        Returns ``(state, chunks)``.  ``state`` already has ``tier_used``
+        and the scores; ``chunks`` yields the sanitised response text and
+        fills ``state["response"]`` once exhausted.  Only Tier 2/3 answers
+        are actually streamed – other tiers yield their response at once.
+        The latency budget only decides whether to start streaming: text
+        already sent to the client cannot be swapped for a fallback.
+        ``state["trace"]`` is set once the response is complete.
+        """
+        trace = metrics.Trace("run_stream", query)
+        with metrics.activate(trace):
+            cached = self._check_caches(query)
+            if cached is not None:
+                return self._finish_stream(cached, trace)
+
+            state = self._initial_state(query, self._deadline(latency_budget))
+            with metrics.span("guardrail_check", "node"):
+                self._guardrail_check(state)
+            if self._route_after_guardrail(state) == "end":
+                return self._finish_stream(state, trace)
+            with metrics.span("dataset_match", "node"):
+                self._dataset_match(state)
+            if self._route_after_dataset(state) == "end":
+                return self._finish_stream(state, trace)
+
+            start = time.perf_counter()
+            context = self._select_context(state)
+            if self._out_of_time(state):
+                self._post_process(self._degrade(state))
+                metrics.record("slm_generate", "node", start, time.perf_counter() - start)
+                return self._finish_stream(state, trace)
+        return state, self._stream_generation(state, context, trace, start)
+
+    @staticmethod
+    def _finish_stream(state: dict, trace: metrics.Trace) -> Tuple[dict, Iterator[str]]:
+        state["trace"] = trace.finish(state)
+        return state, iter([state["response"]])
+
+    def _stream_generation(
+        self, state: PipelineState, context: Optional[str], trace: metrics.Trace, start: float
+    ) -> Iterator[str]:
+        tokens = self.slm_engine.generate_stream(state["query"], rag_context=context)
+        parts = []
+        for text in self.guardrails.sanitise_stream(tokens):
+            parts.append(text)
+            yield text
+        state["response"] = "".join(parts)
+        self._store_caches(state["query"], state)
+        # Decoding ran while the caller consumed the stream; record it explicitly
+        metrics.record("slm_generate", "node", start, time.perf_counter() - start, trace)
+        state["trace"] = trace.finish(state)
+
+    def run_batch(self, queries: List[str], latency_budget: Optional[float] = None) -> List[dict]:
+        """Run many queries with one encode, one matmul and batched generation.
+
+        Results are returned in input order and match ``run`` for each query
+        under deterministic decoding.  The response caches are bypassed so
+        offline replays measure the tiers themselves.  ``latency_budget``
+        applies to the batch as a whole.
+        """
+        trace = metrics.Trace("run_batch")
+        with metrics.activate(trace):
+            states = self._run_batch(queries, self._deadline(latency_budget))
+        trace.finish(states)
+        return states
+
+    def _run_batch(self, queries: List[str], deadline: float) -> List[dict]:
+        states = [self._initial_state(q, deadline) for q in queries]
+
+        # 1. Guardrails over the whole batch
+        with metrics.span("guardrail_check", "node"):
+            if self._uses_embedding_guardrail():
+                # The embedding classifier needs the vectors up front: encode once
+                idx = [i for i, st in enumerate(states) if st["query"].strip()]
+                if idx:
+                    vectors = self.dataset_matcher.embed_queries(
+                        [states[i]["query"] for i in idx]
+                    )
+                    for row, i in enumerate(idx):
+                        states[i]["query_embedding"] = vectors[row]
+            for state in states:
+                self._guardrail_check(state)
+        valid = [i for i, st in enumerate(states) if st["is_valid"]]
+        if not valid:
+            return states
+
+        # 2. Tier 1: one vectorised encode + one matrix multiply
+        with metrics.span("dataset_match", "node"):
+            if self._uses_embedding_guardrail():
+                embeddings = np.stack([states[i]["query_embedding"] for i in valid])
+            else:
+                embeddings = self.dataset_matcher.embed_queries(
+                    [states[i]["query"] for i in valid]
+                )
+            matches = self.dataset_matcher.search_batch(embeddings)
+        misses = []
+        for row, (i, (answer, score)) in enumerate(zip(valid, matches)):
+            states[i]["query_embedding"] = embeddings[row]
+            states[i]["dataset_score"] = score
+            if answer is not None:
+                states[i]["response"] = answer
+                states[i]["tier_used"] = "dataset"
+            else:
+                misses.append(i)
+        if not misses:
+            return states
+        with metrics.span("slm_generate", "node"):
+            self._generate_batch(states, misses, deadline)
+        with metrics.span("post_process", "node"):
+            for i in misses:
+                self._post_process(states[i])
+        return states
+
+    def _generate_batch(self, states: List[dict], misses: List[int], deadline: float) -> None:
+        """Tiers 2/3 of ``run_batch`` for the dataset misses."""
+        # 3. Tier 3 retrieval for non-creative misses in one Chroma query
+        contexts = {}
+        if self.rag_engine is not None:
+            rag_idx = [i for i in misses if not self._is_creative_task(states[i]["query"])]
+            retrieved = self.rag_engine.retrieve_batch(
+                [states[i]["query_embedding"] for i in rag_idx], k=3
+            )
+            for i, chunks in zip(rag_idx, retrieved):
+                states[i]["rag_chunks"] = chunks
+                if chunks and chunks[0]["score"] <= RAG_RELEVANCE_THRESHOLD:
+                    contexts[i] = self.rag_engine.format_context(chunks)
+                    states[i]["rag_context"] = contexts[i]
+                    states[i]["rag_score"] = chunks[0]["score"]
+
+        # 4. Tier 2/3 generation in padded batches
+        if self._out_of_time(states[misses[0]]):
+            responses = [None] * len(misses)
+        else:
+            kwargs = {"deadlines": [deadline] * len(misses)} if deadline else {}
+            responses = self.slm_engine.generate_batch(
+                [states[i]["query"] for i in misses],
+                rag_contexts=[contexts.get(i) for i in misses],
+                **kwargs,
+            )
+        for i, response in zip(misses, responses):
+            states[i]["tier_used"] = "rag" if i in contexts else "slm"
+            self._set_generated(states[i], response)
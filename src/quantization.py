@@ -0,0 +1,179 @@
+"""Quantized embedding codes with float re-ranking (Tier 1 and Tier 3).
+
+Exact search streams the whole float32 matrix through memory on every
+query.  ``QuantizedVectors`` keeps a compact code per row and scans only
+the codes, then re-ranks a shortlist against the original float vectors:
+
+  int8    per-dimension symmetric scalar quantization, 1 byte per
+          dimension (4x smaller than float32); scored in small widened slices
+  binary  sign bits packed 8 per byte (32x smaller); scored by Hamming
+          distance with XOR + popcount
+
+The ``EMBEDDING_QUANT_RERANK`` best rows by code score are re-scored
+with the float vectors, which can stay memory-mapped on disk: only the
+shortlisted rows are ever read.  Codes are persisted next to the float
+matrix so start-up does not re-quantize it.
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUANT_RERANK = int(os.getenv("EMBEDDING_QUANT_RERANK", "64"))  # rows re-scored in float
+QUANT_MODES = ("none", "int8", "binary")
+SCAN_BLOCK = 65536  # rows scored per block: bounds the temporary score matrix
+WIDEN_ROWS = 1024   # int8 rows widened per matmul: the float32 copy stays in cache
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(x)
+    return _POPCOUNT[x]
+
+
+def _quantize_int8(vectors, scale: np.ndarray) -> np.ndarray:
+    codes = np.empty(vectors.shape, dtype=np.int8)
+    for start in range(0, len(vectors), SCAN_BLOCK):
+        block = np.asarray(vectors[start:start + SCAN_BLOCK], dtype=np.float32)
+        codes[start:start + len(block)] = np.clip(np.rint(block / scale), -127, 127)
+    return codes
+
+
+def _quantize_binary(vectors) -> np.ndarray:
+    codes = np.empty((len(vectors), (vectors.shape[1] + 7) // 8), dtype=np.uint8)
+    for start in range(0, len(vectors), SCAN_BLOCK):
+        block = np.asarray(vectors[start:start + SCAN_BLOCK], dtype=np.float32)
+        codes[start:start + len(block)] = np.packbits(block > 0, axis=1)
+    return codes
+
+
+class QuantizedVectors:
+    """Code scan + float re-ranking over the rows of ``vectors``."""
+
+    def __init__(self, vectors, mode: str, codes: np.ndarray,
+                 scale: Optional[np.ndarray] = None):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unsupported embedding quantization: {mode}")
+        self.vectors = vectors
+        self.mode = mode
+        self.codes = codes
+        self.scale = scale
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes scanned per query (the codes, plus the int8 scales)."""
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    @classmethod
+    def build(cls, vectors, mode: str) -> "QuantizedVectors":
+        if mode == "int8":
+            peak = np.zeros(vectors.shape[1], dtype=np.float32)
+            for start in range(0, len(vectors), SCAN_BLOCK):
+                block = np.asarray(vectors[start:start + SCAN_BLOCK], dtype=np.float32)
+                peak = np.maximum(peak, np.abs(block).max(axis=0))
+            scale = np.maximum(peak, 1e-12) / 127.0
+            return cls(vectors, mode, _quantize_int8(vectors, scale), scale)
+        return cls(vectors, mode, _quantize_binary(vectors))
+
+    @classmethod
+    def load_or_build(cls, vectors, mode: str, base_path: Optional[str] = None
+                      ) -> "QuantizedVectors":
+        """Memory-map codes saved at ``<base_path>-<mode>.npy`` or build (and save) them."""
+        if base_path is None:
+            return cls.build(vectors, mode)
+        codes_path = f"{base_path}-{mode}.npy"
+        scale_path = f"{base_path}-{mode}-scale.npy"
+        try:
+            codes = np.load(codes_path, mmap_mode="r")
+            scale = np.load(scale_path) if mode == "int8" else None
+            if len(codes) == len(vectors):
+                return cls(vectors, mode, codes, scale)
+        except (OSError, ValueError):
+            pass
+        quantized = cls.build(vectors, mode)
+        if mode == "int8":
+            _save_atomic(scale_path, quantized.scale)
+        _save_atomic(codes_path, quantized.codes)  # codes last: they mark a complete write
+        return quantized
+
+    def _approx_scores(self, block: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Code scores of a block of rows for (B, dim) queries; higher is closer."""
+        if self.mode == "int8":
+            # NumPy has no int8 GEMM: widen small slices and fold the scales into the query
+            q_scaled = q * self.scale
+            scores = np.empty((len(q), len(block)), dtype=np.float32)
+            for i in range(0, len(block), WIDEN_ROWS):
+                widened = block[i:i + WIDEN_ROWS].astype(np.float32)
+                scores[:, i:i + WIDEN_ROWS] = q_scaled @ widened.T
+            return scores
+        q_bits = np.packbits(q > 0, axis=1)
+        return -np.stack([
+            _popcount(np.bitwise_xor(block, bits)).sum(axis=1, dtype=np.int32)
+            for bits in q_bits
+        ]).astype(np.float32)
+
+    def search(self, queries, k: int = 1, rerank: int = QUANT_RERANK
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(rows, cosine)`` arrays of shape (B, k), best first.
+
+        The ``max(rerank, k)`` best rows by code score are re-scored with
+        the float vectors.
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        n = len(self)
+        k = min(k, n)
+        shortlist = min(max(rerank, k), n)
+        cand_rows, cand_scores = [], []
+        for start in range(0, n, SCAN_BLOCK):
+            scores = self._approx_scores(np.asarray(self.codes[start:start + SCAN_BLOCK]), q)
+            m = min(shortlist, scores.shape[1])
+            local = np.argpartition(-scores, m - 1, axis=1)[:, :m]
+            cand_rows.append(local + start)
+            cand_scores.append(np.take_along_axis(scores, local, axis=1))
+        rows = np.concatenate(cand_rows, axis=1)
+        if rows.shape[1] > shortlist:
+            scores = np.concatenate(cand_scores, axis=1)
+            keep = np.argpartition(-scores, shortlist - 1, axis=1)[:, :shortlist]
+            rows = np.take_along_axis(rows, keep, axis=1)
+
+        best_rows = np.empty((len(q), k), dtype=np.int64)
+        best_scores = np.empty((len(q), k), dtype=np.float32)
+        for b, candidates in enumerate(rows):
+            best_rows[b], best_scores[b] = self._rerank(candidates, q[b], k)
+        return best_rows, best_scores
+
+    def search_rows(self, query, rows: np.ndarray, k: int = 1, rerank: int = QUANT_RERANK
+                    ) -> Tuple[np.ndarray, np.ndarray]:
+        """``search`` for one query over candidate ``rows`` only (e.g. probed IVF lists).
+
+        Returns ``(rows, cosine)`` arrays of shape (k,), best first.
+        """
+        q = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        rows = np.asarray(rows)
+        scores = self._approx_scores(np.asarray(self.codes[rows]), q)[0]
+        shortlist = min(max(rerank, k), len(rows))
+        if shortlist < len(rows):
+            rows = rows[np.argpartition(-scores, shortlist - 1)[:shortlist]]
+        return self._rerank(rows, q[0], min(k, len(rows)))
+
+    def _rerank(self, candidates: np.ndarray, q: np.ndarray, k: int
+                ) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score ``candidates`` with the float vectors; best ``k`` first."""
+        candidates = np.sort(candidates)
+        exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ q
+        top = np.argsort(-exact, kind="stable")[:k]
+        return candidates[top], exact[top]
+
+
+def _save_atomic(path: str, array: np.ndarray) -> None:
+    tmp = path + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
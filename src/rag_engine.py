@@ -3,48 +3,156 @@
 Retrieves relevant chunks from the ChromaDB vector store and uses the
 language model to generate a grounded response based on the retrieved
 context.  Uses LangChain components for retrieval and chain building.
+
+``scripts/build_vectorstore.py`` builds each index into a fresh
+collection and then atomically replaces ``active_collection.json`` in the
+store directory.  The engine reads that pointer and re-opens the store
+when it changes, so a rebuild never exposes a half-written collection.
+Stores built before the pointer existed use ``COLLECTION_NAME``.
+
+Two search backends are available, selected with ``RAG_BACKEND``:
+
+  chroma  the persistent ChromaDB collection (default)
+  numpy   the in-process ``NumpyVectorIndex`` exported by the same build
+          (``VECTOR_INDEX_DIR``), exact top-k over a memory-mapped matrix
+          with no Chroma client in the request path
 """
+import json
 import os
-from typing import Optional
+import threading
+from typing import List, Optional, Tuple
 
+import chromadb
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+
+from src import metrics
+from src.embeddings import EmbeddingService
+from src.response_cache import path_signature
+from src.vector_index import VECTOR_INDEX_DIR, NumpyVectorIndex
 
 load_dotenv()
 
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "data/chroma_db")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+RAG_BACKEND = os.getenv("RAG_BACKEND", "chroma")  # "chroma" | "numpy"
 COLLECTION_NAME = "bfsi_knowledge"
+ACTIVE_POINTER = "active_collection.json"
 RAG_K = 3  # number of chunks to retrieve
 
 
+def read_active_collection(persist_dir: str = CHROMA_PERSIST_DIR) -> dict:
+    """Manifest of the live collection (``{"collection": name, ...}``)."""
+    try:
+        with open(os.path.join(persist_dir, ACTIVE_POINTER), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"collection": COLLECTION_NAME}
+    return manifest if manifest.get("collection") else {"collection": COLLECTION_NAME}
+
+
+def write_active_collection(persist_dir: str, manifest: dict) -> None:
+    """Point readers at ``manifest["collection"]`` with one atomic rename."""
+    path = os.path.join(persist_dir, ACTIVE_POINTER)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def active_index_path(index_dir: str = VECTOR_INDEX_DIR) -> str:
+    """Directory of the live NumPy index (pointer ``directory``, else the collection name)."""
+    active = read_active_collection(index_dir)
+    return os.path.join(index_dir, active.get("directory") or active["collection"])
+
+
+def vector_store_dir(backend: str = RAG_BACKEND) -> str:
+    """Directory the given backend reads its index from."""
+    return VECTOR_INDEX_DIR if backend == "numpy" else CHROMA_PERSIST_DIR
+
+
 class RAGEngine:
-    """Retrieve relevant knowledge base chunks via ChromaDB."""
+    """Retrieve relevant knowledge base chunks via ChromaDB or the NumPy index."""
 
     def __init__(
         self,
         persist_dir: str = CHROMA_PERSIST_DIR,
         model_name: str = EMBEDDING_MODEL,
+        embedder: Optional[EmbeddingService] = None,
+        backend: str = RAG_BACKEND,
+        index_dir: str = VECTOR_INDEX_DIR,
     ):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True},
-        )
+        if backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown RAG_BACKEND: {backend}")
+        self.backend = backend
+        self.persist_dir = persist_dir
+        self.store_dir = index_dir if backend == "numpy" else persist_dir
+        self.embeddings = embedder or EmbeddingService(model_name)
+        self._pointer_path = os.path.join(self.store_dir, ACTIVE_POINTER)
+        self._reload_lock = threading.Lock()
+        self._open_active()
+        print(f"[RAGEngine] Using {backend} backend, collection {self.collection_name}")
+
+    def _open_active(self) -> None:
+        self._pointer_signature = path_signature(self._pointer_path)
+        self.collection_name = read_active_collection(self.store_dir)["collection"]
+        if self.backend == "numpy":
+            self.index = NumpyVectorIndex(active_index_path(self.store_dir))
+            return
+        # One client shared by the LangChain wrapper and the batched queries
+        self.client = chromadb.PersistentClient(path=self.persist_dir)
         self.vectorstore = Chroma(
-            collection_name=COLLECTION_NAME,
-            persist_directory=persist_dir,
+            client=self.client,
+            collection_name=self.collection_name,
             embedding_function=self.embeddings,
         )
+        self.collection = self.client.get_collection(
+            self.collection_name, embedding_function=None
+        )
         self.retriever = self.vectorstore.as_retriever(
             search_type="similarity",
             search_kwargs={"k": RAG_K},
         )
 
-    def retrieve(self, query: str, k: int = RAG_K):
-        """Return list of (content, metadata, score) tuples."""
-        results = self.vectorstore.similarity_search_with_score(query, k=k)
+    def refresh(self) -> bool:
+        """Re-open the store if a rebuild switched the active collection."""
+        if path_signature(self._pointer_path) == self._pointer_signature:
+            return False
+        with self._reload_lock:
+            if path_signature(self._pointer_path) == self._pointer_signature:
+                return False
+            self._open_active()
+        print(f"[RAGEngine] Switched to collection {self.collection_name}")
+        return True
+
+    @property
+    def version(self) -> str:
+        """Signature of the live collection, used to invalidate response caches."""
+        self.refresh()
+        if self._pointer_signature == "missing":  # store built before the pointer existed
+            if self.backend == "numpy":
+                return path_signature(os.path.join(self.index.path, "manifest.json"))
+            return path_signature(os.path.join(self.persist_dir, "chroma.sqlite3"))
+        return self.collection_name
+
+    def retrieve(self, query: str, k: int = RAG_K, query_embedding=None):
+        """Return list of (content, metadata, score) tuples.
+
+        If ``query_embedding`` is given the store is searched by vector and
+        the query text is not embedded again.
+        """
+        self.refresh()
+        if query_embedding is None:
+            query_embedding = self.embeddings.encode([query])[0]
+        if self.backend == "numpy":
+            with metrics.span("vector_search"):
+                return self.index.search([query_embedding], k=k)[0]
+        with metrics.span("vector_search"):
+            results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                [float(x) for x in query_embedding], k=k
+            )
         return [
             {
                 "content": doc.page_content,
@@ -54,12 +162,51 @@ class RAGEngine:
             for doc, score in results
         ]
 
-    def get_context_string(self, query: str, k: int = RAG_K) -> str:
-        """Return a formatted context string for the LLM prompt."""
-        chunks = self.retrieve(query, k=k)
+    def retrieve_batch(self, query_embeddings, k: int = RAG_K) -> List[List[dict]]:
+        """Search the store for many query vectors in one Chroma query / matrix product."""
+        if len(query_embeddings) == 0:
+            return []
+        self.refresh()
+        if self.backend == "numpy":
+            with metrics.span("vector_search"):
+                return self.index.search(query_embeddings, k=k)
+        with metrics.span("vector_search"):
+            results = self.collection.query(
+                query_embeddings=[[float(x) for x in emb] for emb in query_embeddings],
+                n_results=k,
+                include=["documents", "metadatas", "distances"],
+            )
+        batches = []
+        for docs, metas, dists in zip(
+            results["documents"], results["metadatas"], results["distances"]
+        ):
+            batches.append([
+                {
+                    "content": doc,
+                    "source": os.path.basename((meta or {}).get("source", "unknown")),
+                    "score": float(dist),
+                }
+                for doc, meta, dist in zip(docs, metas, dists)
+            ])
+        return batches
+
+    @staticmethod
+    def format_context(chunks: List[dict]) -> str:
+        """Join retrieved chunks into the context block used in the prompt."""
         if not chunks:
             return ""
         parts = []
         for i, c in enumerate(chunks, 1):
             parts.append(f"[Source: {c['source']}]\n{c['content']}")
         return "\n\n---\n\n".join(parts)
+
+    def get_context_string(self, query: str, k: int = RAG_K, query_embedding=None) -> str:
+        """Return a formatted context string for the LLM prompt."""
+        return self.format_context(self.retrieve(query, k=k, query_embedding=query_embedding))
+
+    def retrieve_with_context(
+        self, query: str, k: int = RAG_K, query_embedding=None
+    ) -> Tuple[List[dict], str]:
+        """Return ``(chunks, context_string)`` from a single vector search."""
+        chunks = self.retrieve(query, k=k, query_embedding=query_embedding)
+        return chunks, self.format_context(chunks)
@@ -0,0 +1,200 @@
+"""Response caches in front of the BFSI pipeline.
+
+``ResponseCache`` is an exact-match LRU keyed on a normalised form of the
+query (case-folded, punctuation and whitespace collapsed) with a bounded
+size and a per-entry TTL.  Entries are tagged with a version string built
+from the dataset, vector store and LoRA adapter signatures; when any of
+those change the cache is cleared.
+
+``SemanticCache`` stores the query embedding and final sanitised answer
+of Tier 2/3 responses so that paraphrases of an earlier question can be
+answered with one dot product instead of a TinyLlama generation.
+"""
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # seconds
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse punctuation/whitespace: 'What is KYC?' -> 'what is kyc'."""
+    q = _PUNCT_RE.sub(" ", query.casefold())
+    return _SPACE_RE.sub(" ", q).strip()
+
+
+def path_signature(path: str) -> str:
+    """Cheap change detector for a file or directory (size + mtime of each file)."""
+    if os.path.isfile(path):
+        files = [path]
+    elif os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if os.path.isfile(os.path.join(path, name))
+        )
+    else:
+        return "missing"
+    parts = []
+    for f in files:
+        st = os.stat(f)
+        parts.append(f"{os.path.basename(f)}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+class ResponseCache:
+    """Bounded LRU + TTL cache of final pipeline results."""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_version(self, version: str) -> None:
+        """Clear the cache if the underlying data/model version changed."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, query: str) -> Optional[dict]:
+        key = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.copy(entry[1])
+
+    def put(self, query: str, result: dict) -> None:
+        if self.max_size <= 0:
+            return
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.copy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SemanticCache:
+    """Cosine-similarity cache of generated (Tier 2/3) answers.
+
+    Embeddings live in a preallocated float32 matrix; when full, the least
+    recently used slot is overwritten.
+    """
+
+    def __init__(
+        self,
+        max_size: int = SEMANTIC_CACHE_SIZE,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+    ):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._results: list = []
+        self._last_used = np.zeros(max_size, dtype=np.int64)
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def set_version(self, version: str) -> None:
+        with self._lock:
+            if version != self.version:
+                self._results = []
+                self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results = []
+
+    def get(self, query_embedding: np.ndarray) -> Optional[dict]:
+        """Return the cached result closest to ``query_embedding`` if above threshold."""
+        with self._lock:
+            n = len(self._results)
+            if n == 0 or query_embedding is None:
+                self.misses += 1
+                return None
+            scores = self._matrix[:n] @ np.asarray(query_embedding, dtype=np.float32)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._tick += 1
+            self._last_used[best] = self._tick
+            self.hits += 1
+            result = copy.copy(self._results[best])
+            result["semantic_score"] = float(scores[best])
+            return result
+
+    def put(self, query_embedding: np.ndarray, result: dict) -> None:
+        if self.max_size <= 0 or query_embedding is None:
+            return
+        vec = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_size, vec.shape[0]), dtype=np.float32)
+            n = len(self._results)
+            if n < self.max_size:
+                slot = n
+                self._results.append(None)
+            else:
+                slot = int(np.argmin(self._last_used))
+            self._matrix[slot] = vec
+            self._results[slot] = copy.copy(result)
+            self._tick += 1
+            self._last_used[slot] = self._tick
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._results),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,332 @@
+"""Headless HTTP server for the BFSI pipeline.
+
+A FastAPI app next to the Streamlit UI for programmatic clients (IVR,
+agent desktop).  It serves the same ``BFSIPipeline``:
+
+  POST /query          {"query": "..."}          -> final answer + routing info
+  POST /query/stream   {"query": "..."}          -> NDJSON: meta, deltas, done (or error)
+  POST /batch          {"queries": ["...", ...]} -> list of answers
+  GET  /health                                   -> liveness
+  GET  /ready                                    -> 200 once models are warm
+  GET  /metrics                                  -> request / cache / batching counters
+  GET  /metrics/prometheus                       -> per-node / per-step latency histograms
+
+Requests beyond ``SERVER_MAX_PENDING`` in flight are answered with 429
+instead of queueing without bound; the retrieval and generation stages
+run on the pipeline's bounded worker pools with per-stage timeouts (504).
+Models are loaded and warmed up before ``/ready`` reports ready.  Query
+bodies may carry a ``latency_budget`` in seconds; answers that could not be
+generated in time come back with a ``*fallback`` tier instead of a 504.
+
+Run with the real models, or with the dependency-free stub engines:
+    python -m src.server [--stub] [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+from src.metrics import REGISTRY
+from src.pipeline import BFSIPipeline, TierTimeoutError
+
+load_dotenv()
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", "64"))        # admitted requests before 429
+MAX_BATCH = int(os.getenv("SERVER_MAX_BATCH", "64"))            # queries per /batch call
+RETRIEVAL_TIMEOUT = float(os.getenv("SERVER_RETRIEVAL_TIMEOUT", "5"))
+GENERATION_TIMEOUT = float(os.getenv("SERVER_GENERATION_TIMEOUT", "60"))
+BATCH_TIMEOUT = float(os.getenv("SERVER_BATCH_TIMEOUT", "300"))
+USE_STUBS = os.getenv("SERVER_STUB_ENGINES", "0") == "1"
+
+WARMUP_QUERIES = [
+    "What is the eligibility criteria for a home loan?",                    # Tier 1
+    "Can you explain how a floating interest rate affects my EMI?",         # Tier 2/3
+]
+
+# Fields of the pipeline state returned to clients
+RESULT_FIELDS = (
+    "query", "response", "tier_used", "dataset_score", "rag_score",
+    "cache_hit", "semantic_cache_hit",
+)
+
+
+class QueryRequest(BaseModel):
+    query: str
+    latency_budget: Optional[float] = None   # seconds; None = PIPELINE_LATENCY_BUDGET
+
+
+class BatchRequest(BaseModel):
+    queries: List[str]
+    latency_budget: Optional[float] = None
+
+
+def build_pipeline(use_stubs: bool = USE_STUBS) -> BFSIPipeline:
+    """Load the engines the way app.py does (or the stubs) into a pipeline."""
+    from src.guardrails import Guardrails
+    from src.response_cache import ResponseCache, SemanticCache
+
+    timeouts = {"retrieval": RETRIEVAL_TIMEOUT, "generation": GENERATION_TIMEOUT}
+    if use_stubs:
+        from src.stub_engines import StubDatasetMatcher, StubRAGEngine, StubSLMEngine
+        return BFSIPipeline(
+            StubDatasetMatcher(), StubSLMEngine(), StubRAGEngine(), Guardrails(),
+            response_cache=ResponseCache(), semantic_cache=SemanticCache(),
+            timeouts=timeouts,
+        )
+
+    from src.batching import MicroBatchScheduler
+    from src.dataset_matcher import DatasetMatcher
+    from src.domain_classifier import GUARDRAIL_MODE, DomainClassifier
+    from src.embeddings import EmbeddingService
+    from src.rag_engine import RAGEngine, vector_store_dir
+    from src.slm_engine import SLMEngine
+
+    embedder = EmbeddingService()
+    dataset_matcher = DatasetMatcher(embedder=embedder)
+    slm_engine = MicroBatchScheduler(SLMEngine(use_lora=True))
+    rag_engine = RAGEngine(embedder=embedder) if os.path.isdir(vector_store_dir()) else None
+    classifier = None
+    if GUARDRAIL_MODE == "embedding":
+        classifier = DomainClassifier(embedder, dataset_matcher.instruction_embeddings)
+    return BFSIPipeline(
+        dataset_matcher, slm_engine, rag_engine, Guardrails(classifier=classifier),
+        response_cache=ResponseCache(), semantic_cache=SemanticCache(),
+        timeouts=timeouts,
+    )
+
+
+def _public(result: dict) -> dict:
+    return {k: result.get(k) for k in RESULT_FIELDS}
+
+
+class _ServerState:
+    """Readiness flag, admission counter and request metrics."""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pipeline = None
+        self.ready = False
+        self.load_error = None
+        self.pending = 0
+        self.counters: Counter = Counter()
+        self.tiers: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def admit(self) -> None:
+        """Reserve a slot or raise 429."""
+        if not self.ready:
+            raise HTTPException(status_code=503, detail="Models are still loading.")
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.counters["rejected_429"] += 1
+                raise HTTPException(
+                    status_code=429, detail="Server busy, retry shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+            self.counters["admitted"] += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def releaser(self) -> Callable[[], None]:
+        """A ``release`` for one admitted request that only acts on its first call."""
+        released = threading.Event()
+
+        def _release() -> None:
+            with self._lock:
+                if released.is_set():
+                    return
+                released.set()
+                self.pending -= 1
+        return _release
+
+    def count(self, key: str, tier: str = "") -> None:
+        with self._lock:
+            self.counters[key] += 1
+            if tier:
+                self.tiers[tier] += 1
+
+
+def create_app(pipeline_factory: Callable[[], BFSIPipeline] = build_pipeline,
+               max_pending: int = MAX_PENDING) -> FastAPI:
+    """Build the FastAPI app; ``pipeline_factory`` runs once at start-up."""
+    server = _ServerState(max_pending)
+
+    def _load_and_warm_up() -> None:
+        try:
+            pipeline = pipeline_factory()
+            for query in WARMUP_QUERIES:
+                pipeline.run(query)
+            if pipeline.response_cache is not None:
+                pipeline.response_cache.clear()
+            if pipeline.semantic_cache is not None:
+                pipeline.semantic_cache.clear()
+            REGISTRY.reset()  # keep warm-up out of the latency histograms
+            server.pipeline = pipeline
+            server.ready = True
+            print("[Server] Pipeline warm, accepting requests.")
+        except Exception as exc:  # reported through /ready
+            server.load_error = repr(exc)
+            print(f"[Server] Pipeline failed to load: {exc!r}")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Load in the background so /health answers while models load
+        loader = threading.Thread(target=_load_and_warm_up, name="bfsi-warmup", daemon=True)
+        loader.start()
+        yield
+        if server.pipeline is not None:
+            server.pipeline.close()
+
+    app = FastAPI(title="BFSI Call Center Assistant", lifespan=lifespan)
+    app.state.server = server
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready():
+        if server.ready:
+            return {"status": "ready"}
+        status = "failed" if server.load_error else "loading"
+        return JSONResponse(
+            status_code=503, content={"status": status, "error": server.load_error}
+        )
+
+    @app.post("/query")
+    async def query(request: QueryRequest):
+        server.admit()
+        try:
+            t0 = time.perf_counter()
+            result = await server.pipeline.arun(request.query, request.latency_budget)
+        except TierTimeoutError as exc:
+            server.count(f"timeout_{exc.stage}")
+            raise HTTPException(status_code=504, detail=str(exc))
+        finally:
+            server.release()
+        server.count("completed", result["tier_used"])
+        body = _public(result)
+        body["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        body["trace_id"] = result["trace"]["trace_id"]
+        return body
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest):
+        server.admit()
+        release = server.releaser()
+        try:
+            # Guardrails, Tier 1 and retrieval run before the first byte
+            state, chunks = await server.pipeline.arun_stream(
+                request.query, request.latency_budget
+            )
+        except TierTimeoutError as exc:
+            release()
+            server.count(f"timeout_{exc.stage}")
+            raise HTTPException(status_code=504, detail=str(exc))
+        except Exception:
+            release()
+            raise
+
+        async def _lines():
+            try:
+                meta = {k: state.get(k) for k in RESULT_FIELDS if k != "response"}
+                yield json.dumps({"event": "meta", **meta}) + "\n"
+                # Decoded on the generation pool under SERVER_GENERATION_TIMEOUT
+                async for text in server.pipeline.astream_chunks(chunks):
+                    yield json.dumps({"event": "delta", "text": text}) + "\n"
+                yield json.dumps({"event": "done", "response": state["response"]}) + "\n"
+                server.count("completed", state["tier_used"])
+            except TierTimeoutError as exc:
+                # The 200 is already sent: end the stream with an error event
+                server.count(f"timeout_{exc.stage}")
+                yield json.dumps({"event": "error", "detail": str(exc)}) + "\n"
+            finally:
+                release()
+
+        # The background task also releases the slot when the client leaves
+        # before the body is ever iterated
+        return StreamingResponse(
+            _lines(), media_type="application/x-ndjson", background=BackgroundTask(release)
+        )
+
+    @app.post("/batch")
+    async def batch(request: BatchRequest):
+        if len(request.queries) > MAX_BATCH:
+            raise HTTPException(
+                status_code=413, detail=f"At most {MAX_BATCH} queries per batch."
+            )
+        server.admit()
+        try:
+            results = await asyncio.wait_for(
+                server.pipeline.arun_batch(request.queries, request.latency_budget), BATCH_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            server.count("timeout_batch")
+            raise HTTPException(status_code=504, detail="batch timed out")
+        finally:
+            server.release()
+        for result in results:
+            server.count("completed", result["tier_used"])
+        return {"results": [_public(r) for r in results]}
+
+    @app.get("/metrics")
+    async def metrics():
+        pipeline = server.pipeline
+        body = {
+            "ready": server.ready,
+            "pending": server.pending,
+            "max_pending": server.max_pending,
+            "requests": dict(server.counters),
+            "tiers": dict(server.tiers),
+        }
+        if pipeline is not None:
+            if pipeline.response_cache is not None:
+                body["response_cache"] = pipeline.response_cache.stats()
+            if pipeline.semantic_cache is not None:
+                body["semantic_cache"] = pipeline.semantic_cache.stats()
+            for name in ("stats", "token_stats"):
+                if pipeline.slm_engine is not None and hasattr(pipeline.slm_engine, name):
+                    body["slm_" + name] = getattr(pipeline.slm_engine, name)()
+        body["latency"] = REGISTRY.snapshot()
+        return body
+
+    @app.get("/metrics/prometheus")
+    async def prometheus():
+        return PlainTextResponse(
+            REGISTRY.prometheus_text(), media_type="text/plain; version=0.0.4"
+        )
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BFSI assistant HTTP server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--stub", action="store_true", help="serve the stub engines")
+    args = parser.parse_args()
+
+    use_stubs = args.stub or USE_STUBS
+    app = create_app(lambda: build_pipeline(use_stubs))
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
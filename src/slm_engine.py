@@ -1,23 +1,63 @@
 """Tier 2 -- SLM Engine.
 
-Loads the QLoRA fine-tuned TinyLlama-1.1B-Chat model with 4-bit
-quantisation and generates responses for queries that did not match
-the curated dataset (Tier 1).
+Loads the QLoRA fine-tuned TinyLlama-1.1B-Chat model and generates
+responses for queries that did not match the curated dataset (Tier 1).
+Two inference backends are available, selected with ``SLM_BACKEND``:
+
+  cuda-4bit  bitsandbytes NF4 on a CUDA GPU (the training setup)
+  cpu-int8   LoRA merged into fp32 weights, then torch dynamic int8
+             quantisation of every Linear layer – no bitsandbytes/CUDA
+  auto       cuda-4bit if a GPU is visible, otherwise cpu-int8
+
+If ``scripts/export_merged_model.py`` has produced a merged checkpoint
+whose manifest matches the base model and current adapter, it is loaded
+instead of base model + ``PeftModel`` wrapping.
 
 Optionally accepts RAG context to produce grounded answers (Tier 3).
+``generate_stream`` yields the answer incrementally as tokens are decoded.
+
+Each query gets a token budget chosen from its type (short factual
+question, regular question, drafting task) unless ``max_new_tokens`` is
+given, and generation stops as soon as EOS or a chat role tag appears.
+Per-request token counts are kept so the savings can be measured with
+``token_stats``; tokenisation, prefill, decode and detokenisation are
+timed into ``src.metrics``.  An optional ``time.monotonic()`` deadline cuts a
+generation short, in which case ``None`` is returned instead of a
+truncated answer.
 """
+import copy
+import hashlib
+import json
 import os
-from typing import Optional
+import time
+import warnings
+from collections import deque
+from threading import Lock, Thread
+from typing import Iterator, List, Optional, Tuple
 
 import torch
 from dotenv import load_dotenv
 from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    BitsAndBytesConfig,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
+
+from src import metrics
+from src.guardrails import is_drafting_task
+from src.response_cache import path_signature
 
 load_dotenv()
 
 BASE_MODEL = os.getenv("BASE_MODEL_NAME", "TinyLlama/TinyLlama-1.1B-Chat-v1.0")
 LORA_PATH = os.getenv("LORA_ADAPTER_PATH", "models/bfsi-lora-adapter")
+MERGED_MODEL_PATH = os.getenv("MERGED_MODEL_PATH", "models/bfsi-merged")
+BACKEND = os.getenv("SLM_BACKEND", "auto")  # "auto" | "cuda-4bit" | "cpu-int8"
+NUM_THREADS = int(os.getenv("SLM_NUM_THREADS", "0"))  # 0 = one per physical core
 
 SYSTEM_PROMPT = (
     "You are a helpful BFSI (Banking, Financial Services, and Insurance) "
@@ -36,20 +76,231 @@ SYSTEM_PROMPT_RAG = (
 
 # -- Generation defaults --
 MAX_NEW_TOKENS = 300
-TEMPERATURE = 0.3
+TEMPERATURE = float(os.getenv("SLM_TEMPERATURE", "0.3"))  # 0 = greedy decoding
 TOP_P = 0.9
 REPETITION_PENALTY = 1.15
+BATCH_SIZE = int(os.getenv("SLM_BATCH_SIZE", "8"))  # rows per generate_batch call
+PREFIX_CACHE = os.getenv("SLM_PREFIX_CACHE", "1") == "1"
+SPECULATIVE = os.getenv("SLM_SPECULATIVE", "off")  # "off" | "prompt_lookup" | "draft"
+PROMPT_LOOKUP_TOKENS = int(os.getenv("SLM_PROMPT_LOOKUP_TOKENS", "10"))
+DRAFT_MODEL = os.getenv("SLM_DRAFT_MODEL", "")
+
+# -- Token budgets (max_new_tokens chosen per query type) --
+BUDGET_SHORT = int(os.getenv("SLM_BUDGET_SHORT", "128"))      # short factual questions
+BUDGET_DEFAULT = int(os.getenv("SLM_BUDGET_DEFAULT", "200"))
+BUDGET_DRAFT = int(os.getenv("SLM_BUDGET_DRAFT", str(MAX_NEW_TOKENS)))  # emails, letters, ...
+SHORT_QUERY_WORDS = 12
+TOKEN_LOG_SIZE = 1000  # per-request records kept for token_stats()
+
+# End of the assistant turn: EOS or the start of another chat role
+STOP_MARKERS = ["</s>", "<|system|>", "<|user|>", "<|assistant|>"]
+
+
+def adapter_hash(lora_path: str) -> str:
+    """SHA-256 over the adapter config and weights, recorded in merged manifests."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(lora_path)):
+        if name.startswith("adapter_"):
+            with open(os.path.join(lora_path, name), "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def load_merged_manifest(merged_path: str = MERGED_MODEL_PATH) -> Optional[dict]:
+    """Return the merged artifact manifest if it is usable for this config."""
+    try:
+        with open(os.path.join(merged_path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("base_model") != BASE_MODEL:
+        return None
+    # A stale artifact must not shadow a re-trained adapter
+    if os.path.isdir(LORA_PATH) and manifest.get("adapter_hash") != adapter_hash(LORA_PATH):
+        return None
+    return manifest
+
+
+def _expand_cache(past, batch_size: int):
+    """Copy a batch-1 KV cache to ``batch_size`` rows.
+
+    ``generate`` extends the cache in place, so the stored prefix cache is
+    never handed out directly.
+    """
+    if isinstance(past, tuple):  # legacy tuple-of-tuples format
+        return tuple(
+            (k.expand(batch_size, -1, -1, -1).contiguous(),
+             v.expand(batch_size, -1, -1, -1).contiguous())
+            for k, v in past
+        )
+    cache = copy.deepcopy(past)
+    if batch_size > 1:
+        cache.batch_repeat_interleave(batch_size)
+    return cache
+
+
+class RoleMarkerStoppingCriteria(StoppingCriteria):
+    """Stop generation as soon as EOS or a chat role tag has been produced."""
+
+    def __init__(self, tokenizer, prompt_length: int, markers=STOP_MARKERS, window: int = 10):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.markers = markers
+        self.window = window
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        tail = input_ids[:, self.prompt_length:][:, -self.window:]
+        texts = self.tokenizer.batch_decode(tail, skip_special_tokens=False)
+        done = [any(m in t for m in self.markers) for t in texts]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class TokenBudgetStoppingCriteria(StoppingCriteria):
+    """Per-row ``max_new_tokens`` for batches whose rows have different budgets."""
+
+    def __init__(self, prompt_length: int, budgets: List[int]):
+        self.prompt_length = prompt_length
+        self.budgets = torch.tensor(budgets, dtype=torch.long)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_length
+        return self.budgets.to(input_ids.device) <= generated
+
+
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """Stop rows whose ``time.monotonic()`` deadline has passed (``None`` = no deadline).
+
+    ``expired_at[row]`` is the number of generated tokens when the row's
+    deadline was first seen to have passed, to tell a cut-off row from
+    one that finished on its own.
+    """
+
+    def __init__(self, prompt_length: int, deadlines: List[Optional[float]]):
+        self.prompt_length = prompt_length
+        self.deadlines = [float("inf") if d is None else d for d in deadlines]
+        self.expired_at: List[Optional[int]] = [None] * len(deadlines)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        now = time.monotonic()
+        expired = [now >= d for d in self.deadlines]
+        for row, done in enumerate(expired):
+            if done and self.expired_at[row] is None:
+                self.expired_at[row] = input_ids.shape[1] - self.prompt_length
+        return torch.tensor(expired, dtype=torch.bool, device=input_ids.device)
+
+
+class FirstTokenTimer(StoppingCriteria):
+    """Never stops; notes when the first new token exists (end of prefill)."""
+
+    def __init__(self):
+        self.first = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        if self.first is None:
+            self.first = time.perf_counter()
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic int8 quantisation of every ``Linear`` layer (the cpu-int8 backend).
+
+    ``torch.ao.quantization.quantize_dynamic`` is deprecated upstream in
+    favour of torchao but still works on the pinned torch range; its
+    deprecation warnings are silenced here.  If a torch build lacks it
+    (or has no quantised CPU engine) a clear error names the alternatives.
+    """
+    quantize = getattr(getattr(torch.ao, "quantization", None), "quantize_dynamic", None)
+    engines = [e for e in torch.backends.quantized.supported_engines if e != "none"]
+    if quantize is None or not engines:
+        raise RuntimeError(
+            f"SLM_BACKEND=cpu-int8 needs torch.ao.quantization.quantize_dynamic and a "
+            f"quantised CPU engine, which torch {torch.__version__} does not provide. "
+            "Install a torch version from requirements.txt or use SLM_BACKEND=cuda-4bit."
+        )
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        warnings.filterwarnings("ignore", message=".*deprecated.*", category=UserWarning)
+        return quantize(model, {torch.nn.Linear}, dtype=torch.qint8)
 
 
 class SLMEngine:
     """Load and run the fine-tuned TinyLlama model."""
 
-    def __init__(self, use_lora: bool = True):
+    def __init__(
+        self,
+        use_lora: bool = True,
+        backend: str = BACKEND,
+        speculative: str = SPECULATIVE,
+    ):
+        self.temperature = TEMPERATURE
+        self.lora_path = None
+        self._token_log = deque(maxlen=TOKEN_LOG_SIZE)
+        self._token_lock = Lock()
+        if backend == "auto":
+            backend = "cuda-4bit" if torch.cuda.is_available() else "cpu-int8"
+        if backend not in ("cuda-4bit", "cpu-int8"):
+            raise ValueError(f"Unknown SLM_BACKEND: {backend}")
+        self.backend = backend
+
         print("[SLMEngine] Loading tokenizer ...")
         self.tokenizer = AutoTokenizer.from_pretrained(
             BASE_MODEL, trust_remote_code=True
         )
         self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"  # decoder-only batching
+
+        lora_path = LORA_PATH if use_lora and os.path.isdir(LORA_PATH) else None
+        merged = load_merged_manifest() if use_lora else None
+        if merged and backend == "cpu-int8" and merged.get("quantization") == "nf4":
+            merged = None  # NF4 weights need bitsandbytes + CUDA
+        self.merged_path = MERGED_MODEL_PATH if merged else None
+
+        if backend == "cuda-4bit":
+            self.model = self._load_cuda_4bit(lora_path, merged)
+        else:
+            self.model = self._load_cpu_int8(lora_path, merged)
+        self.lora_path = lora_path
+
+        self.model.eval()
+
+        self.use_prefix_cache = PREFIX_CACHE
+        self._prefix_cache = {}
+        if self.use_prefix_cache:
+            print("[SLMEngine] Pre-computing system prompt KV cache ...")
+            self._build_prefix_cache()
+
+        if speculative not in ("off", "prompt_lookup", "draft"):
+            raise ValueError(f"Unknown SLM_SPECULATIVE: {speculative}")
+        self.speculative = speculative
+        self.draft_model = None
+        if speculative == "draft":
+            if not DRAFT_MODEL:
+                raise ValueError("SLM_SPECULATIVE=draft requires SLM_DRAFT_MODEL")
+            print(f"[SLMEngine] Loading draft model {DRAFT_MODEL} ...")
+            self.draft_model = AutoModelForCausalLM.from_pretrained(
+                DRAFT_MODEL,
+                torch_dtype=torch.float16 if backend == "cuda-4bit" else torch.float32,
+                device_map="auto" if backend == "cuda-4bit" else None,
+                trust_remote_code=True,
+            ).eval()
+        print(f"[SLMEngine] Ready ({backend}).")
+
+    @staticmethod
+    def _load_cuda_4bit(lora_path: Optional[str], merged: Optional[dict] = None):
+        if merged:
+            print(f"[SLMEngine] Loading merged model from {MERGED_MODEL_PATH} ...")
+            kwargs = {}
+            if merged.get("quantization") != "nf4":
+                kwargs["quantization_config"] = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.float16,
+                    bnb_4bit_use_double_quant=True,
+                )
+            return AutoModelForCausalLM.from_pretrained(
+                MERGED_MODEL_PATH, device_map="auto", trust_remote_code=True, **kwargs
+            )
 
         print("[SLMEngine] Loading base model (4-bit) ...")
         bnb = BitsAndBytesConfig(
@@ -58,54 +309,281 @@ class SLMEngine:
             bnb_4bit_compute_dtype=torch.float16,
             bnb_4bit_use_double_quant=True,
         )
-        self.model = AutoModelForCausalLM.from_pretrained(
+        model = AutoModelForCausalLM.from_pretrained(
             BASE_MODEL,
             quantization_config=bnb,
             device_map="auto",
             trust_remote_code=True,
         )
 
-        if use_lora and os.path.isdir(LORA_PATH):
-            print(f"[SLMEngine] Loading LoRA adapter from {LORA_PATH} ...")
-            self.model = PeftModel.from_pretrained(self.model, LORA_PATH)
+        if lora_path:
+            print(f"[SLMEngine] Loading LoRA adapter from {lora_path} ...")
+            model = PeftModel.from_pretrained(model, lora_path)
         else:
             print("[SLMEngine] Running base model (no LoRA adapter found).")
+        return model
 
-        self.model.eval()
-        print("[SLMEngine] Ready.")
+    @staticmethod
+    def _load_cpu_int8(lora_path: Optional[str], merged: Optional[dict] = None):
+        threads = NUM_THREADS or max(1, (os.cpu_count() or 2) // 2)
+        torch.set_num_threads(threads)
+        source = MERGED_MODEL_PATH if merged else BASE_MODEL
+        print(f"[SLMEngine] Loading {source} (fp32, CPU, {threads} threads) ...")
+        model = AutoModelForCausalLM.from_pretrained(
+            source,
+            torch_dtype=torch.float32,
+            low_cpu_mem_usage=True,
+            trust_remote_code=True,
+        )
+
+        if merged:
+            print("[SLMEngine] LoRA adapter already merged into the checkpoint.")
+        elif lora_path:
+            # Merge before quantising so the adapter adds no extra matmuls
+            print(f"[SLMEngine] Merging LoRA adapter from {lora_path} ...")
+            model = PeftModel.from_pretrained(model, lora_path).merge_and_unload()
+        else:
+            print("[SLMEngine] Running base model (no LoRA adapter found).")
+
+        print("[SLMEngine] Applying dynamic int8 quantisation ...")
+        return quantize_dynamic_int8(model)
+
+    @property
+    def version(self) -> str:
+        """Signature of the model/backend/adapter, used to invalidate response caches."""
+        base = f"{BASE_MODEL}|{self.backend}"
+        if self.merged_path is not None:
+            return base + "|" + path_signature(os.path.join(self.merged_path, "manifest.json"))
+        if self.lora_path is None:
+            return base
+        return base + "|" + path_signature(self.lora_path)
+
+    @staticmethod
+    def _system_prompt(rag_context: Optional[str]) -> str:
+        return SYSTEM_PROMPT_RAG if rag_context else SYSTEM_PROMPT
+
+    @staticmethod
+    def _prefix_text(sys_prompt: str) -> str:
+        return "<|system|>\n" + sys_prompt + "</s>\n"
 
     def _build_prompt(self, query: str, rag_context: Optional[str] = None) -> str:
         if rag_context:
-            sys_prompt = SYSTEM_PROMPT_RAG
             user_msg = "Context:\n" + rag_context + "\n\nQuestion: " + query
         else:
-            sys_prompt = SYSTEM_PROMPT
             user_msg = query
         return (
-            "<|system|>\n" + sys_prompt + "</s>\n"
-            "<|user|>\n" + user_msg + "</s>\n"
+            self._prefix_text(self._system_prompt(rag_context))
+            + "<|user|>\n" + user_msg + "</s>\n"
             "<|assistant|>\n"
         )
 
+    # -- Prefix KV cache ------------------------------------------------
+    @torch.inference_mode()
+    def _build_prefix_cache(self) -> None:
+        for sys_prompt in (SYSTEM_PROMPT, SYSTEM_PROMPT_RAG):
+            ids = self.tokenizer(
+                self._prefix_text(sys_prompt), return_tensors="pt"
+            )["input_ids"].to(self.model.device)
+            out = self.model(input_ids=ids, use_cache=True)
+            self._prefix_cache[sys_prompt] = (ids[0], out.past_key_values)
+
+    def _prepare_inputs(
+        self, prompts: List[str], sys_prompt: str, allow_prefix_cache: bool = True
+    ) -> dict:
+        """Tokenise prompts that share ``sys_prompt`` for ``model.generate``.
+
+        When the cached preamble is an exact token prefix of every prompt
+        the rows are laid out as ``[prefix][padding][suffix]`` and the
+        cached past key/values are attached, so only the suffix is
+        prefilled.  Otherwise the prompts are simply left-padded.
+        """
+        device = self.model.device
+        entry = None
+        if self.use_prefix_cache and allow_prefix_cache:
+            entry = self._prefix_cache.get(sys_prompt)
+        if entry is not None:
+            prefix_ids, past = entry
+            n = prefix_ids.shape[0]
+            rows = [
+                self.tokenizer(p, return_tensors="pt")["input_ids"][0].to(device)
+                for p in prompts
+            ]
+            if all(r.shape[0] > n and torch.equal(r[:n], prefix_ids) for r in rows):
+                width = max(r.shape[0] for r in rows)
+                input_ids = torch.full(
+                    (len(rows), width), self.tokenizer.pad_token_id, dtype=torch.long, device=device
+                )
+                attention_mask = torch.zeros_like(input_ids)
+                for i, r in enumerate(rows):
+                    input_ids[i, :n] = prefix_ids
+                    input_ids[i, width - (r.shape[0] - n):] = r[n:]
+                    attention_mask[i, :n] = 1
+                    attention_mask[i, width - (r.shape[0] - n):] = 1
+                return {
+                    "input_ids": input_ids,
+                    "attention_mask": attention_mask,
+                    "past_key_values": _expand_cache(past, len(rows)),
+                }
+        return dict(self.tokenizer(prompts, return_tensors="pt", padding=True).to(device))
+
+    # -- Token budgets & accounting ---------------------------------------
+    @staticmethod
+    def query_type(query: str) -> str:
+        """Classify a query as ``"draft"``, ``"short"`` or ``"default"``."""
+        if is_drafting_task(query):
+            return "draft"
+        q = query.lower().strip()
+        if len(q.split()) <= SHORT_QUERY_WORDS:
+            return "short"
+        return "default"
+
+    def token_budget(self, query: str) -> int:
+        """``max_new_tokens`` for ``query`` when the caller does not set one."""
+        return {"draft": BUDGET_DRAFT, "short": BUDGET_SHORT}.get(
+            self.query_type(query), BUDGET_DEFAULT
+        )
+
+    def _record_tokens(
+        self, query: str, budget: int, generated: torch.Tensor, expired_at: Optional[int] = None
+    ) -> Tuple[str, int]:
+        """Log how many tokens one row produced; return why it stopped and the count.
+
+        ``expired_at`` is the row's ``DeadlineStoppingCriteria.expired_at``.
+        """
+        # Finished rows are padded with EOS (= pad), so only the first EOS
+        # can be a generated token, and not even that after a role tag
+        eos = (generated == self.tokenizer.eos_token_id).nonzero()
+        end = int(eos[0, 0]) if len(eos) else generated.shape[0]
+        text = self.tokenizer.decode(generated[:end], skip_special_tokens=False)
+        n = end
+        if any(m in text for m in STOP_MARKERS):
+            reason = "stop"
+        elif expired_at is not None and end >= expired_at:
+            reason = "deadline"  # still running when the deadline hit; EOS is padding
+        elif len(eos):
+            n += 1
+            reason = "stop"
+        else:
+            reason = "budget"
+        n = min(n, budget)
+        if n >= budget:
+            reason = "budget"
+        with self._token_lock:
+            self._token_log.append({
+                "query_type": self.query_type(query),
+                "budget": budget,
+                "generated_tokens": n,
+                "stop_reason": reason,
+            })
+        return reason, n
+
+    def token_stats(self) -> dict:
+        """Aggregate token usage over the most recent requests.
+
+        ``tokens_saved`` is measured against the fixed ``MAX_NEW_TOKENS``
+        budget every request used to get.
+        """
+        with self._token_lock:
+            log = list(self._token_log)
+        if not log:
+            return {"requests": 0}
+        generated = sum(r["generated_tokens"] for r in log)
+        by_type = {}
+        for r in log:
+            entry = by_type.setdefault(r["query_type"], {"requests": 0, "generated_tokens": 0})
+            entry["requests"] += 1
+            entry["generated_tokens"] += r["generated_tokens"]
+        for entry in by_type.values():
+            entry["mean_tokens"] = round(entry["generated_tokens"] / entry["requests"], 1)
+        return {
+            "requests": len(log),
+            "generated_tokens": generated,
+            "mean_tokens": round(generated / len(log), 1),
+            "budget_tokens": sum(r["budget"] for r in log),
+            "tokens_saved": MAX_NEW_TOKENS * len(log) - generated,
+            "stopped_early": sum(r["stop_reason"] == "stop" for r in log),
+            "hit_budget": sum(r["stop_reason"] == "budget" for r in log),
+            "hit_deadline": sum(r["stop_reason"] == "deadline" for r in log),
+            "by_query_type": by_type,
+        }
+
+    @staticmethod
+    def _sampling_kwargs(temperature: float) -> dict:
+        # temperature == 0 selects greedy decoding, which makes answers cacheable
+        if temperature <= 0:
+            return {"do_sample": False}
+        return {"do_sample": True, "temperature": temperature, "top_p": TOP_P}
+
+    def _speculative_kwargs(self, temperature: float) -> dict:
+        # Assisted decoding only reproduces the main model exactly when greedy
+        if temperature > 0 or self.speculative == "off":
+            return {}
+        if self.speculative == "prompt_lookup":
+            return {"prompt_lookup_num_tokens": PROMPT_LOOKUP_TOKENS}
+        return {"assistant_model": self.draft_model}
+
     @torch.inference_mode()
+    def _timed_generate(self, inputs: dict, stopping: StoppingCriteriaList, **kwargs):
+        """``model.generate`` with prefill / decode timing; returns ``(outputs, decode_s)``."""
+        timer = FirstTokenTimer()
+        stopping.append(timer)
+        start = time.perf_counter()
+        outputs = self.model.generate(**inputs, stopping_criteria=stopping, **kwargs)
+        end = time.perf_counter()
+        first = timer.first or end
+        metrics.record("prefill", "step", start, first - start)
+        metrics.record("decode", "step", first, end - first)
+        return outputs, end - first
+
     def generate(
         self,
         query: str,
         rag_context: Optional[str] = None,
-        max_new_tokens: int = MAX_NEW_TOKENS,
-        temperature: float = TEMPERATURE,
-    ) -> str:
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        """Generate one answer; ``None`` if ``deadline`` passed before it was complete."""
+        if temperature is None:
+            temperature = self.temperature
+        if max_new_tokens is None:
+            max_new_tokens = self.token_budget(query)
         prompt = self._build_prompt(query, rag_context)
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
-        outputs = self.model.generate(
-            **inputs,
+        speculative = self._speculative_kwargs(temperature)
+        # Assisted decoding re-prefills itself; a pre-filled cache breaks exactness
+        with metrics.span("tokenize"):
+            inputs = self._prepare_inputs(
+                [prompt], self._system_prompt(rag_context), allow_prefix_cache=not speculative
+            )
+        prompt_length = inputs["input_ids"].shape[1]
+        stopping = StoppingCriteriaList(
+            [RoleMarkerStoppingCriteria(self.tokenizer, prompt_length)]
+        )
+        deadline_stop = None
+        if deadline is not None:
+            deadline_stop = DeadlineStoppingCriteria(prompt_length, [deadline])
+            stopping.append(deadline_stop)
+        outputs, decode_s = self._timed_generate(
+            inputs,
+            stopping,
+            **self._sampling_kwargs(temperature),
+            **speculative,
             max_new_tokens=max_new_tokens,
-            temperature=temperature,
-            top_p=TOP_P,
             repetition_penalty=REPETITION_PENALTY,
-            do_sample=True,
         )
-        full = self.tokenizer.decode(outputs[0], skip_special_tokens=False)
+        reason, n = self._record_tokens(
+            query, max_new_tokens, outputs[0, prompt_length:],
+            deadline_stop.expired_at[0] if deadline_stop else None,
+        )
+        metrics.record_decode(n - 1, decode_s)
+        if reason == "deadline":
+            return None
+        with metrics.span("detokenize"):
+            full = self.tokenizer.decode(outputs[0], skip_special_tokens=False)
+            return self._extract_response(full, prompt)
+
+    @staticmethod
+    def _extract_response(full: str, prompt: str) -> str:
         # Extract only the assistant response
         marker = "<|assistant|>\n"
         if marker in full:
@@ -113,6 +591,178 @@ class SLMEngine:
         else:
             response = full[len(prompt):]
         # Clean up end-of-sequence tokens
-        for tok in ["</s>", "<|system|>", "<|user|>", "<|assistant|>"]:
+        for tok in STOP_MARKERS:
             response = response.split(tok)[0]
         return response.strip()
+
+    @torch.inference_mode()
+    def generate_stream(
+        self,
+        query: str,
+        rag_context: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> Iterator[str]:
+        """Yield the assistant response as it is decoded.
+
+        Generation stops as soon as EOS or a role tag appears; text that
+        could be the start of such a marker is held back until resolved,
+        so the concatenated output equals what ``generate`` would return.
+        """
+        if temperature is None:
+            temperature = self.temperature
+        if max_new_tokens is None:
+            max_new_tokens = self.token_budget(query)
+        prompt = self._build_prompt(query, rag_context)
+        speculative = self._speculative_kwargs(temperature)
+        with metrics.span("tokenize"):
+            inputs = self._prepare_inputs(
+                [prompt], self._system_prompt(rag_context), allow_prefix_cache=not speculative
+            )
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=False
+        )
+        prompt_length = inputs["input_ids"].shape[1]
+        stopping = StoppingCriteriaList(
+            [RoleMarkerStoppingCriteria(self.tokenizer, prompt_length)]
+        )
+        errors = []
+
+        def _run():
+            try:
+                # Runs on its own thread: timings reach the histograms, not the trace
+                outputs, decode_s = self._timed_generate(
+                    inputs,
+                    stopping,
+                    **self._sampling_kwargs(temperature),
+                    **speculative,
+                    max_new_tokens=max_new_tokens,
+                    repetition_penalty=REPETITION_PENALTY,
+                    streamer=streamer,
+                )
+                _, n = self._record_tokens(query, max_new_tokens, outputs[0, prompt_length:])
+                metrics.record_decode(n - 1, decode_s)
+            except Exception as exc:  # surface in the consumer thread
+                errors.append(exc)
+                streamer.end()
+
+        thread = Thread(target=_run, daemon=True)
+        thread.start()
+
+        pending = ""
+        started = False
+        for text in streamer:
+            pending += text
+            cut = min((pending.find(m) for m in STOP_MARKERS if m in pending), default=-1)
+            if cut >= 0:
+                pending = pending[:cut]
+                break
+            if not started:
+                pending = pending.lstrip()
+            # Hold back trailing whitespace and any partial stop marker
+            keep = len(pending.rstrip())
+            for m in STOP_MARKERS:
+                for n in range(len(m) - 1, 0, -1):
+                    if pending.endswith(m[:n]):
+                        keep = min(keep, len(pending) - n)
+                        break
+            if keep > 0:
+                started = True
+                yield pending[:keep]
+                pending = pending[keep:]
+        thread.join()
+        if errors:
+            raise errors[0]
+        pending = pending.rstrip() if started else pending.strip()
+        if pending:
+            yield pending
+
+    @torch.inference_mode()
+    def generate_batch(
+        self,
+        queries: List[str],
+        rag_contexts: Optional[List[Optional[str]]] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        batch_size: int = BATCH_SIZE,
+        deadlines: Optional[List[Optional[float]]] = None,
+    ) -> List[Optional[str]]:
+        """Generate answers for many queries with left-padded batched ``generate``.
+
+        Results are returned in input order.  Under greedy decoding
+        (temperature 0) each answer matches ``generate`` for the same query.
+        Rows finish independently, each at its own token budget, stop
+        marker or deadline; a row cut off by its deadline returns ``None``.
+        """
+        if temperature is None:
+            temperature = self.temperature
+        if rag_contexts is None:
+            rag_contexts = [None] * len(queries)
+        if deadlines is None:
+            deadlines = [None] * len(queries)
+        if max_new_tokens is None:
+            budgets = [self.token_budget(q) for q in queries]
+        else:
+            budgets = [max_new_tokens] * len(queries)
+        prompts = [self._build_prompt(q, c) for q, c in zip(queries, rag_contexts)]
+
+        # Group by system prompt (so rows share one prefix cache), then sort
+        # by prompt length so each padded batch wastes as little as possible
+        order = sorted(
+            range(len(prompts)),
+            key=lambda i: (not rag_contexts[i], len(prompts[i])),
+        )
+        responses: List[Optional[str]] = [None] * len(prompts)
+        start = 0
+        while start < len(order):
+            has_context = bool(rag_contexts[order[start]])
+            idx = [order[start]]
+            while (
+                len(idx) < batch_size
+                and start + len(idx) < len(order)
+                and bool(rag_contexts[order[start + len(idx)]]) == has_context
+            ):
+                idx.append(order[start + len(idx)])
+            start += len(idx)
+
+            with metrics.span("tokenize"):
+                inputs = self._prepare_inputs(
+                    [prompts[i] for i in idx],
+                    SYSTEM_PROMPT_RAG if has_context else SYSTEM_PROMPT,
+                )
+            prompt_length = inputs["input_ids"].shape[1]
+            stopping = StoppingCriteriaList([
+                RoleMarkerStoppingCriteria(self.tokenizer, prompt_length),
+                TokenBudgetStoppingCriteria(prompt_length, [budgets[i] for i in idx]),
+            ])
+            deadline_stop = None
+            if any(deadlines[i] is not None for i in idx):
+                deadline_stop = DeadlineStoppingCriteria(
+                    prompt_length, [deadlines[i] for i in idx]
+                )
+                stopping.append(deadline_stop)
+            outputs, decode_s = self._timed_generate(
+                inputs,
+                stopping,
+                **self._sampling_kwargs(temperature),
+                max_new_tokens=max(budgets[i] for i in idx),
+                repetition_penalty=REPETITION_PENALTY,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+            decoded = 0
+            detokenize_start = time.perf_counter()
+            for row, i in enumerate(idx):
+                reason, n = self._record_tokens(
+                    queries[i], budgets[i], outputs[row, prompt_length:],
+                    deadline_stop.expired_at[row] if deadline_stop else None,
+                )
+                decoded += max(n - 1, 0)
+                if reason == "deadline":
+                    continue
+                full = self.tokenizer.decode(outputs[row], skip_special_tokens=False)
+                responses[i] = self._extract_response(full, prompts[i])
+            metrics.record(
+                "detokenize", "step", detokenize_start, time.perf_counter() - detokenize_start
+            )
+            metrics.record_decode(decoded, decode_s)
+        return responses
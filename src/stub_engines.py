@@ -0,0 +1,199 @@
+"""Lightweight stand-ins for the pipeline engines.
+
+Dependency-free (NumPy only) replacements for ``DatasetMatcher``,
+``RAGEngine`` and ``SLMEngine`` with the same method signatures and
+configurable latencies, so the pipeline, the async API and the HTTP
+server can be load-tested and exercised locally without downloading
+MiniLM, TinyLlama or building the Chroma store.
+
+Queries are embedded with a hashed bag of words, so an exact dataset
+instruction still scores 1.0 against Tier 1 and retrieval returns
+knowledge-base paragraphs that share words with the query.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src import metrics
+
+DATASET_PATH = os.path.join("data", "alpaca_bfsi_dataset.json")
+KNOWLEDGE_BASE_DIR = os.path.join("data", "knowledge_base")
+DIM = 384
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def hash_embed(texts: List[str], dim: int = DIM) -> np.ndarray:
+    """L2-normalised hashed bag-of-words vectors, one row per text."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in _WORD_RE.findall(text.lower()):
+            bucket = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % dim
+            out[row, bucket] += 1.0
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-12)
+
+
+class StubDatasetMatcher:
+    """Tier 1 over the real Alpaca dataset with hashed embeddings."""
+
+    def __init__(self, dataset_path: str = DATASET_PATH, encode_ms: float = 5.0):
+        with open(dataset_path, "r", encoding="utf-8") as f:
+            self.dataset = json.load(f)
+        self.encode_ms = encode_ms
+        self.instruction_embeddings = hash_embed([s["instruction"] for s in self.dataset])
+        self.version = "stub-dataset"
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries) -> np.ndarray:
+        with metrics.span("embedding"):
+            time.sleep(self.encode_ms / 1000.0)
+            return hash_embed(list(queries))
+
+    def search(self, query: str, threshold: float = 0.85, query_embedding=None):
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        return self.search_batch(query_embedding[None, :], threshold)[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, threshold: float = 0.85):
+        scores = self.instruction_embeddings @ query_embeddings.T
+        best = np.argmax(scores, axis=0)
+        results = []
+        for col, idx in enumerate(best):
+            score = float(scores[idx, col])
+            answer = self.dataset[int(idx)]["output"] if score >= threshold else None
+            results.append((answer, score))
+        return results
+
+
+class StubRAGEngine:
+    """Tier 3 over the knowledge-base paragraphs with hashed embeddings."""
+
+    def __init__(self, kb_dir: str = KNOWLEDGE_BASE_DIR, search_ms: float = 10.0):
+        self.chunks = []
+        for path in sorted(glob.glob(os.path.join(kb_dir, "*.md"))):
+            with open(path, "r", encoding="utf-8") as f:
+                for para in f.read().split("\n\n"):
+                    if para.strip():
+                        self.chunks.append((para.strip(), os.path.basename(path)))
+        self.search_ms = search_ms
+        self.embeddings = hash_embed([c for c, _ in self.chunks])
+        self.version = "stub-rag"
+
+    def retrieve(self, query: str, k: int = 3, query_embedding=None) -> List[dict]:
+        if query_embedding is None:
+            query_embedding = hash_embed([query])[0]
+        return self.retrieve_batch([query_embedding], k)[0]
+
+    def retrieve_batch(self, query_embeddings, k: int = 3) -> List[List[dict]]:
+        with metrics.span("vector_search"):
+            time.sleep(self.search_ms / 1000.0)
+            results = []
+            for emb in query_embeddings:
+                sims = self.embeddings @ np.asarray(emb, dtype=np.float32)
+                top = np.argsort(-sims)[:k]
+                # Same scale as Chroma's L2 distance on unit vectors: lower is closer
+                results.append([
+                    {"content": self.chunks[i][0], "source": self.chunks[i][1],
+                     "score": float(2.0 - 2.0 * sims[i])}
+                    for i in top
+                ])
+            return results
+
+    @staticmethod
+    def format_context(chunks: List[dict]) -> str:
+        return "\n\n---\n\n".join(f"[Source: {c['source']}]\n{c['content']}" for c in chunks)
+
+    def get_context_string(self, query: str, k: int = 3, query_embedding=None) -> str:
+        return self.format_context(self.retrieve(query, k=k, query_embedding=query_embedding))
+
+    def retrieve_with_context(
+        self, query: str, k: int = 3, query_embedding=None
+    ) -> Tuple[List[dict], str]:
+        chunks = self.retrieve(query, k=k, query_embedding=query_embedding)
+        return chunks, self.format_context(chunks)
+
+
+class StubSLMEngine:
+    """Tier 2 that sleeps like a decoder instead of running one."""
+
+    def __init__(self, ms_per_token: float = 20.0, tokens: int = 60, prefill_ms: float = 50.0):
+        self.ms_per_token = ms_per_token
+        self.tokens = tokens
+        self.prefill_ms = prefill_ms
+        self.temperature = 0.0
+        self.version = "stub-slm"
+        self.backend = "stub"
+
+    def _answer(self, query: str, rag_context: Optional[str]) -> List[str]:
+        source = "the policy documents" if rag_context else "general guidance"
+        words = f"Based on {source}, here is an answer to: {query}".split()
+        return (words * (self.tokens // len(words) + 1))[:self.tokens]
+
+    def generate(
+        self,
+        query: str,
+        rag_context: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[str]:
+        words = self._answer(query, rag_context)[:max_new_tokens or self.tokens]
+        return self.generate_batch(
+            [query], [rag_context], max_new_tokens=len(words), deadlines=[deadline]
+        )[0]
+
+    def generate_stream(
+        self,
+        query: str,
+        rag_context: Optional[str] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> Iterator[str]:
+        time.sleep(self.prefill_ms / 1000.0)
+        for i, word in enumerate(self._answer(query, rag_context)[:max_new_tokens or self.tokens]):
+            time.sleep(self.ms_per_token / 1000.0)
+            yield word if i == 0 else " " + word
+
+    def generate_batch(
+        self,
+        queries: List[str],
+        rag_contexts: Optional[List[Optional[str]]] = None,
+        max_new_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        batch_size: int = 8,
+        deadlines: Optional[List[Optional[float]]] = None,
+    ) -> List[Optional[str]]:
+        if rag_contexts is None:
+            rag_contexts = [None] * len(queries)
+        if deadlines is None:
+            deadlines = [None] * len(queries)
+        tokens = min(max_new_tokens or self.tokens, self.tokens)
+        answers = [
+            " ".join(self._answer(q, c)[:tokens]) for q, c in zip(queries, rag_contexts)
+        ]
+        # One padded batch decodes about as fast as a single row
+        start = time.monotonic()
+        finish = start + (self.prefill_ms + self.ms_per_token * tokens) / 1000.0
+        # Rows past their deadline drop out; the call lasts as long as the latest row
+        ends = [finish if d is None else min(d, finish) for d in deadlines]
+        t0 = time.perf_counter()
+        time.sleep(max(max(ends, default=start) - start, 0.0))
+        elapsed = time.perf_counter() - t0
+        prefill = min(self.prefill_ms / 1000.0, elapsed)
+        metrics.record("prefill", "step", t0, prefill)
+        metrics.record("decode", "step", t0 + prefill, elapsed - prefill)
+        done = [a if end >= finish else None for a, end in zip(answers, ends)]
+        metrics.record_decode(sum(a is not None for a in done) * (tokens - 1), elapsed - prefill)
+        return done
+
+    def token_stats(self) -> dict:
+        return {"requests": 0}
@@ -0,0 +1,157 @@
+"""In-process NumPy vector index – an alternative retrieval backend to Chroma.
+
+The knowledge base is a few thousand chunks, so exact search over one
+memory-mapped matrix is cheaper than a round trip through the Chroma
+client (SQLite / HNSW persistence, LangChain ``Document`` objects,
+metadata decoding).  An index directory holds:
+
+  embeddings.npy   (N, dim) float32 or float16 unit vectors, memory-mapped
+  text.bin         all chunk texts as one UTF-8 blob
+  offsets.npy      (N + 1,) int64 byte offsets into text.bin
+  source_ids.npy   (N,) int32 index into sources.json
+  sources.json     distinct source paths
+  manifest.json    count, dim, dtype, embedding model
+
+Only the top-k texts are ever decoded.  Scores use Chroma's L2 distance
+on unit vectors (``2 - 2 * cos``), so ``RAG_RELEVANCE_THRESHOLD`` keeps
+its meaning.  ``scripts/build_vectorstore.py`` exports the index next to
+each Chroma build; select it with ``RAG_BACKEND=numpy``.
+
+``VECTOR_INDEX_QUANTIZATION=int8|binary`` scans compact codes instead of
+the matrix and re-ranks a shortlist in float (``src/quantization.py``);
+the codes are written into the index directory on first load.
+"""
+import json
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.quantization import QUANT_MODES, QuantizedVectors
+
+load_dotenv()
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join("data", "vector_index"))
+VECTOR_INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")  # "float32" | "float16"
+# "none" | "int8" | "binary"
+VECTOR_INDEX_QUANTIZATION = os.getenv("VECTOR_INDEX_QUANTIZATION", "none")
+SCAN_BLOCK = 4096  # float16 rows widened to float32 per step: bounds the temporary copy
+
+
+def write_index(
+    path: str,
+    embeddings: np.ndarray,
+    texts: Sequence[str],
+    sources: Sequence[str],
+    dtype: str = VECTOR_INDEX_DTYPE,
+    manifest: Optional[dict] = None,
+) -> None:
+    """Write an index directory for ``texts`` and their unit-norm ``embeddings``."""
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported vector index dtype: {dtype}")
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or len(embeddings) != len(texts) or len(texts) != len(sources):
+        raise ValueError("embeddings, texts and sources must have one row per chunk")
+    os.makedirs(path, exist_ok=True)
+
+    blobs = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    source_names = sorted(set(sources))
+    lookup = {s: i for i, s in enumerate(source_names)}
+
+    np.save(os.path.join(path, "embeddings.npy"), embeddings.astype(dtype))
+    with open(os.path.join(path, "text.bin"), "wb") as f:
+        f.write(b"".join(blobs))
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    np.save(
+        os.path.join(path, "source_ids.npy"),
+        np.array([lookup[s] for s in sources], dtype=np.int32),
+    )
+    with open(os.path.join(path, "sources.json"), "w", encoding="utf-8") as f:
+        json.dump(source_names, f)
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            **(manifest or {}),
+            "count": len(texts),
+            "dim": int(embeddings.shape[1]) if len(texts) else 0,
+            "dtype": dtype,
+        }, f, indent=2)
+
+
+class NumpyVectorIndex:
+    """Exact top-k search over a memory-mapped embedding matrix."""
+
+    def __init__(self, path: str, quantization: str = VECTOR_INDEX_QUANTIZATION):
+        if quantization not in QUANT_MODES:
+            raise ValueError(f"Unknown VECTOR_INDEX_QUANTIZATION: {quantization}")
+        if not os.path.isfile(os.path.join(path, "manifest.json")):
+            raise FileNotFoundError(
+                f"No vector index at {path}; run scripts/build_vectorstore.py"
+            )
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self.source_ids = np.load(os.path.join(path, "source_ids.npy"))
+        with open(os.path.join(path, "sources.json"), "r", encoding="utf-8") as f:
+            self.sources = [os.path.basename(s) for s in json.load(f)]
+        text_path = os.path.join(path, "text.bin")
+        self._text = (
+            np.memmap(text_path, dtype=np.uint8, mode="r")
+            if os.path.getsize(text_path) else np.zeros(0, dtype=np.uint8)
+        )
+        self.quantized = None
+        if quantization != "none" and len(self):
+            self.quantized = QuantizedVectors.load_or_build(
+                self.embeddings, quantization, os.path.join(path, "codes")
+            )
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def text(self, i: int) -> str:
+        return bytes(self._text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def top_k(self, query_embeddings, k: int):
+        """Return ``(indices, cosine)`` arrays of shape (queries, k), best first."""
+        if self.quantized is not None:
+            return self.quantized.search(query_embeddings, k)
+        q = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.embeddings.shape[1])
+        k = min(k, len(self))
+        # A float16 matrix is widened one block at a time, never as a whole;
+        # a float32 one is scored in place with a single matmul
+        step = len(self) if self.embeddings.dtype == np.float32 else SCAN_BLOCK
+        cand_rows, cand_sims = [], []
+        for start in range(0, len(self), step):
+            block = np.asarray(self.embeddings[start:start + step], dtype=np.float32)
+            sims = q @ block.T
+            if k < sims.shape[1]:
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(sims.shape[1]), sims.shape)
+            cand_rows.append(top + start)
+            cand_sims.append(np.take_along_axis(sims, top, axis=1))
+        rows = np.concatenate(cand_rows, axis=1)
+        sims = np.concatenate(cand_sims, axis=1)
+        order = np.argsort(-sims, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(sims, order, axis=1)
+
+    def search(self, query_embeddings, k: int = 3) -> List[List[dict]]:
+        """Top-k chunks for each query vector, in ``RAGEngine.retrieve`` format."""
+        if len(query_embeddings) == 0 or len(self) == 0:
+            return [[] for _ in range(len(query_embeddings))]
+        indices, sims = self.top_k(query_embeddings, k)
+        return [
+            [
+                {
+                    "content": self.text(int(i)),
+                    "source": self.sources[self.source_ids[int(i)]],
+                    "score": float(2.0 - 2.0 * s),
+                }
+                for i, s in zip(row_idx, row_sims)
+            ]
+            for row_idx, row_sims in zip(indices, sims)
+        ]
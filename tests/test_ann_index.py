@@ -0,0 +1,89 @@
+"""IVF index: build, persist, reload, and recall against exact search."""
+import json
+
+import numpy as np
+
+from src import dataset_matcher
+from src.ann_index import IVFIndex
+from src.dataset_matcher import DatasetMatcher
+from src.embedding_cache import EmbeddingCache
+from src.stub_engines import hash_embed
+
+
+def _corpus(n=4000, dim=48, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((40, dim)).astype(np.float32)
+    x = centres[rng.integers(len(centres), size=n)] + 0.6 * rng.standard_normal((n, dim))
+    x = (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+    q = x[rng.integers(n, size=200)] + 0.05 * rng.standard_normal((200, dim))
+    q = (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+    return x, q
+
+
+def test_build_save_load_search(tmp_path):
+    vectors, queries = _corpus()
+    index = IVFIndex.build(vectors, n_lists=32)
+    path = str(tmp_path / "ivf.npz")
+    index.save(path)
+
+    loaded = IVFIndex.load(path, vectors)
+    assert loaded is not None and loaded.n_lists == 32
+    np.testing.assert_array_equal(loaded.order, index.order)
+    assert sorted(loaded.order.tolist()) == list(range(len(vectors)))
+
+    exact = np.argmax(queries @ vectors.T, axis=1)
+    rows, scores = loaded.search(queries, nprobe=8)
+    np.testing.assert_array_equal(rows, index.search(queries, nprobe=8)[0])
+    assert np.mean(rows == exact) >= 0.95
+    np.testing.assert_allclose(scores, np.sum(vectors[rows] * queries, axis=1), rtol=1e-5)
+    # Probing every list is exact search
+    np.testing.assert_array_equal(loaded.search(queries, nprobe=32)[0], exact)
+
+
+def test_saved_index_is_rejected_for_a_changed_matrix(tmp_path):
+    vectors, _ = _corpus()
+    path = str(tmp_path / "ivf.npz")
+    IVFIndex.build(vectors, n_lists=16).save(path)
+    assert IVFIndex.load(path, vectors[:-10]) is None           # rows added / removed
+    assert IVFIndex.load(path, vectors[:, :32]) is None         # other embedding model
+    assert IVFIndex.load(str(tmp_path / "missing.npz"), vectors) is None
+
+
+class HashEmbedder:
+    model = None
+    model_name = "hash"
+
+    def encode(self, texts, batch_size=32):
+        return hash_embed(list(texts))
+
+
+def _write_dataset(path, n):
+    rows = [{"instruction": f"how do I close loan account number {i}", "output": f"answer {i}"}
+            for i in range(n)]
+    path.write_text(json.dumps(rows), encoding="utf-8")
+    return rows
+
+
+def test_dataset_matcher_reuses_and_invalidates_the_saved_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_matcher, "ANN_MIN_ROWS", 1)
+    monkeypatch.setattr(dataset_matcher, "EmbeddingCache",
+                        lambda: EmbeddingCache(cache_dir=str(tmp_path / "cache")))
+    dataset = tmp_path / "dataset.json"
+    rows = _write_dataset(dataset, 300)
+
+    first = DatasetMatcher(str(dataset), embedder=HashEmbedder(), ann="ivf", nprobe=64)
+    saved = sorted((tmp_path / "cache").glob("*-ivf*.npz"))
+    assert len(saved) == 1
+    assert first.search(rows[42]["instruction"])[0] == "answer 42"
+
+    built, build = [], IVFIndex.build
+    monkeypatch.setattr(IVFIndex, "build", lambda *a, **k: built.append(1) or build(*a, **k))
+    DatasetMatcher(str(dataset), embedder=HashEmbedder(), ann="ivf", nprobe=64)
+    assert built == []  # reloaded from the .npz
+
+    rows = _write_dataset(dataset, 320)  # the matrix changes: new cache file, new index
+    changed = DatasetMatcher(str(dataset), embedder=HashEmbedder(), ann="ivf", nprobe=64)
+    assert built == [1]
+    assert len(changed.ann_index.order) == 320
+    assert not saved[0].exists()  # removed together with the stale matrix
+    assert changed.search(rows[310]["instruction"])[0] == "answer 310"
@@ -0,0 +1,47 @@
+"""Datasets embedded with the same model must not evict each other's cache."""
+import os
+
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache
+from src.stub_engines import hash_embed
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, texts):
+        self.rows += len(texts)
+        return hash_embed(list(texts))
+
+
+def test_two_datasets_with_one_model_keep_their_matrices(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    encode = CountingEncoder()
+    first = ["How do I open a savings account?", "What is the FD interest rate?"]
+    second = ["How do I raise a card dispute?"]
+
+    cache.load_or_build(first, "stub-model", encode, dataset_key="data/a.json")
+    first_path = cache.matrix_path
+    cache.load_or_build(second, "stub-model", encode, dataset_key="data/b.json")
+    assert os.path.exists(first_path)
+    assert encode.rows == 3
+
+    again = cache.load_or_build(first, "stub-model", encode, dataset_key="data/a.json")
+    assert cache.matrix_path == first_path
+    assert encode.rows == 3  # exact hit, nothing re-encoded
+    np.testing.assert_allclose(again, hash_embed(first), rtol=1e-6)
+
+
+def test_changed_dataset_reuses_rows_and_drops_its_old_matrix(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    encode = CountingEncoder()
+    rows = ["How do I open a savings account?", "What is the FD interest rate?"]
+
+    cache.load_or_build(rows, "stub-model", encode, dataset_key="data/a.json")
+    old_path = cache.matrix_path
+    cache.load_or_build(rows + ["How do I close a loan?"], "stub-model", encode,
+                        dataset_key="data/a.json")
+    assert encode.rows == 3  # only the new row was encoded
+    assert not os.path.exists(old_path)
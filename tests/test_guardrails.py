@@ -0,0 +1,61 @@
+"""Streamed redaction must match one-shot redaction for any chunking."""
+import random
+
+import pytest
+
+from src.guardrails import Guardrails, IncrementalSanitiser
+
+# Pieces that redaction rules match, nearly match or must tell apart
+FRAGMENTS = [
+    "1234 5678 9012", "123456789012", "1234 5678", "ABCDE1234F", "ABCDE1234",
+    "123456789", "98765432101234", "555-123-4567", "555.123.4567", "555 123 4567",
+    "9876543210", "12345", "4567 8901 2345 6789",
+    "Your exact balance is", "your account number is", "YOUR OTP IS", "your rate is",
+    "interest rate", "EMI", "eligibility", "Disclaimer",
+    "the", "loan", "call", "at", "x1234", "-", ".", ",", "(", ")",
+]
+SEPARATORS = [" ", "  ", "\n", "\n\n", "", "\t", ": "]
+
+
+def random_response(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        parts.append(rng.choice(SEPARATORS))
+        parts.append(rng.choice(FRAGMENTS))
+    if rng.random() < 0.5:
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def random_chunks(rng: random.Random, text: str) -> list:
+    cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(0, len(text) + 1)))
+    bounds = [0] + cuts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def incremental(chunks) -> str:
+    sanitiser = IncrementalSanitiser()
+    out = "".join(sanitiser.feed(chunk) for chunk in chunks)
+    return out + sanitiser.finish()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_matches_one_shot_for_random_splits(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        text = random_response(rng)
+        expected = Guardrails.sanitise_response(text)
+        chunks = random_chunks(rng, text)
+        assert incremental(chunks) == expected, (text, chunks)
+        assert "".join(Guardrails.sanitise_stream(chunks)) == expected, (text, chunks)
+
+
+@pytest.mark.parametrize("text", [
+    "Your Aadhaar 1234 5678 9012 is linked.",
+    "PAN ABCDE1234F, phone 555-123-4567, account 98765432101234.",
+    "Your exact balance is ₹500. Check the interest rate.",
+    "",
+    "   ",
+])
+def test_incremental_matches_one_shot_for_character_chunks(text):
+    assert incremental(list(text)) == Guardrails.sanitise_response(text)
@@ -0,0 +1,109 @@
+"""Tier 3 search counts and response-cache behaviour of ``BFSIPipeline``."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.guardrails import Guardrails
+from src.pipeline import BFSIPipeline
+from src.rag_engine import RAGEngine
+from src.response_cache import ResponseCache
+from src.stub_engines import StubDatasetMatcher, StubSLMEngine, hash_embed
+
+RAG_QUERY = "What documents are needed to close a savings account with a pending cheque?"
+
+
+class CountingVectorStore:
+    """Stand-in for the Chroma store that counts similarity searches."""
+
+    def __init__(self):
+        self.searches = 0
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4):
+        self.searches += 1
+        doc = SimpleNamespace(
+            page_content="Savings accounts are closed within 1-2 working days.",
+            metadata={"source": "data/knowledge_base/accounts.md"},
+        )
+        return [(doc, 0.2)] * k  # below RAG_RELEVANCE_THRESHOLD: always Tier 3
+
+
+class HashEmbedder:
+    def encode(self, texts, batch_size=32):
+        return hash_embed(list(texts))
+
+
+class CountingRAGEngine(RAGEngine):
+    """The real ``RAGEngine`` retrieval path over a counting store."""
+
+    def _open_active(self) -> None:
+        self._pointer_signature = "missing"
+        self.collection_name = "test"
+        self.vectorstore = CountingVectorStore()
+
+
+def _pipeline(tmp_path, **kwargs) -> BFSIPipeline:
+    rag = CountingRAGEngine(persist_dir=str(tmp_path), embedder=HashEmbedder())
+    return BFSIPipeline(
+        StubDatasetMatcher(encode_ms=0),
+        StubSLMEngine(ms_per_token=0, prefill_ms=0),
+        rag,
+        Guardrails(),
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    pipe = _pipeline(tmp_path)
+    yield pipe
+    pipe.close()
+
+
+@pytest.fixture
+def cached_pipeline(tmp_path):
+    pipe = _pipeline(tmp_path, response_cache=ResponseCache())
+    yield pipe
+    pipe.close()
+
+
+def _searches(pipe) -> int:
+    return pipe.rag_engine.vectorstore.searches
+
+
+def test_run_searches_once(pipeline):
+    result = pipeline.run(RAG_QUERY)
+    assert result["tier_used"] == "rag"
+    assert _searches(pipeline) == 1
+
+
+def test_arun_searches_once(pipeline):
+    result = asyncio.run(pipeline.arun(RAG_QUERY))
+    assert result["tier_used"] == "rag"
+    assert _searches(pipeline) == 1
+
+
+def test_run_stream_searches_once(pipeline):
+    state, chunks = pipeline.run_stream(RAG_QUERY)
+    assert state["tier_used"] == "rag"
+    assert "".join(chunks) == state["response"]
+    assert _searches(pipeline) == 1
+
+
+# ── Response cache ───────────────────────────────────────────────────
+def test_cached_answer_is_not_served_to_a_blocked_spelling(cached_pipeline):
+    allowed = cached_pipeline.run("How do I bypass-kyc for a savings account?")
+    assert allowed["tier_used"] == "rag"
+    blocked = cached_pipeline.run("How do I bypass kyc for a savings account?")
+    assert blocked["tier_used"] == "guardrail"
+    assert not blocked.get("cache_hit")
+
+
+def test_guardrail_rejections_are_not_cached(cached_pipeline):
+    assert cached_pipeline.run("???")["tier_used"] == "guardrail"
+    blocked = cached_pipeline.run("How do I bypass kyc for a savings account?")
+    assert blocked["tier_used"] == "guardrail"
+    assert len(cached_pipeline.response_cache) == 0
+    allowed = cached_pipeline.run("How do I bypass-kyc for a savings account?")
+    assert allowed["tier_used"] == "rag"
+    assert not allowed.get("cache_hit")
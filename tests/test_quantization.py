@@ -0,0 +1,66 @@
+"""Quantized codes, on their own and inside the IVF lists, match float search."""
+import json
+
+import numpy as np
+import pytest
+
+from src import dataset_matcher
+from src.ann_index import IVFIndex
+from src.dataset_matcher import DatasetMatcher
+from src.quantization import QuantizedVectors
+from src.stub_engines import hash_embed
+
+
+def _corpus(n=3000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((30, dim)).astype(np.float32)
+    x = centres[rng.integers(len(centres), size=n)] + 0.5 * rng.standard_normal((n, dim))
+    x = (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+    q = x[rng.integers(n, size=100)] + 0.05 * rng.standard_normal((100, dim))
+    q = (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+    return x, q
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_search_rows_over_all_rows_matches_search(mode):
+    vectors, queries = _corpus()
+    quantized = QuantizedVectors.build(vectors, mode)
+    rows, scores = quantized.search(queries, k=3)
+    for b, q in enumerate(queries):
+        got_rows, got_scores = quantized.search_rows(q, np.arange(len(vectors)), k=3)
+        np.testing.assert_array_equal(got_rows, rows[b])
+        np.testing.assert_allclose(got_scores, scores[b], rtol=1e-6)
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_ivf_with_codes_matches_ivf_float(mode):
+    vectors, queries = _corpus()
+    index = IVFIndex.build(vectors, n_lists=16)
+    quantized = QuantizedVectors.build(vectors, mode)
+    float_rows, float_scores = index.search(queries, nprobe=4)
+    code_rows, code_scores = index.search(queries, nprobe=4, quantized=quantized)
+    assert np.mean(code_rows == float_rows) >= 0.98
+    # Re-ranked in float: a returned score is always an exact cosine
+    np.testing.assert_allclose(code_scores, np.sum(vectors[code_rows] * queries, axis=1),
+                               rtol=1e-5)
+
+
+class HashEmbedder:
+    model = None
+    model_name = "hash"
+
+    def encode(self, texts, batch_size=32):
+        return hash_embed(list(texts))
+
+
+def test_dataset_matcher_uses_codes_inside_ivf(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_matcher, "ANN_MIN_ROWS", 1)
+    rows = [{"instruction": f"how do I close loan account number {i}", "output": f"answer {i}"}
+            for i in range(200)]
+    path = tmp_path / "dataset.json"
+    path.write_text(json.dumps(rows), encoding="utf-8")
+    matcher = DatasetMatcher(str(path), use_cache=False, embedder=HashEmbedder(),
+                             ann="ivf", nprobe=64, quantization="int8")
+    assert matcher.ann_index is not None and matcher.quantized is not None
+    answer, score = matcher.search(rows[7]["instruction"])
+    assert answer == "answer 7" and score == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,65 @@
+"""``retrieve_batch`` must return what per-query retrieval returns."""
+import chromadb
+import pytest
+
+from src.rag_engine import COLLECTION_NAME, RAGEngine
+from src.stub_engines import hash_embed
+from src.vector_index import write_index
+
+CHUNKS = [
+    ("Savings accounts are closed within 1-2 working days.", "accounts.md"),
+    ("A home loan EMI depends on the interest rate and tenure.", "loans.md"),
+    ("Report a lost debit card to block it immediately.", "cards.md"),
+    ("Fixed deposits can be broken early with a penalty.", "deposits.md"),
+    ("KYC needs an identity proof and an address proof.", "kyc.md"),
+    ("UPI transfers are limited to one lakh per day.", "payments.md"),
+]
+
+QUERIES = [
+    "How long does closing a savings account take?",
+    "What decides my home loan EMI?",
+    "I lost my debit card",
+    "Which documents are needed for KYC?",
+]
+
+
+class HashEmbedder:
+    def encode(self, texts, batch_size=32):
+        return hash_embed(list(texts))
+
+
+def _chroma_engine(tmp_path) -> RAGEngine:
+    persist_dir = str(tmp_path / "chroma")
+    client = chromadb.PersistentClient(path=persist_dir)
+    collection = client.create_collection(COLLECTION_NAME, embedding_function=None)
+    texts = [text for text, _ in CHUNKS]
+    collection.add(
+        ids=[f"c{i}" for i in range(len(CHUNKS))],
+        embeddings=hash_embed(texts).tolist(),
+        documents=texts,
+        metadatas=[{"source": f"data/knowledge_base/{source}"} for _, source in CHUNKS],
+    )
+    return RAGEngine(persist_dir=persist_dir, embedder=HashEmbedder(), backend="chroma")
+
+
+def _numpy_engine(tmp_path) -> RAGEngine:
+    index_dir = tmp_path / "index"
+    texts = [text for text, _ in CHUNKS]
+    write_index(str(index_dir / COLLECTION_NAME), hash_embed(texts), texts,
+                [f"data/knowledge_base/{source}" for _, source in CHUNKS])
+    return RAGEngine(embedder=HashEmbedder(), backend="numpy", index_dir=str(index_dir))
+
+
+@pytest.mark.parametrize("make_engine", [_chroma_engine, _numpy_engine])
+def test_retrieve_batch_matches_retrieve_with_context(tmp_path, make_engine):
+    engine = make_engine(tmp_path)
+    embeddings = hash_embed(QUERIES)
+    batched = engine.retrieve_batch(embeddings, k=3)
+    assert len(batched) == len(QUERIES)
+    for query, embedding, chunks in zip(QUERIES, embeddings, batched):
+        single, _ = engine.retrieve_with_context(query, k=3, query_embedding=embedding)
+        assert [(c["content"], c["source"]) for c in chunks] == [
+            (c["content"], c["source"]) for c in single
+        ]
+        assert [c["score"] for c in chunks] == pytest.approx([c["score"] for c in single],
+                                                             abs=1e-5)
@@ -0,0 +1,48 @@
+"""The cpu-int8 backend loads a checkpoint and quantises its Linear layers."""
+import warnings
+
+import pytest
+import torch
+from transformers import AutoModelForCausalLM, LlamaConfig, LlamaForCausalLM
+
+from src import slm_engine
+
+
+@pytest.fixture(scope="module")
+def tiny_checkpoint(tmp_path_factory):
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=64,
+    )
+    path = tmp_path_factory.mktemp("tiny-llama")
+    LlamaForCausalLM(config).save_pretrained(str(path))
+    return str(path)
+
+
+def test_cpu_int8_load_quantises_linear_layers(tiny_checkpoint, monkeypatch):
+    monkeypatch.setattr(slm_engine, "BASE_MODEL", tiny_checkpoint)
+    monkeypatch.setattr(slm_engine, "NUM_THREADS", 1)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        model = slm_engine.SLMEngine._load_cpu_int8(lora_path=None)
+    assert not [w for w in caught if "quantiz" in str(w.message).lower()]
+
+    dynamic = torch.ao.nn.quantized.dynamic.Linear
+    layers = [m for m in model.modules() if isinstance(m, dynamic)]
+    assert len(layers) == 2 * 7 + 1  # q, k, v, o, gate, up, down per layer + lm_head
+    assert not any(type(m) is torch.nn.Linear for m in model.modules())
+
+    reference = AutoModelForCausalLM.from_pretrained(tiny_checkpoint)
+    input_ids = torch.tensor([[1, 5, 9, 13, 17, 21]])
+    with torch.inference_mode():
+        expected = reference(input_ids).logits
+        logits = model(input_ids).logits
+    assert logits.shape == expected.shape
+    assert torch.allclose(logits, expected, atol=0.05)
+
+
+def test_missing_quantize_dynamic_raises_a_clear_error(monkeypatch):
+    monkeypatch.delattr(torch.ao.quantization, "quantize_dynamic")
+    with pytest.raises(RuntimeError, match="SLM_BACKEND=cuda-4bit"):
+        slm_engine.quantize_dynamic_int8(torch.nn.Sequential(torch.nn.Linear(4, 4)))
@@ -0,0 +1,75 @@
+"""NumPy vector index: exports switch atomically, float16 search matches float32."""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from scripts.build_vectorstore import export_vector_index, index_is_current
+from src import vector_index
+from src.rag_engine import active_index_path, read_active_collection
+from src.stub_engines import hash_embed
+from src.vector_index import NumpyVectorIndex, write_index
+
+TEXTS = [
+    "Savings accounts are closed within 1-2 working days.",
+    "A home loan EMI depends on the interest rate and tenure.",
+    "Report a lost debit card to block it immediately.",
+    "Fixed deposits can be broken early with a penalty.",
+]
+
+
+def _keyed():
+    return [
+        (f"c{i}", f"h{i}", SimpleNamespace(page_content=t, metadata={"source": f"doc{i}.md"}))
+        for i, t in enumerate(TEXTS)
+    ]
+
+
+def _export(index_dir, dtype):
+    vectors = dict(zip((f"h{i}" for i in range(len(TEXTS))), hash_embed(TEXTS)))
+    export_vector_index(_keyed(), vectors, {"collection": "bfsi_knowledge_g1"},
+                        str(index_dir), dtype=dtype)
+
+
+def test_dtype_change_exports_to_a_new_directory(tmp_path):
+    _export(tmp_path, "float32")
+    live = active_index_path(str(tmp_path))
+    assert index_is_current(str(tmp_path), "bfsi_knowledge_g1", "float32")
+    assert not index_is_current(str(tmp_path), "bfsi_knowledge_g1", "float16")
+
+    _export(tmp_path, "float16")
+    switched = active_index_path(str(tmp_path))
+    assert switched != live
+    assert os.path.isfile(os.path.join(live, "manifest.json"))  # kept for one generation
+    assert read_active_collection(str(tmp_path))["dtype"] == "float16"
+    assert NumpyVectorIndex(switched).embeddings.dtype == np.float16
+
+    _export(tmp_path, "float16")
+    assert not os.path.exists(live)  # two generations old
+    assert os.path.isdir(switched)
+
+
+@pytest.mark.parametrize("scan_block", [vector_index.SCAN_BLOCK, 64])
+def test_float16_top_k_matches_float32(tmp_path, monkeypatch, scan_block):
+    monkeypatch.setattr(vector_index, "SCAN_BLOCK", scan_block)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1000, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"chunk {i}" for i in range(len(vectors))]
+    sources = ["kb.md"] * len(vectors)
+    write_index(str(tmp_path / "fp32"), vectors, texts, sources, dtype="float32")
+    write_index(str(tmp_path / "fp16"), vectors, texts, sources, dtype="float16")
+    fp32 = NumpyVectorIndex(str(tmp_path / "fp32"), quantization="none")
+    fp16 = NumpyVectorIndex(str(tmp_path / "fp16"), quantization="none")
+
+    queries = vectors[rng.integers(len(vectors), size=50)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    rows32, sims32 = fp32.top_k(queries, k=5)
+    rows16, sims16 = fp16.top_k(queries, k=5)
+
+    exact = queries @ vectors.T
+    np.testing.assert_array_equal(rows32[:, 0], exact.argmax(axis=1))
+    np.testing.assert_array_equal(rows16[:, 0], rows32[:, 0])
+    np.testing.assert_allclose(sims16, sims32, atol=2e-3)
+    assert fp16.search(queries[:1], k=2)[0][0]["content"] == f"chunk {rows32[0, 0]}"